@@ -127,36 +127,43 @@ namespace WhisperAttackServerCommand
 
                 while (_isRunning)
                 {
-                    await HandleWhisperAttackCommand(vaProxy, await _listener.AcceptTcpClientAsync());
+                    // Each client is handled separately so that a long-lived connection
+                    // from the WhisperAttack server does not block new connections
+                    TcpClient client = await _listener.AcceptTcpClientAsync();
+                    _ = HandleWhisperAttackConnection(vaProxy, client);
                 }
             }
             catch (Exception ex)
             {
-                vaProxy.WriteToLog($"Error starting WhisperAttack listener: {ex.Message}", "red");
+                if (_isRunning)
+                {
+                    vaProxy.WriteToLog($"Error starting WhisperAttack listener: {ex.Message}", "red");
+                }
             }
         }
 
-        private static async Task HandleWhisperAttackCommand(dynamic vaProxy, TcpClient client)
+        private static async Task HandleWhisperAttackConnection(dynamic vaProxy, TcpClient client)
         {
             await Task.Yield();
 
+            client.Client.SetSocketOption(SocketOptionLevel.Socket, SocketOptionName.KeepAlive, true);
+
+            using (client)
             using (NetworkStream stream = client.GetStream())
+            using (StreamReader reader = new StreamReader(stream, Encoding.UTF8))
             {
                 try
                 {
-                    byte[] buffer = new byte[1024];
-                    int bytesRead = await stream.ReadAsync(buffer, 0, buffer.Length);
-                    string receivedMessage = Encoding.UTF8.GetString(buffer, 0, bytesRead);
-
-                    vaProxy.WriteToLog($"Received WhisperAttack command: '{receivedMessage}'", "grey");
-
-                    if (vaProxy.Command.Exists(receivedMessage))
-                    {
-                        vaProxy.Command.Execute(receivedMessage, true, true);
-                    }
-                    else
+                    // Commands are newline delimited, a command sent without a
+                    // newline is read when the connection is closed
+                    string receivedMessage;
+                    while (_isRunning && (receivedMessage = await reader.ReadLineAsync()) != null)
                     {
-                        vaProxy.WriteToLog($"Command '{receivedMessage}' not found", "orange");
+                        receivedMessage = receivedMessage.Trim();
+                        if (receivedMessage.Length > 0)
+                        {
+                            HandleWhisperAttackCommand(vaProxy, receivedMessage);
+                        }
                     }
                 }
                 catch (Exception ex)
@@ -165,5 +172,19 @@ namespace WhisperAttackServerCommand
                 }
             }
         }
+
+        private static void HandleWhisperAttackCommand(dynamic vaProxy, string receivedMessage)
+        {
+            vaProxy.WriteToLog($"Received WhisperAttack command: '{receivedMessage}'", "grey");
+
+            if (vaProxy.Command.Exists(receivedMessage))
+            {
+                vaProxy.Command.Execute(receivedMessage, true, true);
+            }
+            else
+            {
+                vaProxy.WriteToLog($"Command '{receivedMessage}' not found", "orange");
+            }
+        }
     }
 }
@@ -0,0 +1,110 @@
+import os
+import json
+import logging
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+class TranscriptionCache:
+    """
+    An on-disk cache of the raw text transcribed from audio, keyed by a hash
+    of the samples and everything that affects how they are decoded. Replayed
+    recordings, e.g. when regression testing a profile, are then not decoded
+    again. Each entry is a small file, the least recently used entries are
+    removed once the files are larger than the maximum size in total.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Oldest first so that the least recently used entries are evicted first
+        files = []
+        for file_name in os.listdir(directory):
+            if file_name.endswith(".json"):
+                stat = os.stat(os.path.join(directory, file_name))
+                files.append((stat.st_mtime, file_name[:-5], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+        self.evict()
+
+    def get_key(self, audio: np.ndarray, parameters: dict) -> str:
+        """
+        Returns the key for the audio decoded with the parameters.
+        """
+        digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        digest.update(json.dumps(parameters, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the cached text for the key, or None when not cached.
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+        file = os.path.join(self.directory, f"{key}.json")
+        try:
+            with open(file, 'r', encoding='utf-8') as f:
+                text = json.load(f)["text"]
+            os.utime(file)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("Failed to read cached transcription %s: %s", key, e)
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Caches the text for the key, evicting the least recently used entries when full.
+        """
+        file = os.path.join(self.directory, f"{key}.json")
+        temporary_file = f"{file}.tmp"
+        try:
+            with open(temporary_file, 'w', encoding='utf-8') as f:
+                json.dump({"text": text}, f)
+            os.replace(temporary_file, file)
+            size = os.path.getsize(file)
+        except OSError as e:
+            logging.warning("Failed to cache transcription %s: %s", key, e)
+            return None
+        with self.lock:
+            self.total_bytes += size - self.entries.get(key, 0)
+            self.entries[key] = size
+            self.entries.move_to_end(key)
+        self.evict()
+        return None
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache is within its maximum size.
+        """
+        while True:
+            with self.lock:
+                if self.total_bytes <= self.max_bytes or not self.entries:
+                    return None
+                key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, f"{key}.json"))
+            except OSError as e:
+                logging.warning("Failed to remove cached transcription %s: %s", key, e)
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters along with the current size.
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "bytes": self.total_bytes}
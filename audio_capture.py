@@ -0,0 +1,225 @@
+import logging
+from threading import Lock
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+class AudioBuffer:
+    """
+    A growable float32 buffer that recorded audio blocks are appended to.
+    The buffer is preallocated and doubles in size when full so that
+    appending from the audio callback does not allocate on every block.
+    """
+    def __init__(self, initial_seconds: float = 10.0):
+        self.samples = np.zeros(int(initial_seconds * SAMPLE_RATE), dtype=np.float32)
+        self.length = 0
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, block: np.ndarray) -> None:
+        """
+        Append a block of mono samples to the end of the buffer.
+        """
+        block = block.reshape(-1)
+        with self.lock:
+            required = self.length + len(block)
+            if required > len(self.samples):
+                grown = np.zeros(max(required, len(self.samples) * 2), dtype=np.float32)
+                grown[:self.length] = self.samples[:self.length]
+                self.samples = grown
+            self.samples[self.length:required] = block
+            self.length = required
+
+    def get_audio(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        Returns a copy of the recorded samples between start and end.
+        """
+        with self.lock:
+            end = self.length if end is None else min(end, self.length)
+            return self.samples[start:end].copy()
+
+    def get_duration(self) -> float:
+        """
+        Returns the duration of the recorded audio in seconds.
+        """
+        return self.length / SAMPLE_RATE
+
+class PreRollBuffer:
+    """
+    A fixed size ring buffer holding the most recent audio so that the
+    audio from just before a recording was started can be included.
+    """
+    def __init__(self, seconds: float):
+        self.samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+        self.position = 0
+        self.filled = 0
+
+    def write(self, block: np.ndarray) -> None:
+        """
+        Write a block of mono samples, overwriting the oldest samples.
+        """
+        block = block.reshape(-1)
+        capacity = len(self.samples)
+        if capacity == 0:
+            return None
+        if len(block) >= capacity:
+            self.samples[:] = block[-capacity:]
+            self.position = 0
+            self.filled = capacity
+            return None
+        end = self.position + len(block)
+        if end <= capacity:
+            self.samples[self.position:end] = block
+        else:
+            split = capacity - self.position
+            self.samples[self.position:] = block[:split]
+            self.samples[:end - capacity] = block[split:]
+        self.position = end % capacity
+        self.filled = min(capacity, self.filled + len(block))
+        return None
+
+    def clear(self) -> None:
+        """
+        Discard the buffered samples.
+        """
+        self.position = 0
+        self.filled = 0
+
+    def get_audio(self) -> np.ndarray:
+        """
+        Returns a copy of the buffered samples in the order they were recorded.
+        """
+        if self.filled < len(self.samples):
+            return self.samples[:self.filled].copy()
+        return np.concatenate((self.samples[self.position:], self.samples[:self.position]))
+
+class AudioRecorder:
+    """
+    Records audio from the default input device, or the given device, into
+    memory. When a debug file is given the recording is also written to that
+    wav file so that it can be listened to afterwards.
+
+    When armed with a pre-roll the input stream is kept open between
+    recordings and the most recent audio is held in a ring buffer. Starting
+    a recording then only marks where it begins, without the latency of
+    opening the device, and includes the pre-roll so the first syllable
+    is not clipped.
+    """
+    def __init__(self, debug_file: str | None = None, pre_roll: float | None = None, device: int | str | None = None):
+        self.debug_file = debug_file
+        self.device = device
+        self.pre_roll = PreRollBuffer(pre_roll) if pre_roll is not None else None
+        self.buffer = None
+        self.wave_file = None
+        self.stream = None
+        self.lock = Lock()
+
+    def is_armed(self) -> bool:
+        """
+        Returns whether the input stream is kept open between recordings.
+        """
+        return self.pre_roll is not None
+
+    def open_stream(self) -> None:
+        """
+        Open and start the input stream that feeds the recording buffers.
+        """
+        import sounddevice as sd
+        def audio_callback(indata, _frames, _time_info, status):
+            if status:
+                logging.info("Audio Status: %s", status)
+            with self.lock:
+                if self.buffer is not None:
+                    self.buffer.append(indata)
+                    if self.wave_file is not None:
+                        self.wave_file.write(indata)
+                elif self.pre_roll is not None:
+                    self.pre_roll.write(indata)
+        stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            device=self.device,
+            channels=1,
+            dtype='float32',
+            callback=audio_callback
+        )
+        try:
+            stream.start()
+        except Exception:
+            stream.close()
+            raise
+        self.stream = stream
+
+    def close_stream(self) -> None:
+        """
+        Stop and close the input stream.
+        """
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def arm(self) -> None:
+        """
+        Open the input stream ahead of the first recording when armed.
+        """
+        if self.is_armed() and self.stream is None:
+            logging.info("Arming audio capture with %.3f seconds of pre-roll", len(self.pre_roll.samples) / SAMPLE_RATE)
+            self.open_stream()
+
+    def start(self) -> None:
+        """
+        Begin recording into a new buffer, opening the input stream if it is not armed.
+        When the input stream cannot be opened, e.g. the device is busy or
+        unplugged, the recording is abandoned and the error is raised.
+        """
+        buffer = AudioBuffer()
+        wave_file = None
+        if self.debug_file:
+            import soundfile as sf
+            wave_file = sf.SoundFile(
+                self.debug_file,
+                mode='w',
+                samplerate=SAMPLE_RATE,
+                channels=1,
+                subtype='FLOAT'
+            )
+        with self.lock:
+            if self.pre_roll is not None:
+                pre_roll_audio = self.pre_roll.get_audio()
+                buffer.append(pre_roll_audio)
+                if wave_file is not None:
+                    wave_file.write(pre_roll_audio)
+            self.buffer = buffer
+            self.wave_file = wave_file
+        if self.stream is None:
+            try:
+                self.open_stream()
+            except Exception:
+                with self.lock:
+                    self.buffer = None
+                    self.wave_file = None
+                if wave_file is not None:
+                    wave_file.close()
+                raise
+
+    def stop(self) -> np.ndarray:
+        """
+        Stop recording and return the recorded samples.
+        The input stream is left open when armed.
+        """
+        if not self.is_armed():
+            self.close_stream()
+        with self.lock:
+            buffer = self.buffer
+            wave_file = self.wave_file
+            self.buffer = None
+            self.wave_file = None
+            if self.pre_roll is not None:
+                # Audio from before this recording must not be reused as pre-roll for the next one
+                self.pre_roll.clear()
+        if wave_file is not None:
+            wave_file.close()
+            logging.info("Recording saved to %s", self.debug_file)
+        return buffer.get_audio()
@@ -0,0 +1,226 @@
+"""
+Offline benchmark of the transcription pipeline over a corpus of recordings.
+
+The corpus is a directory of WAV files, each with the expected final text
+(the command sent to VoiceAttack) in a text file of the same name, e.g.
+"request_picture.wav" and "request_picture.txt". Every recording is run
+through the same silence trimming, WhisperServer.transcribe_audio and text
+cleanup as the server, without the UI, for each combination of model,
+compute type and beam size.
+
+The results are written as JSON so that runs can be compared, with the
+real-time factor, per-stage latency percentiles, word error rate and the
+rate of transcriptions exactly matching the expected command.
+
+Run from the WhisperAttack directory:
+
+    python benchmarks/transcription_benchmark.py corpus --models tiny.en,base.en,small.en --beam-sizes 1,5 --output results.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import platform
+from datetime import datetime
+from threading import Event
+import numpy as np
+
+APP_LOCATION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_LOCATION)
+from audio_capture import SAMPLE_RATE
+from configuration import WhisperAttackConfiguration
+from latency_stats import PipelineStats
+from log_writer import WhisperAttackLogWriter
+from whisper_server import WhisperServer
+
+def normalise_words(text: str) -> list[str]:
+    """
+    Lowercases the text and splits it into words, ignoring punctuation.
+    """
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def word_errors(expected: list[str], actual: list[str]) -> int:
+    """
+    Returns the number of word substitutions, insertions and deletions
+    needed to turn the expected words into the actual words.
+    """
+    previous = list(range(len(actual) + 1))
+    for row, expected_word in enumerate(expected, start=1):
+        current = [row]
+        for column, actual_word in enumerate(actual, start=1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (expected_word != actual_word)
+            ))
+        previous = current
+    return previous[-1]
+
+def load_audio(wav_file: str) -> np.ndarray:
+    """
+    Loads a WAV file as mono float32 samples at the Whisper sample rate.
+    """
+    import soundfile as sf
+    audio, sample_rate = sf.read(wav_file, dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1)
+    if sample_rate != SAMPLE_RATE:
+        duration = len(audio) / sample_rate
+        positions = np.arange(int(duration * SAMPLE_RATE)) * (sample_rate / SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+def load_corpus(corpus: str) -> list[tuple[str, np.ndarray, str]]:
+    """
+    Returns the name, audio and expected text of each recording in the corpus.
+    """
+    recordings = []
+    for file_name in sorted(os.listdir(corpus)):
+        name, extension = os.path.splitext(file_name)
+        if extension.lower() != ".wav":
+            continue
+        transcript_file = os.path.join(corpus, f"{name}.txt")
+        if not os.path.isfile(transcript_file):
+            logging.warning("Skipping %s, there is no %s.txt with the expected text", file_name, name)
+            continue
+        with open(transcript_file, 'r', encoding='utf-8') as f:
+            expected = f.read().strip()
+        recordings.append((file_name, load_audio(os.path.join(corpus, file_name)), expected))
+    return recordings
+
+def benchmark(
+    config: WhisperAttackConfiguration,
+    recordings: list[tuple[str, np.ndarray, str]],
+    model_name: str,
+    device: str,
+    compute_type: str,
+    beam_size: int
+) -> dict:
+    """
+    Transcribes every recording with one combination of model settings
+    and returns the results.
+    """
+    from faster_whisper import WhisperModel
+    config.config["beam_size"] = str(beam_size)
+    # Every combination must decode every recording, not reuse the text of an earlier combination
+    config.config["audio_cache_size"] = "0"
+    server = WhisperServer(config, WhisperAttackLogWriter(), lambda: None, Event())
+
+    start_time = time.perf_counter()
+    server.set_models(
+        WhisperModel(model_name, device=device, compute_type=compute_type),
+        None,
+        {"whisper_model": model_name, "cascade_model": None, "device": device, "compute_type": compute_type, "cpu_threads": 0}
+    )
+    load_seconds = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    server.warm_up_model(config)
+    warm_up_seconds = time.perf_counter() - start_time
+
+    stats = PipelineStats()
+    results = []
+    total_errors = 0
+    total_words = 0
+    exact_matches = 0
+    audio_seconds = 0.0
+    processing_seconds = 0.0
+    for file_name, audio, expected in recordings:
+        timings = {}
+        start = datetime.now()
+        trimmed_audio = audio
+        if config.get_vad_enabled():
+            trimmed_audio = server.trim_silence(audio, config)
+            timings["vad"] = (datetime.now() - start).total_seconds()
+        text = ""
+        if len(trimmed_audio) > 0:
+            text = server.transcribe_audio(trimmed_audio, "", timings) or ""
+        timings["total"] = (datetime.now() - start).total_seconds()
+        stats.record_spans(timings)
+
+        expected_words = normalise_words(expected)
+        errors = word_errors(expected_words, normalise_words(text))
+        exact = normalise_words(text) == expected_words
+        duration = len(audio) / SAMPLE_RATE
+        total_errors += errors
+        total_words += len(expected_words)
+        exact_matches += exact
+        audio_seconds += duration
+        processing_seconds += timings["total"]
+        results.append({
+            "file": file_name,
+            "expected": expected,
+            "text": text,
+            "word_errors": errors,
+            "exact_match": exact,
+            "audio_seconds": round(duration, 3),
+            "timings": {stage: round(seconds, 6) for stage, seconds in timings.items()}
+        })
+        logging.info("%s: '%s' (expected '%s')", file_name, text, expected)
+
+    return {
+        "model": model_name,
+        "device": device,
+        "compute_type": compute_type,
+        "beam_size": beam_size,
+        "load_seconds": round(load_seconds, 3),
+        "warm_up_seconds": round(warm_up_seconds, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "processing_seconds": round(processing_seconds, 3),
+        "real_time_factor": round(processing_seconds / audio_seconds, 4) if audio_seconds else None,
+        "word_error_rate": round(total_errors / total_words, 4) if total_words else None,
+        "exact_match_rate": round(exact_matches / len(recordings), 4) if recordings else None,
+        "latency": stats.get_stats(),
+        "utterances": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the WhisperAttack transcription pipeline over recorded utterances.")
+    parser.add_argument("corpus", help="directory of WAV files, each with the expected text in a .txt file of the same name")
+    parser.add_argument("--models", default="small.en", help="comma separated Whisper models, default small.en")
+    parser.add_argument("--compute-types", default="int8", help="comma separated compute types, default int8")
+    parser.add_argument("--beam-sizes", default="5", help="comma separated beam sizes, default 5")
+    parser.add_argument("--device", default="cpu", help="cpu or cuda, default cpu")
+    parser.add_argument("--app-data", help="directory with custom configuration, by default only the default configuration is used")
+    parser.add_argument("--output", help="file to write the JSON results to, default is standard output")
+    parser.add_argument("--verbose", action="store_true", help="log each transcription")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with tempfile.TemporaryDirectory() as empty_app_data:
+        config = WhisperAttackConfiguration(APP_LOCATION, args.app_data or empty_app_data)
+    recordings = load_corpus(args.corpus)
+    if not recordings:
+        parser.error(f"No recordings with expected text found in {args.corpus}")
+
+    runs = []
+    for model_name in args.models.split(","):
+        for compute_type in args.compute_types.split(","):
+            for beam_size in args.beam_sizes.split(","):
+                run = benchmark(config, recordings, model_name.strip(), args.device, compute_type.strip(), int(beam_size))
+                runs.append(run)
+                print(
+                    f"{run['model']:>12} {run['compute_type']:>8} beam={run['beam_size']}: "
+                    f"RTF {run['real_time_factor']}, WER {run['word_error_rate']}, exact match {run['exact_match_rate']}, "
+                    f"p50 total {run['latency']['total']['p50']:.1f}ms",
+                    file=sys.stderr
+                )
+
+    results = {
+        "corpus": os.path.abspath(args.corpus),
+        "recordings": len(recordings),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "runs": runs
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
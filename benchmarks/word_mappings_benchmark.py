@@ -0,0 +1,71 @@
+"""
+Micro-benchmark for replacing word mappings in transcribed text.
+
+Compares the previous approach of running one regular expression per
+word mapping against the single scan WordMappingMatcher, for an
+increasing number of mappings.
+
+Run from the WhisperAttack directory:
+
+    python benchmarks/word_mappings_benchmark.py
+"""
+import os
+import re
+import sys
+import random
+import string
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_matching import WordMappingMatcher
+
+MAPPING_COUNTS = [10, 100, 1000, 10000]
+TEXT = "Enfield 1 1 request gulf atel tawa inter take-off pre-contact Texaco request rejoin"
+
+def replace_word_mappings_per_mapping(word_mappings: dict[str, str], text: str) -> str:
+    """
+    The previous implementation, one regular expression per word mapping.
+    """
+    for word, replacement in word_mappings.items():
+        pattern = rf"\b{re.escape(word)}\b"
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+def generate_word_mappings(count: int) -> dict[str, str]:
+    """
+    Generates random word mappings, including those used in the text.
+    """
+    generator = random.Random(count)
+    word_mappings = {
+        "gulf": "Golf", "atel": "Hotel", "tawa": "Tower", "inter": "Enter",
+        "take-off": "takeoff", "pre-contact": "precontact",
+    }
+    while len(word_mappings) < count:
+        length = generator.randint(3, 12)
+        alias = "".join(generator.choice(string.ascii_lowercase) for _ in range(length))
+        word_mappings[alias] = alias.capitalize()
+    return word_mappings
+
+def time_call(function, repeat: int = 5) -> float:
+    """
+    Returns the fastest average time in milliseconds of calling the function.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1000
+
+def main() -> None:
+    print(f"{'mappings':>10} {'per mapping (ms)':>18} {'build (ms)':>12} {'single scan (ms)':>18} {'speed up':>10}")
+    for count in MAPPING_COUNTS:
+        word_mappings = generate_word_mappings(count)
+        matcher = WordMappingMatcher(word_mappings)
+        if matcher.replace(TEXT) != replace_word_mappings_per_mapping(word_mappings, TEXT):
+            raise AssertionError("Matcher output differs from the per mapping replacement")
+        re.purge()
+        per_mapping = time_call(lambda: replace_word_mappings_per_mapping(word_mappings, TEXT))
+        build = time_call(lambda: WordMappingMatcher(word_mappings).compile(), repeat=3)
+        single_scan = time_call(lambda: matcher.replace(TEXT))
+        print(f"{count:>10} {per_mapping:>18.3f} {build:>12.3f} {single_scan:>18.4f} {per_mapping / single_scan:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import logging
+import platform
+from datetime import datetime
+from typing import Callable
+import numpy as np
+from audio_capture import SAMPLE_RATE
+
+CALIBRATION_FILE = "calibration.json"
+
+# Compute types that are timed on each device, in order of preference when equally fast
+COMPUTE_TYPES = {
+    "cpu": ["int8", "int8_float32", "float32"],
+    "cuda": ["float16", "int8_float16", "int8", "float32"]
+}
+CLIP_SECONDS = 5
+# Each combination is timed this many times after being warmed up, the median is used
+REPEATS = 3
+
+def get_calibration_clip() -> np.ndarray:
+    """
+    Returns the fixed synthetic clip that each combination is timed with.
+    The clip is a voiced tone with a varying pitch broken into syllables,
+    so that the model decodes it like speech rather than as silence.
+    """
+    rng = np.random.default_rng(0)
+    timeline = np.arange(CLIP_SECONDS * SAMPLE_RATE) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * timeline)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * timeline), 0, None)
+    clip = 0.1 * voice * syllables + 0.005 * rng.standard_normal(len(timeline))
+    return clip.astype(np.float32)
+
+def get_thread_counts() -> list[int]:
+    """
+    Returns the CPU thread counts that are timed on this machine.
+    """
+    cores = os.cpu_count() or 1
+    return sorted({threads for threads in (2, 4, 8, cores // 2, cores) if 1 <= threads <= cores})
+
+class ModelCalibration:
+    """
+    Finds the fastest compute type and number of CPU threads to run a
+    Whisper model with on this machine, by timing the decoding of a fixed
+    synthetic clip with each combination. Calibrating loads the model
+    several times so the fastest combination is kept in a file in the app
+    data directory, keyed by a fingerprint of the hardware and the model,
+    and only measured again when the hardware or model changes or a
+    recalibration is asked for.
+    """
+    def __init__(self, app_data_location: str):
+        self.file = os.path.join(app_data_location, CALIBRATION_FILE)
+
+    def get_fingerprint(self, model_name: str, device: str, compute_type: str | None, cpu_threads: int) -> str:
+        """
+        Returns the key that the calibration is kept under for the model on this
+        machine. The compute type and CPU threads set in the settings are
+        included as they limit the combinations that are timed.
+        """
+        import ctranslate2
+        return "|".join([
+            model_name,
+            device,
+            platform.processor() or platform.machine(),
+            f"{os.cpu_count()} cpus",
+            f"{ctranslate2.get_cuda_device_count()} gpus",
+            f"ctranslate2 {ctranslate2.__version__}",
+            compute_type or "any",
+            str(cpu_threads or "any")
+        ])
+
+    def load(self) -> dict[str, dict]:
+        """
+        Returns the calibrations kept in the calibration file.
+        """
+        try:
+            with open(self.file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning("Failed to read %s, calibrating again: %s", self.file, e)
+            return {}
+
+    def get(self, fingerprint: str) -> dict | None:
+        """
+        Returns the calibration kept for the fingerprint, or None when it has not been calibrated.
+        """
+        return self.load().get(fingerprint)
+
+    def put(self, fingerprint: str, calibration: dict) -> None:
+        """
+        Keeps the calibration for the fingerprint in the calibration file.
+        """
+        calibrations = self.load()
+        calibrations[fingerprint] = calibration
+        temporary_file = f"{self.file}.tmp"
+        try:
+            with open(temporary_file, 'w', encoding='utf-8') as f:
+                json.dump(calibrations, f, indent=2)
+            os.replace(temporary_file, self.file)
+        except OSError as e:
+            logging.warning("Failed to save calibration to %s: %s", self.file, e)
+
+    def clear(self) -> None:
+        """
+        Removes all of the kept calibrations so that the next model loaded is calibrated again.
+        """
+        try:
+            os.remove(self.file)
+        except FileNotFoundError:
+            pass
+
+    def time_decoding(self, model, clip: np.ndarray, beam_size: int) -> float:
+        """
+        Returns the median time in seconds that the model takes to decode the clip.
+        """
+        def decode():
+            segments, _ = model.transcribe(
+                clip,
+                language='en',
+                beam_size=beam_size,
+                temperature=0.0,
+                condition_on_previous_text=False
+            )
+            return list(segments)
+
+        decode()
+        durations = []
+        for _ in range(REPEATS):
+            start_time = time.perf_counter()
+            decode()
+            durations.append(time.perf_counter() - start_time)
+        return float(np.median(durations))
+
+    def calibrate(
+        self,
+        model_name: str,
+        device: str,
+        compute_type: str | None,
+        cpu_threads: int,
+        beam_size: int,
+        progress: Callable[[str], None]
+    ) -> dict:
+        """
+        Times the model with each compute type and number of CPU threads and
+        returns the fastest combination along with all of the timings.
+        The compute type is chosen first using the default number of threads,
+        then the number of threads is chosen for that compute type, which
+        needs far fewer models to be loaded than timing every combination.
+        A compute type or number of threads that is given is not varied, and
+        the number of threads is only varied on the CPU.
+        """
+        import ctranslate2
+        from faster_whisper import WhisperModel
+        clip = get_calibration_clip()
+        supported_compute_types = ctranslate2.get_supported_compute_types(device)
+        compute_types = [compute_type] if compute_type else [
+            candidate for candidate in COMPUTE_TYPES[device] if candidate in supported_compute_types
+        ]
+        thread_counts = [cpu_threads] if cpu_threads or device != "cpu" else get_thread_counts()
+        timings = {}
+
+        def time_combination(candidate_compute_type: str, candidate_threads: int) -> float:
+            key = f"{candidate_compute_type}/{candidate_threads or 'default'}"
+            if key not in timings:
+                progress(f"Calibrating {model_name} with compute_type={candidate_compute_type}, cpu_threads={candidate_threads or 'default'} ...")
+                model = WhisperModel(model_name, device=device, compute_type=candidate_compute_type, cpu_threads=candidate_threads)
+                timings[key] = self.time_decoding(model, clip, beam_size)
+                del model
+                logging.info("Calibration of %s took %.3f seconds", key, timings[key])
+            return timings[key]
+
+        # The compute types are timed with the number of threads closest to CTranslate2's default of 4
+        default_threads = min(thread_counts, key=lambda threads: abs(threads - 4))
+        best_compute_type = min(compute_types, key=lambda candidate: time_combination(candidate, default_threads))
+        best_threads = min(thread_counts, key=lambda candidate: time_combination(best_compute_type, candidate))
+        return {
+            "compute_type": best_compute_type,
+            "cpu_threads": best_threads,
+            "seconds": round(time_combination(best_compute_type, best_threads), 4),
+            "clip_seconds": CLIP_SECONDS,
+            "timings": {key: round(seconds, 4) for key, seconds in timings.items()},
+            "calibrated": datetime.now().isoformat(timespec='seconds')
+        }
@@ -0,0 +1,225 @@
+import re
+import zlib
+import logging
+import xml.etree.ElementTree as ElementTree
+from text_matching import END, get_text2digits, is_number_word
+
+# Dynamic command sections can multiply out to a very large number of phrases
+MAX_PHRASES_PER_COMMAND = 10000
+# Numeric ranges in dynamic command sections, e.g. [1..10]
+NUMBER_RANGE = re.compile(r"^\s*(-?\d+)\s*\.\.\s*(-?\d+)\s*$")
+WORD = re.compile(r"[a-z0-9']+")
+TENS = {"20", "30", "40", "50", "60", "70", "80", "90"}
+UNITS = {"1", "2", "3", "4", "5", "6", "7", "8", "9"}
+
+def normalise_words(text: str) -> list[str]:
+    """
+    Lowercases the text and splits it into words, ignoring punctuation.
+    Number words are written as digits one word at a time, so numbers read
+    out digit by digit stay separate words, e.g. "enfield one one" and
+    "Enfield [1..9] [1..4]" both become "enfield 1 1". Only a tens word
+    followed by a units word is joined, e.g. "twenty one" to "21", and
+    numbers with a leading zero are split into digits, e.g. "01" to "0 1".
+    """
+    words = []
+    previous_number_word = False
+    for word in WORD.findall(text.lower()):
+        number_word = is_number_word(word)
+        if number_word:
+            word = get_text2digits().convert(word)
+            if previous_number_word and words[-1] in TENS and word in UNITS:
+                words[-1] = words[-1][0] + word
+                previous_number_word = False
+                continue
+        previous_number_word = number_word
+        if len(word) > 1 and word.startswith("0") and word.isdigit():
+            words.extend(word)
+        else:
+            words.append(word)
+    return words
+
+def split_alternatives(section: str) -> list[str]:
+    """
+    Splits a command string on the semicolons that are not within a dynamic section.
+    """
+    alternatives = []
+    depth = 0
+    start = 0
+    for position, character in enumerate(section):
+        if character == "[":
+            depth += 1
+        elif character == "]":
+            depth = max(0, depth - 1)
+        elif character == ";" and depth == 0:
+            alternatives.append(section[start:position])
+            start = position + 1
+    alternatives.append(section[start:])
+    return alternatives
+
+def expand_command_string(command_string: str) -> list[str]:
+    """
+    Expands a VoiceAttack command string into every phrase that it matches.
+    Phrases are separated by semicolons, and dynamic sections within square
+    brackets match one of their semicolon separated alternatives, e.g.
+    "request [startup;taxi] [please;]" or "channel [1..5]".
+    """
+    phrases = []
+    for alternative in split_alternatives(command_string):
+        for phrase in expand_dynamic_sections(alternative):
+            phrase = " ".join(phrase.split())
+            if phrase and phrase not in phrases:
+                phrases.append(phrase)
+    return phrases
+
+def expand_dynamic_sections(text: str) -> list[str]:
+    """
+    Expands the dynamic sections of a single phrase.
+    """
+    start = text.find("[")
+    if start == -1:
+        return [text]
+    depth = 0
+    for end in range(start, len(text)):
+        if text[end] == "[":
+            depth += 1
+        elif text[end] == "]":
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        # An unclosed section is matched literally
+        return [text.replace("[", " ")]
+    section = text[start + 1:end]
+    number_range = NUMBER_RANGE.match(section)
+    if number_range:
+        first, last = sorted(int(number) for number in number_range.groups())
+        options = [str(number) for number in range(first, last + 1)]
+    else:
+        options = [phrase for option in split_alternatives(section) for phrase in expand_dynamic_sections(option)]
+    prefix = text[:start]
+    phrases = []
+    for suffix in expand_dynamic_sections(text[end + 1:]):
+        for option in options:
+            phrases.append(f"{prefix} {option} {suffix}")
+            if len(phrases) >= MAX_PHRASES_PER_COMMAND:
+                logging.warning("Command '%s' has more than %s phrases, the rest are ignored", text, MAX_PHRASES_PER_COMMAND)
+                return phrases
+    return phrases
+
+def load_command_strings(grammar_file: str) -> list[str]:
+    """
+    Loads the command strings from a VoiceAttack profile exported as XML, or
+    from a text file with a command string on each line.
+    """
+    with open(grammar_file, 'rb') as f:
+        data = f.read()
+    if data.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+        root = ElementTree.fromstring(data)
+        return [element.text for element in root.iter("CommandString") if element.text]
+    try:
+        # Profiles saved by VoiceAttack are compressed binary files that cannot be read
+        zlib.decompress(data, -15)
+        raise ValueError("The VoiceAttack profile must be exported as an XML profile (.vap)")
+    except zlib.error:
+        pass
+    return [
+        line.strip() for line in data.decode('utf-8-sig').splitlines()
+        if line.strip() and not line.strip().startswith('#')
+    ]
+
+class CommandGrammar:
+    """
+    The closed set of phrases that the VoiceAttack commands are spoken with,
+    held in a prefix trie of words. Transcriptions are rescored against the
+    trie so that a transcription close to a command phrase is replaced with
+    that phrase, without the word mappings and fuzzy matching needed to
+    repair free-form text.
+    """
+    def __init__(self, command_strings: list[str]):
+        self.trie = {}
+        self.words = set()
+        self.phrase_count = 0
+        self.longest_phrase = 0
+        for command_string in command_strings:
+            for phrase in expand_command_string(command_string):
+                self.add(phrase)
+
+    def add(self, phrase: str) -> None:
+        """
+        Adds a command phrase to the trie.
+        """
+        words = normalise_words(phrase)
+        if not words:
+            return None
+        node = self.trie
+        for word in words:
+            node = node.setdefault(word, {})
+        if END not in node:
+            self.phrase_count += 1
+        node[END] = phrase
+        self.words.update(words)
+        self.longest_phrase = max(self.longest_phrase, len(words))
+        return None
+
+    def __len__(self) -> int:
+        return self.phrase_count
+
+    def match(self, text: str, threshold: float) -> tuple[str, float] | None:
+        """
+        Returns the command phrase closest to the text and its score, or None
+        when no phrase scores at least the threshold (0 to 100).
+        Phrases are compared word by word with an edit distance where
+        replacing a word costs how dissimilar the two words are, so the
+        score is not lowered much by a misspelt word. A word can also be
+        replaced by two words of the text, e.g. "startup" by "start up",
+        which costs twice as much for how dissimilar they are. The trie is searched
+        depth first, skipping branches that can no longer reach the threshold.
+        """
+        query = normalise_words(text)
+        if not query or not self.trie:
+            return None
+        # The score of a phrase is lowered by its difference in length to the
+        # query, beyond the words that can be joined, so the highest cost
+        # allowed only grows with the query while phrases are long enough to reach it
+        max_cost = (1 - threshold / 100) * max(len(query), self.longest_phrase)
+        if len(query) - 2 * self.longest_phrase > max_cost:
+            return None
+        from rapidfuzz import fuzz, process
+        vocabulary = list(self.words)
+        similarities = process.cdist(vocabulary, query, scorer=fuzz.ratio)
+        replace_costs = {word: 1 - similarities[index] / 100 for index, word in enumerate(vocabulary)}
+        joined_query = [first + second for first, second in zip(query, query[1:])]
+        if joined_query:
+            similarities = process.cdist(vocabulary, joined_query, scorer=fuzz.ratio)
+            join_costs = {word: 2 * (1 - similarities[index] / 100) for index, word in enumerate(vocabulary)}
+
+        best = None
+        # Each row holds the cost of aligning the words so far with each prefix of the query
+        stack = [(self.trie, [float(cost) for cost in range(len(query) + 1)], 0)]
+        while stack:
+            node, row, depth = stack.pop()
+            for word, child in node.items():
+                if word == END:
+                    score = 100 * (1 - row[-1] / max(len(query), depth))
+                    if score >= threshold and (best is None or score > best[1]):
+                        best = (child, float(score))
+                    continue
+                costs = replace_costs[word]
+                child_row = [row[0] + 1]
+                for position in range(1, len(row)):
+                    cost = min(
+                        row[position] + 1,
+                        child_row[position - 1] + 1,
+                        row[position - 1] + costs[position - 1]
+                    )
+                    if position > 1:
+                        cost = min(cost, row[position - 2] + join_costs[word][position - 2])
+                    child_row.append(cost)
+                # Each of the remaining phrase words can cover at most two
+                # more words of the query, the rest of the query is inserted
+                if min(child_row) > max_cost:
+                    continue
+                uncovered = len(query) - 2 * (self.longest_phrase - depth - 1)
+                if uncovered <= 0 or min(cost + max(0, uncovered - position) for position, cost in enumerate(child_row)) <= max_cost:
+                    stack.append((child, child_row, depth + 1))
+        return best
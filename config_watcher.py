@@ -0,0 +1,87 @@
+import os
+import logging
+from threading import Event, Lock, Thread
+from typing import Callable
+
+class ConfigurationWatcher:
+    """
+    Polls the modification times of the configuration files from a background
+    thread and calls back when any of them have changed. Editors often write a
+    file in more than one step, so the callback is only made once the files
+    have stopped changing for one polling interval. Changes that WhisperAttack
+    makes itself and has already applied can be marked as seen so that they
+    are not reloaded again.
+    """
+    def __init__(self, get_files: Callable[[], list[str]], on_change: Callable[[], None], interval: float):
+        self.get_files = get_files
+        self.on_change = on_change
+        self.interval = interval
+        self.stop_event = Event()
+        self.lock = Lock()
+        self.last_seen = {}
+        self.changed_files = set()
+        self.thread = Thread(daemon=True, target=self.run)
+
+    def start(self) -> None:
+        """
+        Start watching the configuration files.
+        """
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop watching the configuration files.
+        """
+        self.stop_event.set()
+
+    def get_modification_times(self) -> dict[str, tuple[int, int] | None]:
+        """
+        Returns the modification time and size of each file, None when the file does not exist.
+        """
+        times = {}
+        for file in self.get_files():
+            try:
+                stat = os.stat(file)
+                times[file] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                times[file] = None
+        return times
+
+    def mark_seen(self, file: str) -> None:
+        """
+        Records the current modification time of a file that has been changed
+        and applied without reloading, so that the change does not cause a reload.
+        """
+        try:
+            stat = os.stat(file)
+            modification_time = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            modification_time = None
+        with self.lock:
+            self.last_seen[file] = modification_time
+            self.changed_files.discard(file)
+
+    def run(self) -> None:
+        """
+        Poll the files until stopped.
+        """
+        with self.lock:
+            self.last_seen = self.get_modification_times()
+        while not self.stop_event.wait(self.interval):
+            current = self.get_modification_times()
+            with self.lock:
+                changed_files = {file for file in current.keys() | self.last_seen.keys() if current.get(file) != self.last_seen.get(file)}
+                if changed_files:
+                    self.last_seen = current
+                    self.changed_files |= changed_files
+                    continue
+                if not self.changed_files:
+                    continue
+                self.changed_files.clear()
+            try:
+                self.on_change()
+            except Exception as e:
+                logging.error("Failed to reload configuration: %s", e)
+            # The files to watch can change with the configuration
+            with self.lock:
+                self.last_seen = self.get_modification_times()
@@ -1,7 +1,26 @@
 import os
+import copy
 import logging
+from command_grammar import CommandGrammar, load_command_strings
+from text_matching import FuzzyWordMatcher, WordMappingMatcher
 from theme import THEME_DEFAULT
 
+# Prompt given to Whisper to guide the transcription towards DCS vocabulary
+DEFAULT_INITIAL_PROMPT = (
+    "This is aviation-related speech for DCS Digital Combat Simulator, "
+    "Expect references to airports in Caucasus Georgia and Russia. Expect callsigns like Enfield, Springfield, Uzi, Colt, Dodge, "
+    "Ford, Chevy, Pontiac, Army Air, Apache, Crow, Sioux, Gatling, Gunslinger, "
+    "Hammerhead, Bootleg, Palehorse, Carnivor, Saber, Hawg, Boar, Pig, Tusk, Viper, "
+    "Venom, Lobo, Cowboy, Python, Rattler, Panther, Wolf, Weasel, Wild, Ninja, Jedi, "
+    "Hornet, Squid, Ragin, Roman, Sting, Jury, Joker, Ram, Hawk, Devil, Check, Snake, "
+    "Dude, Thud, Gunny, Trek, Sniper, Sled, Best, Jazz, Rage, Tahoe, Bone, Dark, Vader, "
+    "Buff, Dump, Kenworth, Heavy, Trash, Cargo, Ascot, Overlord, Magic, Wizard, Focus, "
+    "Darkstar, Texaco, Arco, Shell, Axeman, Darknight, Warrior, Pointer, Eyeball, "
+    "Moonbeam, Whiplash, Finger, Pinpoint, Ferret, Shaba, Playboy, Hammer, Jaguar, "
+    "Deathstar, Anvil, Firefly, Mantis, Badger. Also expect usage of the phonetic "
+    "alphabet Alpha, Bravo, Charlie, X-ray."
+)
+
 class ConfigurationError(Exception):
     """
     Exception class for errors reading and writing configuration
@@ -19,7 +38,9 @@ class WhisperAttackConfiguration:
     custom configuration is loaded from the AppData\Local\WhisperAttack
     directory and is combined with the default configuration.
     """
-    def __init__(self, app_location: str, app_data_location: str):
+    def __init__(self, app_location: str, app_data_location: str, version: int = 0):
+        self.app_location = app_location
+        self.app_data_location = app_data_location
         default_config = self.load_configuration(app_location)
         custom_config = self.load_configuration(app_data_location, False)
         self.config = default_config | custom_config
@@ -27,10 +48,16 @@ class WhisperAttackConfiguration:
         default_word_mappings = self.load_word_mappings(app_location)
         custom_word_mappings = self.load_word_mappings(app_data_location, False)
         self.word_mappings = default_word_mappings | custom_word_mappings
+        self.word_mapping_matcher = WordMappingMatcher(self.word_mappings)
 
         default_fuzzy_words = self.load_fuzzy_words(app_location)
         custom_fuzzy_words = self.load_fuzzy_words(app_data_location, False)
         self.fuzzy_words = [*default_fuzzy_words, *custom_fuzzy_words]
+        self.fuzzy_matcher = FuzzyWordMatcher(self.fuzzy_words, threshold=85)
+        self.command_grammar_file = None
+        self.command_grammar = self.load_command_grammar(app_location, app_data_location)
+        # Incremented whenever the word mappings or fuzzy words change
+        self.version = version
 
     def load_configuration(self, location: str, default = True) -> dict[str, str]:
         """
@@ -86,9 +113,8 @@ class WhisperAttackConfiguration:
             logging.error("File not found: '%s'", word_mappings_file)
             raise ConfigurationError("The word_mappings.txt file could not be found.")
 
-        logging.info("Loaded word mappings:")
-        for key, value in word_mappings.items():
-            logging.info("%s: %s", key, value)
+        logging.info("Loaded %s word mappings", len(word_mappings))
+        logging.debug("Word mappings: %s", word_mappings)
         return word_mappings
 
     def load_fuzzy_words(self, location: str, default = True) -> list[str]:
@@ -115,14 +141,59 @@ class WhisperAttackConfiguration:
         logging.info("Loaded fuzzy words: %s", fuzzy_words)
         return fuzzy_words
 
+    def load_command_grammar(self, app_location: str, app_data_location: str) -> CommandGrammar | None:
+        """
+        Loads the VoiceAttack command phrases from the file set by command_grammar.
+        A relative path is looked for in the custom configuration directory
+        and then beside the application.
+        """
+        grammar_file = self.config.get("command_grammar", "").strip()
+        if grammar_file == "":
+            return None
+        if not os.path.isabs(grammar_file):
+            custom_grammar_file = os.path.join(app_data_location, grammar_file)
+            grammar_file = custom_grammar_file if os.path.isfile(custom_grammar_file) else os.path.join(app_location, grammar_file)
+        self.command_grammar_file = grammar_file
+        logging.info("Loading command grammar from '%s'...", grammar_file)
+        try:
+            command_grammar = CommandGrammar(load_command_strings(grammar_file))
+        except Exception as error:
+            logging.error("Failed to load command grammar from '%s': %s", grammar_file, error)
+            raise ConfigurationError(f"Failed to load command grammar: {error}") from error
+        logging.info("Loaded %s command phrases", len(command_grammar))
+        return command_grammar
+
+    def reload(self) -> "WhisperAttackConfiguration":
+        """
+        Loads the configuration files again into a new configuration, this
+        configuration is left unchanged so that it can still be used until
+        the new configuration is ready. The version of the new configuration
+        follows on from this one.
+        """
+        return WhisperAttackConfiguration(self.app_location, self.app_data_location, self.version + 1)
+
+    def get_watched_files(self) -> list[str]:
+        """
+        Returns the configuration files that are reloaded when changed.
+        """
+        files = [
+            os.path.join(location, file_name)
+            for location in (self.app_location, self.app_data_location)
+            for file_name in ("settings.cfg", "word_mappings.txt", "fuzzy_words.txt")
+        ]
+        if self.command_grammar_file is not None:
+            files.append(self.command_grammar_file)
+        return files
+
     def add_word_mapping(self, location: str, aliases: str, replacement: str) -> None:
         """
-        Adds a new alias and replacement to the word mappings
+        Adds a new alias and replacement to the word mappings file. This
+        configuration is left unchanged, use with_word_mapping for a
+        configuration that includes the mapping.
         """
         if aliases.strip() == "":
             return None
 
-        list(map(lambda alias: self.word_mappings.update({ alias: replacement }), aliases.split(';')))
         word_mappings_file = os.path.join(location, "word_mappings.txt")
         try:
             with open(word_mappings_file, 'a', encoding='utf-8') as f:
@@ -134,6 +205,35 @@ class WhisperAttackConfiguration:
             logging.error("Failed to add new word mapping to word_mappings.txt file: %s", error)
             raise ConfigurationError("Failed to add new word mapping to word_mappings.txt file") from error
 
+    def with_word_mapping(self, aliases: str, replacement: str) -> "WhisperAttackConfiguration":
+        """
+        Returns a copy of this configuration with the alias and replacement
+        added to its word mappings, without loading the files again. This
+        configuration is left unchanged so that it can still be used until
+        the copy is swapped in. The version of the copy follows on from this one.
+        """
+        config = copy.copy(self)
+        config.word_mappings = dict(self.word_mappings)
+        config.word_mapping_matcher = self.word_mapping_matcher.copy()
+        for alias in aliases.split(';'):
+            config.word_mappings[alias] = replacement.strip()
+            config.word_mapping_matcher.add(alias, replacement.strip())
+        config.version = self.version + 1
+        return config
+
+    def get_version(self) -> int:
+        """
+        Returns the version of the word mappings and fuzzy words,
+        this changes whenever either of them change
+        """
+        return self.version
+
+    def get_app_data_location(self) -> str:
+        """
+        Returns the directory that custom configuration and data are kept in
+        """
+        return self.app_data_location
+
     def get_configuration(self) -> dict[str, str]:
         """
         Return the full configuration
@@ -146,12 +246,40 @@ class WhisperAttackConfiguration:
         """
         return self.word_mappings
 
+    def get_word_mapping_matcher(self) -> WordMappingMatcher:
+        """
+        Returns the matcher used to replace words with their mapped values
+        """
+        return self.word_mapping_matcher
+
     def get_fuzzy_words(self) -> list[str]:
         """
         Returns the fuzzy words list
         """
         return self.fuzzy_words
 
+    def get_fuzzy_matcher(self) -> FuzzyWordMatcher:
+        """
+        Returns the matcher used to fuzzy match the fuzzy words
+        """
+        return self.fuzzy_matcher
+
+    def get_command_grammar(self) -> CommandGrammar | None:
+        """
+        Returns the VoiceAttack command phrases that transcriptions are
+        matched against, or None when command_grammar is not set
+        """
+        return self.command_grammar
+
+    def get_command_grammar_threshold(self) -> float:
+        """
+        Returns the lowest score (0 to 100) for a transcription to be
+        replaced with the command phrase that it matches.
+        Default is 85.
+        """
+        command_grammar_threshold = self.config.get("command_grammar_threshold", 85)
+        return float(command_grammar_threshold)
+
     def get_whisper_model(self) -> str:
         """
         Returns the Whisper model to use for speech-to-text
@@ -182,6 +310,232 @@ class WhisperAttackConfiguration:
         """
         return self.config.get("whisper_core_type", "tensor")
 
+    def get_auto_tune(self) -> bool:
+        """
+        Returns whether the compute type and number of CPU threads that the
+        Whisper model is loaded with are chosen by timing the model on this
+        machine, rather than from the device and core type.
+        Default is true.
+        """
+        return self.config.get("auto_tune", "true").lower() == "true"
+
+    def get_cpu_threads(self) -> int:
+        """
+        Returns the number of CPU threads used by the Whisper model,
+        0 uses the calibrated number of threads, or CTranslate2's default
+        when auto_tune is disabled.
+        Default is 0.
+        """
+        cpu_threads = self.config.get("cpu_threads", 0)
+        return int(cpu_threads)
+
+    def get_initial_prompt(self) -> str:
+        """
+        Returns the prompt given to Whisper to guide the transcription towards
+        DCS vocabulary. {fuzzy_words} in the prompt is replaced with the
+        fuzzy words separated by commas.
+        Default is a prompt listing DCS callsigns and the phonetic alphabet.
+        """
+        initial_prompt = self.config.get("initial_prompt", DEFAULT_INITIAL_PROMPT)
+        return initial_prompt.replace("{fuzzy_words}", ", ".join(self.fuzzy_words))
+
+    def get_beam_size(self) -> int:
+        """
+        Returns the number of beams used when decoding, 1 is greedy decoding
+        which is faster but can be less accurate.
+        Default is 5.
+        """
+        beam_size = self.config.get("beam_size", 5)
+        return int(beam_size)
+
+    def get_temperature(self) -> list[float]:
+        """
+        Returns the temperatures that decoding falls back to, in order, when
+        the decoded text is repetitive or has a low log probability.
+        Default is 0.0,0.2,0.4,0.6,0.8,1.0
+        """
+        temperature = self.config.get("temperature", "0.0,0.2,0.4,0.6,0.8,1.0")
+        return [float(value) for value in temperature.split(",") if value.strip()]
+
+    def get_suppress_tokens(self) -> list[int]:
+        """
+        Returns the ids of the tokens that Whisper must not decode,
+        -1 suppresses the non-speech symbols.
+        Default is 0,11,13,30,986, which are punctuation tokens.
+        """
+        suppress_tokens = self.config.get("suppress_tokens", "0,11,13,30,986")
+        return [int(value) for value in suppress_tokens.split(",") if value.strip()]
+
+    def get_without_timestamps(self) -> bool:
+        """
+        Returns whether Whisper should decode only text tokens without
+        the timestamp tokens, which decodes fewer tokens.
+        Default is false.
+        """
+        return self.config.get("without_timestamps", "false").lower() == "true"
+
+    def get_condition_on_previous_text(self) -> bool:
+        """
+        Returns whether the text decoded from one 30 second window is used
+        as the prompt for the next window of a long recording.
+        Default is true.
+        """
+        return self.config.get("condition_on_previous_text", "true").lower() == "true"
+
+    def get_save_recording(self) -> bool:
+        """
+        Returns whether each recording should also be saved to a wav file
+        in the temp directory for debugging. Recordings are otherwise only
+        kept in memory.
+        Default is false.
+        """
+        return self.config.get("save_recording", "false").lower() == "true"
+
+    def get_streaming_transcription(self) -> bool:
+        """
+        Returns whether recordings should be transcribed in the background
+        while the push-to-talk key is still held so that only the unfinished
+        end of the recording needs to be transcribed when it is released.
+        Default is false.
+        """
+        return self.config.get("streaming_transcription", "false").lower() == "true"
+
+    def get_streaming_interval(self) -> int:
+        """
+        Returns the interval in milliseconds between background transcription
+        passes when streaming transcription is enabled.
+        Default is 500 milliseconds.
+        """
+        streaming_interval = self.config.get("streaming_interval", 500)
+        return int(streaming_interval)
+
+    def get_always_armed(self) -> bool:
+        """
+        Returns whether the microphone should be kept open between recordings.
+        This avoids the delay of opening the device when recording starts and
+        allows the pre-roll audio from just before the start to be included.
+        Default is false.
+        """
+        return self.config.get("always_armed", "false").lower() == "true"
+
+    def get_pre_roll(self) -> int:
+        """
+        Returns the amount of audio in milliseconds from before recording
+        was started to include in each recording when always armed.
+        Default is 500 milliseconds.
+        """
+        pre_roll = self.config.get("pre_roll", 500)
+        return int(pre_roll)
+
+    def get_vad_enabled(self) -> bool:
+        """
+        Returns whether silence should be trimmed from the start and end
+        of recordings before they are transcribed. Recordings without
+        any speech are then not transcribed at all.
+        Default is true.
+        """
+        return self.config.get("vad_enabled", "true").lower() == "true"
+
+    def get_vad_threshold(self) -> float:
+        """
+        Returns the level in dBFS that audio must be louder than to be
+        detected as speech when trimming silence.
+        Default is -50.
+        """
+        vad_threshold = self.config.get("vad_threshold", -50)
+        return float(vad_threshold)
+
+    def get_text_cache_size(self) -> int:
+        """
+        Returns the number of raw transcriptions to cache the cleaned up
+        text for, 0 disables the cache.
+        Default is 256.
+        """
+        text_cache_size = self.config.get("text_cache_size", 256)
+        return int(text_cache_size)
+
+    def get_cascade_model(self) -> str:
+        """
+        Returns the smaller Whisper model that recordings are transcribed
+        with first, the Whisper model is then only used when the smaller
+        model is not confident of its transcription.
+        Default is empty, which transcribes with the Whisper model only.
+        """
+        return self.config.get("cascade_model", "").strip()
+
+    def get_cascade_min_logprob(self) -> float:
+        """
+        Returns the lowest average log probability of the segments decoded by
+        the cascade model for its transcription to be used.
+        Default is -0.5.
+        """
+        cascade_min_logprob = self.config.get("cascade_min_logprob", -0.5)
+        return float(cascade_min_logprob)
+
+    def get_cascade_max_no_speech_prob(self) -> float:
+        """
+        Returns the highest probability of a segment decoded by the cascade
+        model containing no speech for its transcription to be used.
+        Default is 0.5.
+        """
+        cascade_max_no_speech_prob = self.config.get("cascade_max_no_speech_prob", 0.5)
+        return float(cascade_max_no_speech_prob)
+
+    def get_cascade_min_fuzzy_score(self) -> float:
+        """
+        Returns the lowest fuzzy match score of the words corrected in the
+        transcription of the cascade model for its transcription to be used.
+        Default is 90.
+        """
+        cascade_min_fuzzy_score = self.config.get("cascade_min_fuzzy_score", 90)
+        return float(cascade_min_fuzzy_score)
+
+    def get_config_reload_interval(self) -> int:
+        """
+        Returns the interval in milliseconds between checks for changes to
+        the configuration files, 0 disables reloading changed files.
+        Default is 2000 milliseconds.
+        """
+        config_reload_interval = self.config.get("config_reload_interval", 2000)
+        return int(config_reload_interval)
+
+    def get_audio_cache_size(self) -> int:
+        """
+        Returns the maximum size in megabytes of the on-disk cache of text
+        transcribed from identical audio, 0 disables the cache.
+        Default is 0.
+        """
+        audio_cache_size = self.config.get("audio_cache_size", 0)
+        return int(audio_cache_size)
+
+    def get_max_sessions(self) -> int:
+        """
+        Returns the maximum number of sessions, each recording a different
+        seat, that can share the Whisper model.
+        Default is 4.
+        """
+        max_sessions = self.config.get("max_sessions", 4)
+        return int(max_sessions)
+
+    def get_batch_window(self) -> int:
+        """
+        Returns how long in milliseconds after a recording has stopped to wait
+        for the stop commands of other sessions, which are still recording,
+        so that their recordings can be transcribed together in one batch.
+        Default is 100.
+        """
+        batch_window = self.config.get("batch_window", 100)
+        return int(batch_window)
+
+    def get_batch_size(self) -> int:
+        """
+        Returns the maximum number of recordings that are transcribed
+        together in one batch, 1 disables batching.
+        Default is 8.
+        """
+        batch_size = self.config.get("batch_size", 8)
+        return int(batch_size)
+
     def get_theme(self) -> str:
         """
         Returns the name of the theme to be used when displaying
@@ -215,3 +569,46 @@ class WhisperAttackConfiguration:
         """
         line_length = self.config.get("text_line_length", 53)
         return int(line_length)
+
+    def get_kneeboard_page_lines(self) -> int:
+        """
+        Returns the number of lines on a DCS kneeboard page, a note that
+        would be split across two pages is started on a new page.
+        0 does not split the notes into pages.
+        Default is 0.
+        """
+        page_lines = self.config.get("kneeboard_page_lines", 0)
+        return int(page_lines)
+
+    def get_log_level(self) -> str:
+        """
+        Returns the lowest level that is written to the log file,
+        DEBUG, INFO, WARNING or ERROR.
+        Default is INFO.
+        """
+        return self.config.get("log_level", "INFO")
+
+    def get_log_max_size(self) -> int:
+        """
+        Returns the size in megabytes that the log file and the events file
+        are rotated at, 0 never rotates them.
+        Default is 10.
+        """
+        log_max_size = self.config.get("log_max_size", 10)
+        return int(log_max_size)
+
+    def get_log_backup_count(self) -> int:
+        """
+        Returns the number of rotated log files and events files that are kept.
+        Default is 5.
+        """
+        log_backup_count = self.config.get("log_backup_count", 5)
+        return int(log_backup_count)
+
+    def get_event_log(self) -> bool:
+        """
+        Returns whether an event for each transcription, with the time taken
+        by each stage and the text, is written to a JSON-lines file.
+        Default is true.
+        """
+        return self.config.get("event_log", "true").lower() == "true"
@@ -0,0 +1,98 @@
+import re
+from functools import lru_cache
+from wcwidth import wcswidth
+
+@lru_cache(maxsize=4096)
+def get_word_width(word: str) -> int:
+    """
+    Returns the display width of a word, the same words are dictated
+    repeatedly so the widths are cached.
+    """
+    width = wcswidth(word)
+    # Words with characters that have no display width are counted by their length
+    return width if width >= 0 else len(word)
+
+def pad_line(words: list[str], widths: list[int], line_length: int) -> str:
+    """
+    Left-justify the words, padding the line to the line length.
+    """
+    padding = line_length - sum(widths) - (len(words) - 1)
+    return " ".join(words) + " " * max(padding, 0)
+
+def justify_line(words: list[str], widths: list[int], line_length: int) -> str:
+    """
+    Justify the words from left to right, the remaining spaces are
+    distributed between the words from left to right.
+    """
+    if len(words) == 1:
+        return pad_line(words, widths, line_length)
+    total_spaces = line_length - sum(widths)
+    gaps = len(words) - 1
+    spaces, extra = divmod(total_spaces, gaps)
+    parts = []
+    for i, word in enumerate(words[:-1]):
+        parts.append(word)
+        parts.append(" " * (spaces + (1 if i < extra else 0)))
+    # The last word is added without extra spaces after it
+    parts.append(words[-1])
+    return "".join(parts)
+
+class KneeboardDocument:
+    """
+    The notes sent to the DCS kneeboard, formatted for word wrapping.
+    This is based on the original code from BojotecX WhisperKneeboard
+    https://github.com/BojoteX/KneeboardWhisper
+
+    Lines that have already been sent are never laid out again, only the
+    number of lines is kept, so that appending a note only lays out the
+    words of the new note and neither the cost nor the memory grows with the
+    length of the document. Each note is followed by a blank line. When a
+    page length is set a note that would be split across two pages starts
+    on a new page, unless it is longer than a page.
+    """
+    def __init__(self, line_length: int, page_lines: int = 0):
+        self.line_length = line_length
+        self.page_lines = page_lines
+        self.line_count = 0
+
+    def layout_note(self, text: str) -> list[str]:
+        """
+        Wraps the words of a note into justified lines, the last line, and any
+        line ended by a newline, is left-justified.
+        """
+        lines = []
+        words = []
+        widths = []
+        line_width = 0
+        for word in re.findall(r'\S+|\n', text):
+            if word == "\n":
+                if words:
+                    lines.append(pad_line(words, widths, self.line_length))
+                    words, widths, line_width = [], [], 0
+                continue
+            width = get_word_width(word)
+            # A word longer than the line is put on a line of its own
+            if words and line_width + width + len(words) > self.line_length:
+                lines.append(justify_line(words, widths, self.line_length))
+                words, widths, line_width = [], [], 0
+            words.append(word)
+            widths.append(width)
+            line_width += width
+        if words:
+            lines.append(pad_line(words, widths, self.line_length))
+        # Ensure the last line is completely blank
+        lines.append(" " * self.line_length)
+        return lines
+
+    def append_note(self, text: str) -> str:
+        """
+        Appends a note to the end of the document and returns only the
+        lines that were added, which is the text to send to the kneeboard.
+        """
+        lines = self.layout_note(text)
+        if self.page_lines > 0:
+            used = self.line_count % self.page_lines
+            if used and used + len(lines) > self.page_lines and len(lines) <= self.page_lines:
+                lines = [" " * self.line_length] * (self.page_lines - used) + lines
+        self.line_count += len(lines)
+        return "\n".join(lines)
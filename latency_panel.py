@@ -0,0 +1,70 @@
+from typing import Callable
+from tkinter import LEFT
+from ttkbootstrap import Window, Toplevel, Button, Frame, Treeview
+
+# How often the panel is refreshed while it is open
+REFRESH_MS = 1000
+
+class WhisperAttackLatencyStats:
+    """
+    A class used to display a UI with the latency percentiles of each
+    stage of the transcription pipeline, refreshed while it is open.
+    """
+    def __init__(self, root: Window, get_stats: Callable[[], dict[str, dict[str, float]]]):
+        self.get_stats = get_stats
+
+        # Center the modal over the parent window
+        modal_width = 600
+        modal_height = 400
+        parent_x = root.winfo_x()
+        parent_y = root.winfo_y()
+        parent_width = root.winfo_width()
+        parent_height = root.winfo_height()
+        x = parent_x + (parent_width // 2) - (modal_width // 2)
+        y = parent_y + (parent_height // 2) - (modal_height // 2)
+
+        self.modal = Toplevel(
+            title="Pipeline latency",
+            size=(modal_width, modal_height),
+            position=(x, y),
+            transient=root
+        )
+
+        columns = ("count", "p50", "p95", "p99")
+        self.table = Treeview(self.modal, columns=columns, height=12)
+        self.table.heading("#0", text="Stage")
+        self.table.column("#0", width=150)
+        self.table.heading("count", text="Count")
+        self.table.column("count", width=80, anchor="e")
+        for percentile in columns[1:]:
+            self.table.heading(percentile, text=f"{percentile} (ms)")
+            self.table.column(percentile, width=100, anchor="e")
+        self.table.pack(pady=15, padx=10, fill="both", expand=True)
+
+        button_frame = Frame(self.modal)
+        button_frame.pack(pady=15, padx=10, fill="x")
+        Button(
+            button_frame,
+            text="Close",
+            style="secondary.TButton",
+            command=self.modal.destroy
+        ).pack(side=LEFT, padx=10)
+
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Update the table with the latest stats while the modal is open.
+        """
+        if not self.modal.winfo_exists():
+            return None
+        self.table.delete(*self.table.get_children())
+        for stage, values in self.get_stats().items():
+            self.table.insert(
+                "",
+                "end",
+                text=stage,
+                values=(values["count"], f"{values['p50']:.1f}", f"{values['p95']:.1f}", f"{values['p99']:.1f}")
+            )
+        self.modal.after(REFRESH_MS, self.refresh)
+        return None
@@ -0,0 +1,60 @@
+from collections import deque
+from threading import Lock
+import numpy as np
+
+# Order that the pipeline stages are reported in, other stages are reported after these
+STAGES = ["stop", "queue", "streaming", "vad", "decode", "cleanup", "fuzzy", "delivery", "voiceattack", "total"]
+PERCENTILES = [50, 95, 99]
+
+class PipelineStats:
+    """
+    Keeps the time taken by each stage of the transcription pipeline for the
+    most recent utterances. Each stage has a fixed size ring of durations so
+    that memory use does not grow, and the percentiles are only calculated
+    when the stats are requested.
+    """
+    def __init__(self, max_size: int = 500):
+        self.max_size = max_size
+        self.spans = {}
+        self.lock = Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Record the time taken by a stage for one utterance.
+        """
+        with self.lock:
+            if stage not in self.spans:
+                self.spans[stage] = deque(maxlen=self.max_size)
+            self.spans[stage].append(seconds)
+
+    def record_spans(self, spans: dict[str, float]) -> None:
+        """
+        Record the time taken by each stage for one utterance.
+        """
+        for stage, seconds in spans.items():
+            self.record(stage, seconds)
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """
+        Returns the number of recorded utterances and the p50, p95 and p99
+        duration in milliseconds for each stage.
+        """
+        with self.lock:
+            spans = {stage: np.array(durations) for stage, durations in self.spans.items()}
+        stages = [stage for stage in STAGES if stage in spans] + sorted(set(spans) - set(STAGES))
+        stats = {}
+        for stage in stages:
+            percentiles = np.percentile(spans[stage], PERCENTILES) * 1000
+            stats[stage] = {"count": len(spans[stage])} | {
+                f"p{percentile}": round(float(value), 3) for percentile, value in zip(PERCENTILES, percentiles)
+            }
+        return stats
+
+    def format_stats(self) -> list[str]:
+        """
+        Returns a line for each stage with its percentiles.
+        """
+        return [
+            f"{stage}: p50={values['p50']:.1f}ms p95={values['p95']:.1f}ms p99={values['p99']:.1f}ms (n={values['count']})"
+            for stage, values in self.get_stats().items()
+        ]
@@ -0,0 +1,96 @@
+import sys
+import json
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Logger for the JSON-lines event stream, its records are only written to the events file
+EVENT_LOGGER = "whisper_attack.events"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def get_log_level(level: str) -> int:
+    """
+    Returns the logging level with the name, e.g. INFO, or INFO when the name is not a level.
+    """
+    log_level = logging.getLevelName(level.strip().upper())
+    if not isinstance(log_level, int):
+        logging.warning("Unknown log level '%s', using INFO", level)
+        return logging.INFO
+    return log_level
+
+def set_log_level(level: str) -> None:
+    """
+    Change the level that is logged, e.g. when the configuration is reloaded.
+    """
+    logging.getLogger().setLevel(get_log_level(level))
+
+def log_event(event: dict) -> None:
+    """
+    Add an event to the JSON-lines event stream, when the stream is enabled.
+    """
+    events_logger = logging.getLogger(EVENT_LOGGER)
+    if not events_logger.disabled:
+        events_logger.info("%s", json.dumps(event, ensure_ascii=False))
+
+class WhisperAttackLogging:
+    """
+    Logs through a queue so that writing to the log files never blocks the
+    audio capture or transcription. Records are put on the queue by a
+    QueueHandler on the root logger and written by a QueueListener thread.
+    Records logged before the files are opened, e.g. while the configuration
+    that sets the log level is loaded, wait on the queue until they are.
+    The log file is appended to and rotated once it reaches its maximum size,
+    so the logs of previous sessions are kept.
+    """
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        root = logging.getLogger()
+        root.addHandler(QueueHandler(self.queue))
+        root.setLevel(logging.INFO)
+        events_logger = logging.getLogger(EVENT_LOGGER)
+        events_logger.setLevel(logging.INFO)
+        events_logger.disabled = True
+
+    def start(
+        self,
+        log_file: str | None,
+        level: str = "INFO",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        events_file: str | None = None
+    ) -> None:
+        """
+        Start writing the queued records to the log file, or to standard error
+        when no file is given, and the events to the events file when given.
+        The files are rotated once they reach the maximum size, 0 never rotates them.
+        """
+        if self.listener is not None:
+            return None
+        if log_file is not None:
+            log_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        else:
+            log_handler = logging.StreamHandler(sys.stderr)
+        log_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_handler.addFilter(lambda record: record.name != EVENT_LOGGER)
+        handlers = [log_handler]
+        if events_file is not None:
+            events_handler = RotatingFileHandler(events_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            events_handler.setFormatter(logging.Formatter('%(message)s'))
+            events_handler.addFilter(lambda record: record.name == EVENT_LOGGER)
+            handlers.append(events_handler)
+            logging.getLogger(EVENT_LOGGER).disabled = False
+        set_log_level(level)
+        self.listener = QueueListener(self.queue, *handlers)
+        self.listener.start()
+        return None
+
+    def stop(self) -> None:
+        """
+        Write any records still on the queue and close the files.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
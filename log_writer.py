@@ -0,0 +1,25 @@
+import logging
+from theme import TAG_BLACK
+
+class WhisperAttackLogWriter:
+    """
+    A class with the same methods as WhisperAttackWriter that writes to the
+    log instead of the text area within the WhisperAttack window, used when
+    running without a UI. The server already logs what it writes to the
+    window so the lines are logged at debug level to avoid duplicates.
+    """
+    def __init__(self, logger_name: str = "whisper_attack.writer"):
+        self.logger = logging.getLogger(logger_name)
+
+    def write(self, text: str, tag = TAG_BLACK) -> None:
+        """
+        Write a line to the log.
+        """
+        self.logger.debug("[%s] %s", tag, text)
+
+    def write_dict(self, dictionary: dict[str, str], tag = TAG_BLACK) -> None:
+        """
+        Write the dictionary as a formatted set of keys and values.
+        """
+        for key, value in dictionary.items():
+            self.write(f"{key}: {value}", tag)
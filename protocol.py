@@ -0,0 +1,158 @@
+import json
+import socket
+import struct
+import numpy as np
+
+# Framed protocol for the WhisperAttack command port.
+#
+# Every frame starts with an 8 byte header: the magic bytes "WA", the protocol
+# version, the frame type and the length of the payload (big endian).
+# Clients that do not start with the magic bytes are treated as sending the
+# original plain text commands, i.e. "start", "stop" and "shutdown".
+#
+# Request frames contain a JSON object with a "verb", each request receives
+# a JSON response frame with "ok" set to true or false. The "transcribe" verb
+# is followed by audio frames containing raw mono samples at 16kHz, either
+# float32 ("f32le") or signed 16 bit ("s16le") little endian, and ends with an
+# empty audio frame. The response contains the transcribed text and the time
+# taken by each stage in seconds.
+MAGIC = b"WA"
+VERSION = 1
+HEADER = struct.Struct("!2sBBI")
+
+FRAME_REQUEST = 1
+FRAME_AUDIO = 2
+FRAME_RESPONSE = 3
+
+MAX_PAYLOAD_SIZE = 1024 * 1024
+AUDIO_FORMATS = {"f32le": np.dtype("<f4"), "s16le": np.dtype("<i2")}
+
+class ProtocolError(Exception):
+    """
+    Exception class for frames that do not follow the protocol
+    """
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    """
+    Encodes a frame with its header.
+    """
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"Frame payload of {len(payload)} bytes is larger than {MAX_PAYLOAD_SIZE} bytes")
+    return HEADER.pack(MAGIC, VERSION, frame_type, len(payload)) + payload
+
+def encode_message(frame_type: int, message: dict) -> bytes:
+    """
+    Encodes a request or response frame containing a JSON object.
+    """
+    return encode_frame(frame_type, json.dumps(message).encode('utf-8'))
+
+def decode_message(payload: bytes) -> dict:
+    """
+    Decodes the JSON object from a request or response frame.
+    """
+    try:
+        message = json.loads(payload.decode('utf-8'))
+    except ValueError as error:
+        raise ProtocolError(f"Invalid JSON message: {error}") from error
+    if not isinstance(message, dict):
+        raise ProtocolError("Message must be a JSON object")
+    return message
+
+def decode_audio(payload: bytes, audio_format: str) -> np.ndarray:
+    """
+    Decodes the samples in an audio frame to float32.
+    """
+    dtype = AUDIO_FORMATS[audio_format]
+    if len(payload) % dtype.itemsize != 0:
+        raise ProtocolError(f"Audio frame is not a whole number of {audio_format} samples")
+    samples = np.frombuffer(payload, dtype=dtype)
+    if audio_format == "s16le":
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32)
+
+def is_framed(data: bytes) -> bool:
+    """
+    Returns whether the first bytes received from a client start a frame.
+    """
+    return data[:len(MAGIC)] == MAGIC[:len(data)]
+
+class FrameDecoder:
+    """
+    Incrementally decodes frames from the bytes received on a connection.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[tuple[int, bytes]]:
+        """
+        Adds the received bytes and returns the frame type and payload of each complete frame.
+        """
+        self.buffer += data
+        frames = []
+        while len(self.buffer) >= HEADER.size:
+            magic, version, frame_type, length = HEADER.unpack_from(self.buffer)
+            if magic != MAGIC:
+                raise ProtocolError("Invalid frame header")
+            if version != VERSION:
+                raise ProtocolError(f"Unsupported protocol version {version}")
+            if length > MAX_PAYLOAD_SIZE:
+                raise ProtocolError(f"Frame payload of {length} bytes is larger than {MAX_PAYLOAD_SIZE} bytes")
+            if len(self.buffer) < HEADER.size + length:
+                break
+            frames.append((frame_type, bytes(self.buffer[HEADER.size:HEADER.size + length])))
+            del self.buffer[:HEADER.size + length]
+        return frames
+
+class WhisperAttackClient:
+    """
+    A client for the framed protocol, for tools and test harnesses that
+    send commands or upload audio to the WhisperAttack server.
+    """
+    def __init__(self, host: str, port: int, timeout: float = 30.0):
+        self.client_socket = socket.create_connection((host, port), timeout=timeout)
+        self.decoder = FrameDecoder()
+
+    def close(self) -> None:
+        """
+        Close the connection to the server.
+        """
+        self.client_socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def receive_response(self) -> dict:
+        """
+        Waits for the next response from the server.
+        """
+        while True:
+            for frame_type, payload in self.decoder.feed(b""):
+                if frame_type == FRAME_RESPONSE:
+                    return decode_message(payload)
+            data = self.client_socket.recv(65536)
+            if not data:
+                raise ConnectionError("Server closed the connection")
+            self.decoder.buffer += data
+
+    def request(self, verb: str, **arguments) -> dict:
+        """
+        Sends a request and returns the response.
+        """
+        self.client_socket.sendall(encode_message(FRAME_REQUEST, {"verb": verb, **arguments}))
+        return self.receive_response()
+
+    def transcribe(self, audio: np.ndarray, deliver: bool = False, **arguments) -> dict:
+        """
+        Uploads float32 samples at 16kHz to be transcribed and returns the response.
+        When deliver is true the result is also sent to VoiceAttack or the DCS kneeboard.
+        """
+        frames = [encode_message(FRAME_REQUEST, {"verb": "transcribe", "format": "f32le", "sample_rate": 16000, "deliver": deliver, **arguments})]
+        payload = np.asarray(audio, dtype="<f4").tobytes()
+        for start in range(0, len(payload), MAX_PAYLOAD_SIZE):
+            frames.append(encode_frame(FRAME_AUDIO, payload[start:start + MAX_PAYLOAD_SIZE]))
+        frames.append(encode_frame(FRAME_AUDIO, b""))
+        self.client_socket.sendall(b"".join(frames))
+        return self.receive_response()
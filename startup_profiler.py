@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import ctypes
+import builtins
+import logging
+import threading
+
+def get_resident_memory() -> int | None:
+    """
+    Returns the resident memory (working set) of the process in bytes,
+    or None when it cannot be determined on this platform.
+    """
+    if sys.platform == "win32":
+        from ctypes import wintypes
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    if os.path.isfile("/proc/self/statm"):
+        with open("/proc/self/statm", 'r', encoding='utf-8') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return None
+
+class StartupProfiler:
+    """
+    Measures the application startup when run with --profile-startup.
+    Every top level import is timed so that the modules slowing down
+    the time until the system tray icon is shown can be found.
+    """
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.original_import = None
+        self.import_times = {}
+        self.milestones = []
+        self.local = threading.local()
+
+    def install(self) -> None:
+        """
+        Start timing imports.
+        """
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+
+    def uninstall(self) -> None:
+        """
+        Stop timing imports.
+        """
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """
+        Replacement for the builtin import that records the total time taken
+        to import a module and the time excluding the modules it imports.
+        """
+        if level != 0 or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.import_times[name] = (elapsed, elapsed - nested)
+
+    def mark(self, milestone: str) -> None:
+        """
+        Record the time since startup that a milestone was reached.
+        """
+        self.milestones.append((milestone, time.perf_counter() - self.start_time))
+
+    def report(self, limit: int = 30, target: str = "system tray icon") -> str:
+        """
+        Stop timing imports and log the startup breakdown, up to the target,
+        e.g. the system tray icon being shown.
+        Returns a one line summary.
+        """
+        self.uninstall()
+        elapsed = time.perf_counter() - self.start_time
+        memory = get_resident_memory()
+        memory_text = f"{memory / (1024 * 1024):.1f} MB" if memory is not None else "unknown"
+        logging.info("Startup profile, %.3f seconds to %s, resident memory %s", elapsed, target, memory_text)
+        for milestone, at in self.milestones:
+            logging.info("  %8.3fs  %s", at, milestone)
+        logging.info("Slowest imports (total / self seconds):")
+        slowest = sorted(self.import_times.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (total, own) in slowest[:limit]:
+            logging.info("  %8.3f  %8.3f  %s", total, own, name)
+        return f"Startup took {elapsed:.3f} seconds to the {target}, resident memory {memory_text}"
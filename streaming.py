@@ -0,0 +1,99 @@
+import logging
+from threading import Event, Thread
+from typing import Callable
+import numpy as np
+from audio_capture import AudioBuffer, SAMPLE_RATE
+
+# Minimum amount of uncommitted audio before a background pass is run
+MIN_PASS_SAMPLES = SAMPLE_RATE // 2
+
+def normalise_word(word: str) -> str:
+    """
+    Normalise a decoded word so that words from different passes can be compared.
+    """
+    return word.strip(" .,!?").lower()
+
+class StreamingTranscriber:
+    """
+    Transcribes the audio buffer in the background while it is still being recorded.
+    Each pass decodes the audio that has not yet been committed, words that are
+    decoded identically at the start of two consecutive passes are committed.
+    The committed text is used as the prompt for the next pass and the audio
+    it covers is not decoded again, so when recording stops only the
+    unfinished tail of the recording needs to be transcribed.
+    """
+    def __init__(self, buffer: AudioBuffer, decode: Callable[[np.ndarray, str, bool], list], interval: float):
+        self.buffer = buffer
+        self.decode = decode
+        self.interval = interval
+        self.committed_text = ""
+        self.committed_samples = 0
+        # Length of the buffer when the last pass was run
+        self.decoded_samples = 0
+        self.previous_words = []
+        self.passes = 0
+        self.stop_event = Event()
+        self.thread = Thread(daemon=True, target=self.run)
+
+    def start(self) -> None:
+        """
+        Start decoding in the background.
+        """
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop running passes, e.g. as soon as the recording stops. A pass that
+        is already running is left to finish.
+        """
+        self.stop_event.set()
+
+    def run(self) -> None:
+        """
+        Run a decoding pass every interval until stopped.
+        """
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.decode_pass()
+            except Exception as e:
+                logging.error("Streaming transcription failed, the full recording will be transcribed: %s", e)
+                return None
+        return None
+
+    def decode_pass(self) -> None:
+        """
+        Decode the uncommitted audio and commit the words that agree with the previous pass.
+        """
+        # Nothing new has been recorded since the last pass, e.g. the recording has stopped
+        buffer_samples = len(self.buffer)
+        if buffer_samples == self.decoded_samples or buffer_samples - self.committed_samples < MIN_PASS_SAMPLES:
+            return None
+        self.decoded_samples = buffer_samples
+        audio = self.buffer.get_audio(self.committed_samples, buffer_samples)
+        segments = self.decode(audio, self.committed_text, True)
+        words = [word for segment in segments for word in (segment.words or [])]
+        self.passes += 1
+
+        # The last word may have been cut off by the end of the buffer so it is never committed
+        agreed = 0
+        for current, previous in zip(words[:-1], self.previous_words):
+            if normalise_word(current.word) != normalise_word(previous.word):
+                break
+            agreed += 1
+
+        if agreed > 0:
+            self.committed_text += "".join(word.word for word in words[:agreed])
+            self.committed_samples += int(words[agreed - 1].end * SAMPLE_RATE)
+            logging.debug("Streaming committed text: '%s'", self.committed_text)
+        self.previous_words = words[agreed:]
+        return None
+
+    def finish(self, audio: np.ndarray) -> tuple[str, np.ndarray]:
+        """
+        Wait for decoding in the background to stop and return the committed
+        text along with the remaining audio that still has to be transcribed.
+        """
+        self.stop()
+        self.thread.join()
+        logging.info("Streaming transcription ran %s passes", self.passes)
+        return self.committed_text, audio[self.committed_samples:]
@@ -0,0 +1,46 @@
+import os
+import numpy as np
+from audio_cache import TranscriptionCache
+
+AUDIO = np.linspace(-1, 1, 16000, dtype=np.float32)
+PARAMETERS = {"whisper_model": "small.en", "beam_size": 5}
+
+def test_key_depends_on_audio_and_parameters(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), 1024 * 1024)
+    key = cache.get_key(AUDIO, PARAMETERS)
+    assert key == cache.get_key(AUDIO.astype(np.float64), dict(reversed(PARAMETERS.items())))
+    assert key != cache.get_key(AUDIO[1:], PARAMETERS)
+    assert key != cache.get_key(AUDIO, {**PARAMETERS, "whisper_model": "tiny.en"})
+
+def test_get_and_put(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), 1024 * 1024)
+    key = cache.get_key(AUDIO, PARAMETERS)
+    assert cache.get(key) is None
+    cache.put(key, " Radio check.")
+    assert cache.get(key) == " Radio check."
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+    # Entries are kept on disk for the next time WhisperAttack runs
+    assert TranscriptionCache(str(tmp_path), 1024 * 1024).get(key) == " Radio check."
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), 1024 * 1024)
+    cache.put("a", "first")
+    entry_size = cache.get_stats()["bytes"]
+    cache = TranscriptionCache(str(tmp_path), 2 * entry_size)
+    cache.put("b", "secnd")
+    assert cache.get("a") == "first"
+    cache.put("c", "third")
+    assert cache.get("b") is None
+    assert not os.path.exists(tmp_path / "b.json")
+    assert cache.get("a") == "first"
+    assert cache.get("c") == "third"
+    assert cache.get_stats()["bytes"] == 2 * entry_size
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), 1024 * 1024)
+    cache.put("a", "text")
+    (tmp_path / "a.json").write_text("{", encoding="utf-8")
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from audio_capture import SAMPLE_RATE, AudioBuffer, AudioRecorder, PreRollBuffer
+
+def test_buffer_grows_as_audio_is_appended():
+    buffer = AudioBuffer(initial_seconds=0.001)
+    blocks = [np.full((100, 1), index, dtype=np.float32) for index in range(5)]
+    for block in blocks:
+        buffer.append(block)
+    assert len(buffer) == 500
+    assert buffer.get_duration() == 500 / SAMPLE_RATE
+    assert np.array_equal(buffer.get_audio(), np.concatenate(blocks).reshape(-1))
+    assert np.array_equal(buffer.get_audio(150, 250), np.repeat([1, 2], [50, 50]).astype(np.float32))
+    assert len(buffer.get_audio(450, 1000)) == 50
+
+def test_audio_is_copied():
+    buffer = AudioBuffer()
+    buffer.append(np.ones(10, dtype=np.float32))
+    audio = buffer.get_audio()
+    audio[:] = 0
+    assert buffer.get_audio().sum() == 10
+
+def test_pre_roll_keeps_the_most_recent_audio():
+    pre_roll = PreRollBuffer(10 / SAMPLE_RATE)
+    pre_roll.write(np.arange(4, dtype=np.float32))
+    assert np.array_equal(pre_roll.get_audio(), np.arange(4))
+    pre_roll.write(np.arange(4, 12, dtype=np.float32))
+    assert np.array_equal(pre_roll.get_audio(), np.arange(2, 12))
+    pre_roll.write(np.arange(12, 42, dtype=np.float32))
+    assert np.array_equal(pre_roll.get_audio(), np.arange(32, 42))
+    pre_roll.clear()
+    assert len(pre_roll.get_audio()) == 0
+
+class FakeStream:
+    """
+    Stands in for the input stream, which needs an audio device.
+    """
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_armed_recording_starts_with_the_pre_roll(monkeypatch):
+    recorder = AudioRecorder(pre_roll=0.1)
+    monkeypatch.setattr(recorder, "open_stream", lambda: setattr(recorder, "stream", FakeStream()))
+    recorder.arm()
+    # Audio received while armed and not recording
+    recorder.pre_roll.write(np.ones(SAMPLE_RATE, dtype=np.float32))
+    recorder.start()
+    recorder.buffer.append(np.full(100, 2, dtype=np.float32))
+    audio = recorder.stop()
+    assert np.array_equal(audio, np.repeat([1, 2], [SAMPLE_RATE // 10, 100]).astype(np.float32))
+    # The stream stays open, and the pre-roll before this recording is not used again
+    assert recorder.stream is not None
+    assert len(recorder.pre_roll.get_audio()) == 0
+
+def test_failed_start_abandons_the_recording(monkeypatch):
+    def open_stream():
+        raise OSError("Device unavailable")
+    recorder = AudioRecorder()
+    monkeypatch.setattr(recorder, "open_stream", open_stream)
+    with pytest.raises(OSError):
+        recorder.start()
+    assert recorder.buffer is None
@@ -0,0 +1,53 @@
+import sys
+from types import SimpleNamespace
+import calibration
+from calibration import ModelCalibration, get_calibration_clip, get_thread_counts
+
+class FakeModel:
+    """
+    Stands in for a Whisper model, decoding is faster with int8 and with 4 threads.
+    """
+    loaded = []
+
+    def __init__(self, model_name: str, device: str, compute_type: str, cpu_threads: int):
+        self.loaded.append((compute_type, cpu_threads))
+        self.seconds = (1 if compute_type == "int8" else 2) + abs(cpu_threads - 4) / 10
+
+def test_fastest_combination_is_chosen(monkeypatch):
+    fake_ctranslate2 = SimpleNamespace(get_supported_compute_types=lambda device: {"int8", "float32"})
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake_ctranslate2)
+    monkeypatch.setitem(sys.modules, "faster_whisper", SimpleNamespace(WhisperModel=FakeModel))
+    monkeypatch.setattr(calibration, "get_thread_counts", lambda: [2, 4, 8])
+    monkeypatch.setattr(ModelCalibration, "time_decoding", lambda self, model, clip, beam_size: model.seconds)
+    FakeModel.loaded = []
+    result = ModelCalibration("").calibrate("tiny.en", "cpu", None, 0, 1, lambda message: None)
+    assert result["compute_type"] == "int8"
+    assert result["cpu_threads"] == 4
+    assert result["timings"] == {"int8/4": 1.0, "float32/4": 2.0, "int8/2": 1.2, "int8/8": 1.4}
+    # The compute types are timed with one thread count, then only the fastest is timed with the others
+    assert len(FakeModel.loaded) == 4
+
+def test_configured_settings_are_not_varied(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ctranslate2", SimpleNamespace(get_supported_compute_types=lambda device: {"int8", "float32"}))
+    monkeypatch.setitem(sys.modules, "faster_whisper", SimpleNamespace(WhisperModel=FakeModel))
+    monkeypatch.setattr(ModelCalibration, "time_decoding", lambda self, model, clip, beam_size: model.seconds)
+    FakeModel.loaded = []
+    result = ModelCalibration("").calibrate("tiny.en", "cpu", "float32", 2, 1, lambda message: None)
+    assert (result["compute_type"], result["cpu_threads"]) == ("float32", 2)
+    assert FakeModel.loaded == [("float32", 2)]
+
+def test_calibrations_are_kept(tmp_path):
+    kept = ModelCalibration(str(tmp_path))
+    assert kept.get("tiny.en|cpu") is None
+    kept.put("tiny.en|cpu", {"compute_type": "int8", "cpu_threads": 4})
+    assert ModelCalibration(str(tmp_path)).get("tiny.en|cpu") == {"compute_type": "int8", "cpu_threads": 4}
+    kept.clear()
+    assert kept.get("tiny.en|cpu") is None
+    (tmp_path / calibration.CALIBRATION_FILE).write_text("{", encoding="utf-8")
+    assert kept.get("tiny.en|cpu") is None
+
+def test_clip_and_thread_counts():
+    clip = get_calibration_clip()
+    assert len(clip) == calibration.CLIP_SECONDS * calibration.SAMPLE_RATE
+    assert (clip == get_calibration_clip()).all()
+    assert get_thread_counts() == sorted(set(get_thread_counts()))
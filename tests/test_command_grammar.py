@@ -0,0 +1,46 @@
+from command_grammar import CommandGrammar, expand_command_string, load_command_strings, normalise_words
+
+def test_expand_command_string():
+    assert expand_command_string("request [startup;taxi] [please;]") == [
+        "request startup please", "request taxi please", "request startup", "request taxi"
+    ]
+    assert expand_command_string("channel [1..3];radio check") == ["channel 1", "channel 2", "channel 3", "radio check"]
+
+def test_normalise_words_keeps_digits_read_one_at_a_time():
+    assert normalise_words("Enfield one one, request picture.") == ["enfield", "1", "1", "request", "picture"]
+    assert normalise_words("Enfield 1-1") == ["enfield", "1", "1"]
+    assert normalise_words("channel twenty-one") == ["channel", "21"]
+    assert normalise_words("runway zero one") == normalise_words("runway 01") == ["runway", "0", "1"]
+
+def test_match_spoken_callsign():
+    grammar = CommandGrammar(["Enfield [1..9] [1..4] request picture"])
+    assert grammar.match("enfield one one request picture", 85) == ("Enfield 1 1 request picture", 100.0)
+    assert grammar.match("Enfield 2-3, request picture.", 85) == ("Enfield 2 3 request picture", 100.0)
+
+def test_match_close_transcription():
+    grammar = CommandGrammar(["request [startup;taxi to runway]", "radio check"])
+    phrase, score = grammar.match("request start up", 85)
+    assert phrase == "request startup"
+    assert score >= 85
+    phrase, _score = grammar.match("request taxi to runaway", 85)
+    assert phrase == "request taxi to runway"
+
+def test_match_rejects_other_text():
+    grammar = CommandGrammar(["Enfield [1..9] [1..4] [request picture;bingo fuel;radio check]"])
+    assert grammar.match("request a new flight plan please", 85) is None
+    assert grammar.match(" ".join(["the weather is nice and I would like to go flying"] * 3), 85) is None
+    assert grammar.match("", 85) is None
+
+def test_load_command_strings(tmp_path):
+    text_file = tmp_path / "commands.txt"
+    text_file.write_text("# comment\nradio check\n\nrequest [startup;taxi]\n", encoding="utf-8")
+    assert load_command_strings(str(text_file)) == ["radio check", "request [startup;taxi]"]
+
+    profile_file = tmp_path / "profile.vap"
+    profile_file.write_text(
+        "<Profile><Commands><Command><CommandString>radio check</CommandString></Command>"
+        "<Command><CommandString>channel [1..2]</CommandString></Command></Commands></Profile>",
+        encoding="utf-8"
+    )
+    assert load_command_strings(str(profile_file)) == ["radio check", "channel [1..2]"]
+    assert len(CommandGrammar(load_command_strings(str(profile_file)))) == 3
@@ -0,0 +1,65 @@
+import os
+import time
+from threading import Event
+from config_watcher import ConfigurationWatcher
+from configuration import WhisperAttackConfiguration
+
+APP_LOCATION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_reload_builds_a_new_snapshot(tmp_path):
+    config = WhisperAttackConfiguration(APP_LOCATION, str(tmp_path))
+    (tmp_path / "settings.cfg").write_text("beam_size=1\n", encoding="utf-8")
+    reloaded = config.reload()
+    assert reloaded is not config
+    assert reloaded.get_configuration()["beam_size"] == "1"
+    assert config.get_configuration().get("beam_size") != "1"
+    assert reloaded.get_version() == config.get_version() + 1
+
+def test_word_mapping_is_added_to_a_copy(tmp_path):
+    config = WhisperAttackConfiguration(APP_LOCATION, str(tmp_path))
+    config.add_word_mapping(str(tmp_path), "enfeld;enfielt", "Enfield")
+    copy = config.with_word_mapping("enfeld;enfielt", "Enfield")
+    assert copy.word_mapping_matcher.replace("enfeld 1 1, enfielt 1 2") == "Enfield 1 1, Enfield 1 2"
+    assert copy.get_version() == config.get_version() + 1
+    # The configuration in use is unchanged
+    assert config.word_mapping_matcher.replace("enfeld") == "enfeld"
+    assert "enfeld" not in config.get_word_mappings()
+    # The mapping is also loaded from the custom word mappings file
+    assert config.reload().get_word_mappings()["enfielt"] == "Enfield"
+
+def test_watcher_reloads_once_files_stop_changing(tmp_path):
+    settings_file = tmp_path / "settings.cfg"
+    settings_file.write_text("beam_size=1\n", encoding="utf-8")
+    changed = Event()
+    watcher = ConfigurationWatcher(lambda: [str(settings_file)], changed.set, 0.02)
+    watcher.start()
+    try:
+        wait_for(lambda: watcher.last_seen)
+        settings_file.write_text("beam_size=5\n", encoding="utf-8")
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
+
+def test_watcher_ignores_changes_marked_as_seen(tmp_path):
+    word_mappings_file = tmp_path / "word_mappings.txt"
+    word_mappings_file.write_text("atel=Hotel\n", encoding="utf-8")
+    changes = []
+    watcher = ConfigurationWatcher(lambda: [str(word_mappings_file)], lambda: changes.append(True), 0.02)
+    watcher.start()
+    try:
+        wait_for(lambda: watcher.last_seen)
+        with open(word_mappings_file, 'a', encoding='utf-8') as f:
+            f.write("\nleema=Lima")
+        watcher.mark_seen(str(word_mappings_file))
+        time.sleep(0.2)
+        assert changes == []
+    finally:
+        watcher.stop()
@@ -0,0 +1,29 @@
+from text_matching import FuzzyWordMatcher
+from whisper_server import correct_dcs_and_phonetics_separately, phonetic_matcher
+
+DCS_WORDS = ["Enfield", "Springfield", "Kobuleti", "Mineralnye Vody", "Overlord"]
+
+def test_best_matches_keeps_original_casing():
+    matcher = FuzzyWordMatcher(DCS_WORDS, threshold=85)
+    matches = matcher.best_matches(["springfeld", "kobuleti", "weather"], 1)
+    assert matches[0][0] == "Springfield"
+    assert matches[0][1] >= 85
+    assert matches[1] == ("Kobuleti", 100.0)
+    assert matches[2] is None
+
+def test_entries_grouped_by_word_count():
+    matcher = FuzzyWordMatcher([*DCS_WORDS, "enfield", " ", "Mineralnye Vody"])
+    assert sorted(matcher.get_word_counts()) == [1, 2]
+    assert matcher.best_matches(["mineralnye vodi"], 2)[0][0] == "Mineralnye Vody"
+    assert matcher.best_matches(["mineralnye vodi"], 3) == [None]
+    assert matcher.best_matches([], 1) == []
+
+def test_correct_dcs_and_phonetics():
+    dcs_matcher = FuzzyWordMatcher(DCS_WORDS, threshold=85)
+    text = "Overlard, Enfeld 1 1, request vector to mineralnye vodi, hotell"
+    corrected = correct_dcs_and_phonetics_separately(text.replace(",", ""), dcs_matcher, phonetic_matcher)
+    assert corrected == "Overlord Enfield 1 1 request vector to Mineralnye Vody Hotel"
+
+def test_short_words_are_not_corrected():
+    dcs_matcher = FuzzyWordMatcher(["Colt", "Uzi"], threshold=85)
+    assert correct_dcs_and_phonetics_separately("colt uzi", dcs_matcher, phonetic_matcher) == "colt uzi"
@@ -0,0 +1,62 @@
+import os
+import socket
+from threading import Event, Thread
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from configuration import WhisperAttackConfiguration
+from log_writer import WhisperAttackLogWriter
+from protocol import WhisperAttackClient
+from whisper_server import WhisperServer
+
+APP_LOCATION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class FakeModel:
+    """
+    Stands in for the Whisper model, every recording is transcribed as the same text.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.hf_tokenizer = SimpleNamespace(encode=lambda text, add_special_tokens=True: SimpleNamespace(ids=[0] * len(text.split())))
+
+    def transcribe(self, audio, **_parameters):
+        segment = SimpleNamespace(text=self.text, words=[], avg_logprob=-0.1, no_speech_prob=0.01)
+        return [segment], SimpleNamespace(duration=len(audio) / 16000)
+
+def get_free_port() -> int:
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+@pytest.fixture
+def server(tmp_path):
+    """
+    Runs the server without the UI, with the model replaced by a fake model.
+    """
+    (tmp_path / "settings.cfg").write_text("vad_enabled=false\nconfig_reload_interval=0\n", encoding="utf-8")
+    config = WhisperAttackConfiguration(APP_LOCATION, str(tmp_path))
+    exit_event = Event()
+    whisper_server = WhisperServer(config, WhisperAttackLogWriter(), exit_event.set, exit_event, "127.0.0.1", get_free_port())
+    whisper_server.load_whisper_model = lambda _config: (FakeModel(" Gulf, request taxi to runway zero one."), None, {})
+    thread = Thread(target=whisper_server.run_server, daemon=True)
+    thread.start()
+    # The model is loaded once the server is listening
+    assert whisper_server.model_ready.wait(10)
+    yield whisper_server
+    exit_event.set()
+    thread.join(10)
+    assert not thread.is_alive()
+
+def test_uploaded_audio_is_transcribed_and_cleaned_up(server):
+    with WhisperAttackClient(server.host, server.port, timeout=10) as client:
+        response = client.transcribe(np.zeros(16000, dtype=np.float32))
+        assert response["ok"]
+        assert response["text"] == "Golf request taxi to runway 0 1"
+        assert "decode" in response["timings"]
+        stats = client.request("stats")
+        assert stats["ok"]
+
+def test_invalid_session_is_rejected(server):
+    with WhisperAttackClient(server.host, server.port, timeout=10) as client:
+        response = client.request("start", session="not a valid session!")
+        assert not response["ok"]
@@ -0,0 +1,62 @@
+import re
+from kneeboard import KneeboardDocument
+
+NOTES = [
+    "Tanker Texaco on channel 101X, angels 20, 280 knots",
+    "Bullseye 045 for 30, bandits heading west\nhold at waypoint 3",
+    "a supercalifragilisticexpialidocious word longer than the line",
+    "short",
+]
+
+def baseline_format_for_dcs_kneeboard(text: str, line_length: int) -> str:
+    """
+    The formatting of each note before the kneeboard document was kept,
+    for text where every character is one column wide.
+    """
+    lines = []
+    current_words = []
+    current_len = 0
+    for word in re.findall(r'\S+|\n', text):
+        if current_len + len(word) + len(current_words) > line_length:
+            if len(current_words) == 1:
+                lines.append(current_words[0].ljust(line_length))
+            else:
+                total_spaces = line_length - sum(len(current_word) for current_word in current_words)
+                gaps = len(current_words) - 1
+                spaces = [total_spaces // gaps + (1 if i < total_spaces % gaps else 0) for i in range(gaps)]
+                lines.append("".join(current_word + " " * space for current_word, space in zip(current_words, spaces)) + current_words[-1])
+            current_words = [word]
+            current_len = len(word)
+        else:
+            current_words.append(word)
+            current_len += len(word)
+    if current_words:
+        lines.append(' '.join(current_words).ljust(line_length))
+    lines.append(' ' * line_length)
+    return '\n'.join(lines)
+
+def test_single_line_notes_match_baseline():
+    document = KneeboardDocument(30)
+    for note in NOTES:
+        if "\n" not in note:
+            assert document.append_note(note) == baseline_format_for_dcs_kneeboard(note, 30)
+
+def test_newlines_end_a_line():
+    assert KneeboardDocument(30).append_note(NOTES[1]).split("\n") == [
+        "Bullseye  045  for 30, bandits",
+        "heading west                  ",
+        "hold at waypoint 3            ",
+        " " * 30,
+    ]
+
+def test_wide_characters_are_measured_by_display_width():
+    assert KneeboardDocument(10).append_note("北京 tower").split("\n") == ["北京 tower", " " * 10]
+
+def test_notes_are_moved_to_the_next_page():
+    document = KneeboardDocument(10, page_lines=4)
+    first = document.append_note("one two")
+    assert first.split("\n") == ["one two   ", " " * 10]
+    second = document.append_note("three four five six")
+    # The note needs three lines but only two are left on the page
+    assert second.split("\n") == [" " * 10] * 2 + ["three four", "five six  ", " " * 10]
+    assert document.line_count == 7
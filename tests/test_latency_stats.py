@@ -0,0 +1,21 @@
+from latency_stats import PipelineStats
+
+def test_percentiles_in_milliseconds():
+    stats = PipelineStats()
+    for milliseconds in range(1, 101):
+        stats.record_spans({"decode": milliseconds / 1000, "total": milliseconds / 500})
+    result = stats.get_stats()
+    assert result["decode"] == {"count": 100, "p50": 50.5, "p95": 95.05, "p99": 99.01}
+    assert result["total"]["p50"] == 101.0
+
+def test_stages_are_reported_in_pipeline_order():
+    stats = PipelineStats()
+    stats.record_spans({"total": 0.3, "extra": 0.1, "decode": 0.2, "stop": 0.01})
+    assert list(stats.get_stats()) == ["stop", "decode", "total", "extra"]
+    assert stats.format_stats()[0] == "stop: p50=10.0ms p95=10.0ms p99=10.0ms (n=1)"
+
+def test_only_the_most_recent_utterances_are_kept():
+    stats = PipelineStats(max_size=3)
+    for seconds in (10, 1, 1, 1):
+        stats.record("decode", seconds)
+    assert stats.get_stats()["decode"] == {"count": 3, "p50": 1000.0, "p95": 1000.0, "p99": 1000.0}
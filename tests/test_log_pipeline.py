@@ -0,0 +1,48 @@
+import json
+import logging
+import pytest
+from log_pipeline import EVENT_LOGGER, WhisperAttackLogging, get_log_level, log_event
+
+@pytest.fixture
+def log_pipeline():
+    """
+    Logs through a new pipeline, restoring the loggers afterwards.
+    """
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    pipeline = WhisperAttackLogging()
+    yield pipeline
+    pipeline.stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    logging.getLogger(EVENT_LOGGER).disabled = True
+
+def test_records_before_start_are_written(log_pipeline, tmp_path):
+    logging.debug("Loading configuration")
+    logging.info("Loading default configuration")
+    log_pipeline.start(str(tmp_path / "WhisperAttack.log"), level="DEBUG")
+    logging.warning("Started")
+    log_pipeline.stop()
+    lines = (tmp_path / "WhisperAttack.log").read_text(encoding="utf-8").splitlines()
+    assert [line.split(" - ", 1)[1] for line in lines] == ["INFO - Loading default configuration", "WARNING - Started"]
+
+def test_events_are_only_written_to_the_events_file(log_pipeline, tmp_path):
+    log_event({"utterance": 0})
+    log_pipeline.start(str(tmp_path / "WhisperAttack.log"), events_file=str(tmp_path / "WhisperAttack.events.jsonl"))
+    log_event({"utterance": 1, "final_text": "Radio check"})
+    logging.info("Transcribed")
+    log_pipeline.stop()
+    events = (tmp_path / "WhisperAttack.events.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(event) for event in events] == [{"utterance": 1, "final_text": "Radio check"}]
+    assert "utterance" not in (tmp_path / "WhisperAttack.log").read_text(encoding="utf-8")
+
+def test_log_files_are_rotated(log_pipeline, tmp_path):
+    log_pipeline.start(str(tmp_path / "WhisperAttack.log"), max_bytes=200, backup_count=2)
+    for index in range(20):
+        logging.info("Message %s", index)
+    log_pipeline.stop()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["WhisperAttack.log", "WhisperAttack.log.1", "WhisperAttack.log.2"]
+
+def test_get_log_level():
+    assert get_log_level(" debug ") == logging.DEBUG
+    assert get_log_level("verbose") == logging.INFO
@@ -0,0 +1,76 @@
+import socket
+import struct
+from threading import Thread
+import numpy as np
+import pytest
+from protocol import (
+    FRAME_AUDIO, FRAME_REQUEST, FRAME_RESPONSE, MAX_PAYLOAD_SIZE, FrameDecoder, ProtocolError,
+    WhisperAttackClient, decode_audio, decode_message, encode_frame, encode_message, is_framed
+)
+
+def test_frames_are_decoded_across_reads():
+    data = encode_message(FRAME_REQUEST, {"verb": "stats"}) + encode_frame(FRAME_AUDIO, b"\x00" * 8)
+    decoder = FrameDecoder()
+    frames = []
+    for position in range(0, len(data), 3):
+        frames.extend(decoder.feed(data[position:position + 3]))
+    assert frames == [(FRAME_REQUEST, b'{"verb": "stats"}'), (FRAME_AUDIO, b"\x00" * 8)]
+    assert decode_message(frames[0][1]) == {"verb": "stats"}
+
+def test_invalid_frames_are_rejected():
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(b"start\nstop\n")
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(struct.pack("!2sBBI", b"WA", 99, FRAME_REQUEST, 0))
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(struct.pack("!2sBBI", b"WA", 1, FRAME_AUDIO, MAX_PAYLOAD_SIZE + 1))
+    with pytest.raises(ProtocolError):
+        encode_frame(FRAME_AUDIO, b"\x00" * (MAX_PAYLOAD_SIZE + 1))
+    with pytest.raises(ProtocolError):
+        decode_message(b"[1, 2]")
+    with pytest.raises(ProtocolError):
+        decode_message(b"{")
+
+def test_plain_text_commands_are_not_framed():
+    assert is_framed(b"WA\x01")
+    assert is_framed(b"W")
+    assert not is_framed(b"start")
+    assert not is_framed(b"stop\n")
+
+def test_decode_audio():
+    samples = np.array([0.0, 0.5, -1.0], dtype="<f4")
+    assert np.array_equal(decode_audio(samples.tobytes(), "f32le"), samples)
+    decoded = decode_audio(np.array([0, 16384, -32768], dtype="<i2").tobytes(), "s16le")
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, samples)
+    with pytest.raises(ProtocolError):
+        decode_audio(b"\x00" * 3, "s16le")
+
+def test_client_uploads_audio():
+    audio = np.linspace(-1, 1, MAX_PAYLOAD_SIZE // 4 + 10, dtype=np.float32)
+    received = {}
+    with socket.create_server(("127.0.0.1", 0)) as server_socket:
+        def serve():
+            connection, _address = server_socket.accept()
+            with connection:
+                decoder = FrameDecoder()
+                chunks = []
+                while True:
+                    for frame_type, payload in decoder.feed(connection.recv(65536)):
+                        if frame_type == FRAME_REQUEST:
+                            received["request"] = decode_message(payload)
+                        elif payload:
+                            chunks.append(payload)
+                        else:
+                            received["audio"] = decode_audio(b"".join(chunks), "f32le")
+                            connection.sendall(encode_message(FRAME_RESPONSE, {"ok": True, "text": "radio check"}))
+                            return None
+        thread = Thread(target=serve, daemon=True)
+        thread.start()
+        with WhisperAttackClient(*server_socket.getsockname(), timeout=5) as client:
+            response = client.transcribe(audio, session="wso")
+        thread.join(5)
+    assert response == {"ok": True, "text": "radio check"}
+    assert received["request"]["verb"] == "transcribe"
+    assert received["request"]["session"] == "wso"
+    assert np.array_equal(received["audio"], audio)
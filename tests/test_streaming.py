@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+import numpy as np
+from audio_capture import SAMPLE_RATE, AudioBuffer
+from streaming import StreamingTranscriber
+
+def decoded(*words: tuple[str, float]) -> list:
+    return [SimpleNamespace(words=[SimpleNamespace(word=word, end=end) for word, end in words])]
+
+class Decoder:
+    """
+    Returns the given results in turn, recording the audio and prompt of each pass.
+    """
+    def __init__(self, *results: list):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, audio: np.ndarray, prompt: str, word_timestamps: bool) -> list:
+        self.calls.append((len(audio), prompt, word_timestamps))
+        return self.results.pop(0)
+
+def test_words_agreed_by_two_passes_are_committed():
+    buffer = AudioBuffer()
+    decoder = Decoder(
+        decoded((" Enfield", 0.4), (" one", 0.6)),
+        decoded((" Enfield", 0.4), (" one", 0.6), (" one", 0.8)),
+        decoded((" one", 0.2), (" request", 0.6)),
+    )
+    # The passes are run here rather than by the background thread
+    streaming = StreamingTranscriber(buffer, decoder, 60)
+    streaming.start()
+    buffer.append(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    streaming.decode_pass()
+    assert streaming.committed_text == ""
+    buffer.append(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    streaming.decode_pass()
+    # The last word of a pass may have been cut off so it is never committed
+    assert streaming.committed_text == " Enfield one"
+    assert streaming.committed_samples == int(0.6 * SAMPLE_RATE)
+    buffer.append(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    streaming.decode_pass()
+    assert decoder.calls == [
+        (SAMPLE_RATE, "", True),
+        (2 * SAMPLE_RATE, "", True),
+        (3 * SAMPLE_RATE - int(0.6 * SAMPLE_RATE), " Enfield one", True),
+    ]
+    assert streaming.committed_text == " Enfield one one"
+
+    committed_text, audio = streaming.finish(buffer.get_audio())
+    assert committed_text == " Enfield one one"
+    assert len(audio) == 3 * SAMPLE_RATE - int(0.6 * SAMPLE_RATE) - int(0.2 * SAMPLE_RATE)
+
+def test_short_or_unchanged_audio_is_not_decoded():
+    buffer = AudioBuffer()
+    decoder = Decoder(decoded((" radio", 0.3)))
+    streaming = StreamingTranscriber(buffer, decoder, 60)
+    buffer.append(np.zeros(SAMPLE_RATE // 4, dtype=np.float32))
+    streaming.decode_pass()
+    assert decoder.calls == []
+    buffer.append(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    streaming.decode_pass()
+    streaming.decode_pass()
+    assert len(decoder.calls) == 1
+
+def test_a_recording_that_has_stopped_is_only_decoded_once():
+    buffer = AudioBuffer()
+    buffer.append(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    decoder = Decoder(*[decoded((" radio", 0.3))] * 100)
+    streaming = StreamingTranscriber(buffer, decoder, 0.001)
+    streaming.start()
+    streaming.thread.join(0.1)
+    streaming.stop()
+    streaming.finish(buffer.get_audio())
+    assert not streaming.thread.is_alive()
+    assert len(decoder.calls) == 1
@@ -0,0 +1,34 @@
+from text_cache import TextPipelineCache
+
+def test_get_and_put():
+    cache = TextPipelineCache(2)
+    assert cache.get("gulf one one", 0) is None
+    cache.put("gulf one one", 0, "Golf 1 1")
+    assert cache.get("gulf one one", 0) == "Golf 1 1"
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "size": 1}
+
+def test_least_recently_used_is_evicted():
+    cache = TextPipelineCache(2)
+    cache.get("a", 0)
+    cache.put("a", 0, "A")
+    cache.put("b", 0, "B")
+    assert cache.get("a", 0) == "A"
+    cache.put("c", 0, "C")
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == "A"
+    assert cache.get("c", 0) == "C"
+
+def test_cleared_when_version_changes():
+    cache = TextPipelineCache(10)
+    cache.get("a", 0)
+    cache.put("a", 0, "A")
+    assert cache.get("a", 1) is None
+    # A result cleaned up with the previous version is not kept
+    cache.put("a", 0, "A")
+    assert cache.get("a", 1) is None
+
+def test_disabled_when_size_is_zero():
+    cache = TextPipelineCache(0)
+    cache.get("a", 0)
+    cache.put("a", 0, "A")
+    assert cache.get("a", 0) is None
@@ -0,0 +1,26 @@
+import numpy as np
+from audio_capture import SAMPLE_RATE
+from vad import PADDING_MS, detect_speech
+
+def tone(seconds: float, amplitude: float) -> np.ndarray:
+    times = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * times)).astype(np.float32)
+
+def test_silence_is_trimmed_with_padding():
+    audio = np.concatenate((np.zeros(SAMPLE_RATE, dtype=np.float32), tone(0.5, 0.3), np.zeros(SAMPLE_RATE, dtype=np.float32)))
+    start, end = detect_speech(audio, -40)
+    padding = SAMPLE_RATE * PADDING_MS // 1000
+    # Speech is found to the nearest frame
+    assert abs(start - (SAMPLE_RATE - padding)) < SAMPLE_RATE * 0.03
+    assert abs(end - (int(1.5 * SAMPLE_RATE) + padding)) < SAMPLE_RATE * 0.03
+
+def test_padding_is_limited_to_the_audio():
+    audio = tone(0.5, 0.3)
+    assert detect_speech(audio, -40) == (0, len(audio))
+
+def test_no_speech():
+    assert detect_speech(np.zeros(SAMPLE_RATE, dtype=np.float32), -40) is None
+    assert detect_speech(tone(1, 0.001), -40) is None
+    # A click is too short to be speech
+    assert detect_speech(np.concatenate((tone(0.03, 0.3), np.zeros(SAMPLE_RATE, dtype=np.float32))), -40) is None
+    assert detect_speech(np.zeros(10, dtype=np.float32), -40) is None
@@ -0,0 +1,52 @@
+import socket
+import time
+import voiceattack_client
+from voiceattack_client import VoiceAttackClient
+
+def receive_lines(connection: socket.socket, count: int) -> list[str]:
+    data = b""
+    connection.settimeout(5)
+    while data.count(b"\n") < count:
+        data += connection.recv(1024)
+    return data.decode('utf-8').splitlines()
+
+def test_messages_are_sent_over_one_connection():
+    sent = []
+    with socket.create_server(("127.0.0.1", 0)) as server_socket:
+        client = VoiceAttackClient(*server_socket.getsockname(), lambda text, _seconds: sent.append(text), None)
+        client.start()
+        connection, _address = server_socket.accept()
+        with connection:
+            client.send("request picture")
+            client.send("radio check")
+            assert receive_lines(connection, 2) == ["request picture", "radio check"]
+            client.stop()
+    assert sent == ["request picture", "radio check"]
+
+def test_reconnects_when_voiceattack_restarts():
+    with socket.create_server(("127.0.0.1", 0)) as server_socket:
+        client = VoiceAttackClient(*server_socket.getsockname(), lambda text, _seconds: None, None)
+        client.start()
+        connection, _address = server_socket.accept()
+        connection.close()
+        client.send("radio check")
+        connection, _address = server_socket.accept()
+        with connection:
+            assert receive_lines(connection, 1) == ["radio check"]
+        client.stop()
+
+def test_stop_does_not_wait_for_a_full_outbox_or_backoff(monkeypatch):
+    monkeypatch.setattr(voiceattack_client, "MAX_BACKOFF", 10.0)
+    errors = []
+    with socket.create_server(("127.0.0.1", 0)) as server_socket:
+        address = server_socket.getsockname()
+    # Nothing is listening so every message waits in the reconnect backoff
+    client = VoiceAttackClient(*address, lambda text, _seconds: None, lambda text, _error: errors.append(text))
+    client.start()
+    for index in range(voiceattack_client.OUTBOX_SIZE * 2):
+        client.send(f"message {index}")
+    start_time = time.perf_counter()
+    client.stop()
+    assert time.perf_counter() - start_time < 2
+    assert not client.thread.is_alive()
+    assert errors
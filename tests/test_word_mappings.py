@@ -0,0 +1,59 @@
+import os
+import re
+import unicodedata
+from configuration import WhisperAttackConfiguration
+from text2digits import text2digits
+from text_matching import WordMappingMatcher
+from whisper_server import custom_cleanup_text
+
+APP_LOCATION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRANSCRIPTIONS = [
+    "Request taxi to runway zero one, hotell.",
+    "Gulf 1-1, tawa, ready for take-off.",
+    "Anvil, Enfield one one, request picture.",
+    "Inter the pre-contact position, Cubac.",
+    "Atel, leema, mic.  Wosky!",
+    "Channel twenty one, say again?",
+    "Mike Mike Mike, no mappings here.",
+    "",
+]
+
+def baseline_cleanup_text(text: str, word_mappings: dict[str, str]) -> str:
+    """
+    The cleanup chain before the word mappings were precompiled, which
+    replaced each alias in turn with its own regular expression.
+    """
+    text = unicodedata.normalize('NFC', text.strip())
+    for word, replacement in word_mappings.items():
+        text = re.sub(rf"\b{re.escape(word)}\b", replacement, text, flags=re.IGNORECASE)
+    text = text2digits.Text2Digits().convert(text)
+    text = re.sub(r"(?<=\d)-(?=\d)", " ", text)
+    text = re.sub(r'\b0\d+\b', lambda x: ' '.join(x.group()), text)
+    text = re.sub(r"([^\w\d\s])*(?![\w\-\w])(?![^-])?", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+def test_cleanup_matches_baseline(tmp_path):
+    word_mappings = WhisperAttackConfiguration(APP_LOCATION, str(tmp_path)).get_word_mappings()
+    matcher = WordMappingMatcher(word_mappings)
+    for text in TRANSCRIPTIONS:
+        assert custom_cleanup_text(text, matcher) == baseline_cleanup_text(text, word_mappings)
+
+def test_replace_whole_words_case_insensitively():
+    matcher = WordMappingMatcher({"gulf": "Golf", "gold": "Golf", "tawa": "Tower"})
+    assert matcher.replace("GULF tawa, gulfstream gold") == "Golf Tower, gulfstream Golf"
+    assert len(matcher) == 3
+
+def test_longest_alias_wins():
+    matcher = WordMappingMatcher({"pre": "Pre", "pre-contact": "precontact", "pre contact": "precontact"})
+    assert matcher.replace("pre-contact and pre contact") == "precontact and precontact"
+    assert matcher.replace("pre flight") == "Pre flight"
+
+def test_add_recompiles():
+    matcher = WordMappingMatcher({})
+    assert matcher.replace("atel") == "atel"
+    matcher.add("atel", "Hotel")
+    assert matcher.replace("atel") == "Hotel"
+    matcher.add("", "ignored")
+    assert len(matcher) == 1
@@ -0,0 +1,65 @@
+from tkinter import DISABLED, END, NORMAL
+from theme import TAG_BLUE, TAG_GREY, THEME_LIGHT
+from writer import WhisperAttackWriter
+
+class FakeText:
+    """
+    Stands in for the Tk text widget of the scrolled text area, which needs a display.
+    """
+    def __init__(self):
+        self.lines = []
+        self.states = []
+
+    def configure(self, state: str) -> None:
+        self.states.append(state)
+
+    def index(self, _index: str) -> str:
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start: str, end: str) -> None:
+        assert start == "1.0"
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+class FakeTextArea:
+    def __init__(self):
+        self.text = FakeText()
+        self.inserts = []
+        self.scheduled = []
+
+    def tag_configure(self, _tag: str, foreground: str) -> None:
+        pass
+
+    def after(self, milliseconds: int, callback) -> None:
+        self.scheduled.append((milliseconds, callback))
+
+    def insert(self, index: str, text: str, tag: str) -> None:
+        assert index == END
+        self.inserts.append((text, tag))
+        self.text.lines.extend(text.splitlines())
+
+    def see(self, index: str) -> None:
+        pass
+
+def test_lines_are_written_in_batches_by_tag():
+    text_area = FakeTextArea()
+    writer = WhisperAttackWriter(THEME_LIGHT, text_area)
+    writer.write("Reloaded configuration:", TAG_BLUE)
+    writer.write_dict({"beam_size": "1", "vad_enabled": "true"}, TAG_GREY)
+    writer.write("Stopped recording", TAG_GREY)
+    assert text_area.inserts == []
+    writer.drain()
+    assert text_area.inserts == [
+        ("Reloaded configuration:\n", TAG_BLUE),
+        ("beam_size: 1\nvad_enabled: true\nStopped recording\n", TAG_GREY),
+    ]
+    assert text_area.text.states == [NORMAL, DISABLED]
+    # Draining is scheduled again on the Tk thread
+    assert len(text_area.scheduled) == 2
+
+def test_oldest_lines_are_removed():
+    text_area = FakeTextArea()
+    writer = WhisperAttackWriter(THEME_LIGHT, text_area, max_lines=3)
+    for index in range(5):
+        writer.write(f"line {index}")
+    writer.drain()
+    assert text_area.text.lines == ["line 2", "line 3", "line 4"]
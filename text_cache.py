@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from threading import Lock
+
+class TextPipelineCache:
+    """
+    A bounded least recently used cache of the final text, the lowest
+    fuzzy match score of the corrected words, and the cleaned up text
+    before fuzzy matching, produced by the cleanup pipeline for each raw
+    transcription. The cache is cleared
+    whenever the configuration version changes, e.g. when a word mapping
+    is added, so that stale results are never returned.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, raw_text: str, version: int) -> tuple[str, float | None, str | None] | None:
+        """
+        Returns the cached final text, fuzzy match score and cleaned up text for the raw text, or None when not cached.
+        """
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            result = self.entries.get(raw_text)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(raw_text)
+            self.hits += 1
+            return result
+
+    def put(self, raw_text: str, version: int, result: tuple[str, float | None, str | None]) -> None:
+        """
+        Caches the final text, fuzzy match score and cleaned up text for the raw text,
+        evicting the least recently used entry when full.
+        """
+        if self.max_size <= 0:
+            return None
+        with self.lock:
+            if version != self.version:
+                return None
+            self.entries[raw_text] = result
+            self.entries.move_to_end(raw_text)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return None
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters along with the current size.
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
@@ -0,0 +1,168 @@
+import re
+from functools import cache, lru_cache
+from threading import Lock
+
+# Marks the end of an alias within the trie
+END = ""
+
+@cache
+def get_text2digits():
+    """
+    Returns the library used to convert textual numbers to their numerical values.
+    This is imported on first use to keep it off the application startup path.
+    """
+    from text2digits import text2digits
+    return text2digits.Text2Digits()
+
+@lru_cache(maxsize=4096)
+def is_number_word(word: str) -> bool:
+    """
+    Returns whether the word is converted to digits, e.g. "one" or "third".
+    """
+    return get_text2digits().convert(word) != word
+
+def normalise_numbers(text: str) -> str:
+    """
+    Converts the numbers spoken as words to digits, e.g. "channel one" to
+    "channel 1", and separates digits that are read out one at a time,
+    e.g. "0 1". The conversion is skipped when the text has no number words
+    as it is much slower than checking each word.
+    """
+    if any(is_number_word(word) for word in text.split()):
+        text = get_text2digits().convert(text)
+    text = re.sub(r"(?<=\d)-(?=\d)", " ", text)
+    text = re.sub(r'\b0\d+\b', lambda x: ' '.join(x.group()), text)
+    return text
+
+def trie_to_regex(node: dict) -> str:
+    """
+    Converts a character trie into a regular expression that matches any
+    of the words in the trie. Optional groups are greedy so the longest
+    word is tried first.
+    """
+    alternatives = [
+        re.escape(character) + trie_to_regex(child)
+        for character, child in sorted(node.items())
+        if character != END
+    ]
+    if not alternatives:
+        return ""
+    pattern = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+    if END in node:
+        pattern = f"(?:{pattern})?"
+    return pattern
+
+def copy_trie(node: dict) -> dict:
+    """
+    Returns a copy of the trie that can be added to without changing the original.
+    """
+    return {character: copy_trie(child) for character, child in node.items()}
+
+class WordMappingMatcher:
+    """
+    Replaces words with their mapped values in a single scan of the text.
+    The aliases are held in a character trie that is compiled into one
+    regular expression, longest alias first, the first time it is needed
+    after an alias has been added.
+    """
+    def __init__(self, word_mappings: dict[str, str]):
+        self.trie = {}
+        self.replacements = {}
+        self.pattern = None
+        self.lock = Lock()
+        for alias, replacement in word_mappings.items():
+            self.add(alias, replacement)
+
+    def add(self, alias: str, replacement: str) -> None:
+        """
+        Adds an alias and its replacement, aliases are matched case insensitively.
+        """
+        key = alias.lower()
+        if key == "":
+            return None
+        with self.lock:
+            node = self.trie
+            for character in key:
+                node = node.setdefault(character, {})
+            node[END] = {}
+            self.replacements[key] = replacement
+            self.pattern = None
+        return None
+
+    def copy(self) -> "WordMappingMatcher":
+        """
+        Returns a copy of the matcher, aliases added to the copy are not
+        seen by this matcher.
+        """
+        matcher = WordMappingMatcher({})
+        with self.lock:
+            matcher.trie = copy_trie(self.trie)
+            matcher.replacements = dict(self.replacements)
+            matcher.pattern = self.pattern
+        return matcher
+
+    def compile(self) -> re.Pattern | None:
+        """
+        Compiles the trie into the regular expression used to find aliases.
+        """
+        with self.lock:
+            if self.pattern is None and self.replacements:
+                self.pattern = re.compile(rf"\b{trie_to_regex(self.trie)}\b", re.IGNORECASE)
+            return self.pattern
+
+    def replace(self, text: str) -> str:
+        """
+        Replace all aliases found in the text with their mapped values.
+        """
+        pattern = self.pattern or self.compile()
+        if pattern is None:
+            return text
+        return pattern.sub(lambda match: self.replacements.get(match.group().lower(), match.group()), text)
+
+    def __len__(self) -> int:
+        return len(self.replacements)
+
+class FuzzyWordMatcher:
+    """
+    Fuzzy matches words against a vocabulary, e.g. DCS callsigns or airbases.
+    The vocabulary is lowercased once when the matcher is created and grouped
+    by the number of words in each entry, so that all the words (or groups
+    of words for entries like "Mineralnye Vody") in an utterance can be
+    scored in a single batch against just the entries of the same length.
+    """
+    def __init__(self, words: list[str], threshold: float = 85):
+        self.threshold = threshold
+        self.originals = {}
+        self.entries = {}
+        for word in words:
+            lower = word.strip().lower()
+            if lower == "" or lower in self.originals:
+                continue
+            self.originals[lower] = word.strip()
+            self.entries.setdefault(len(lower.split()), []).append(lower)
+
+    def get_word_counts(self) -> list[int]:
+        """
+        Returns the number of words that entries in the vocabulary have.
+        """
+        return list(self.entries)
+
+    def best_matches(self, queries: list[str], word_count: int) -> list[tuple[str, float] | None]:
+        """
+        Scores the lowercase queries against the entries with the given number of words.
+        Returns the best matching entry, with its original casing, and the score for each
+        query or None when no entry scores at least the threshold.
+        Single words are scored with WRatio, groups of words are scored with a plain
+        ratio so that a group only matches when all of its words are similar.
+        """
+        entries = self.entries.get(word_count)
+        if not entries or not queries:
+            return [None] * len(queries)
+        from rapidfuzz import fuzz, process
+        scorer = fuzz.WRatio if word_count == 1 else fuzz.ratio
+        scores = process.cdist(queries, entries, scorer=scorer, score_cutoff=self.threshold)
+        matches = []
+        for row, index in enumerate(scores.argmax(axis=1)):
+            score = float(scores[row, index])
+            matches.append((self.originals[entries[index]], score) if score >= self.threshold else None)
+        return matches
@@ -0,0 +1,30 @@
+import numpy as np
+from audio_capture import SAMPLE_RATE
+
+# Length of the frames that the energy is measured over
+FRAME_MS = 30
+# Audio kept either side of the detected speech so that soft word edges are not clipped
+PADDING_MS = 200
+# Minimum amount of audio above the threshold for the recording to contain speech
+MIN_SPEECH_MS = 90
+
+def detect_speech(audio: np.ndarray, threshold_db: float) -> tuple[int, int] | None:
+    """
+    Energy based voice activity detection. Returns the start and end sample
+    of the speech within the audio, including padding, or None when no
+    frames are louder than the threshold (in dBFS).
+    """
+    frame_length = SAMPLE_RATE * FRAME_MS // 1000
+    frame_count = len(audio) // frame_length
+    if frame_count == 0:
+        return None
+    frames = audio[:frame_count * frame_length].reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    levels = 20 * np.log10(np.maximum(rms, 1e-10))
+    voiced = np.flatnonzero(levels > threshold_db)
+    if len(voiced) * FRAME_MS < MIN_SPEECH_MS:
+        return None
+    padding = SAMPLE_RATE * PADDING_MS // 1000
+    start = max(0, voiced[0] * frame_length - padding)
+    end = min(len(audio), (voiced[-1] + 1) * frame_length + padding)
+    return int(start), int(end)
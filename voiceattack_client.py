@@ -0,0 +1,154 @@
+import select
+import socket
+import logging
+import queue
+import time
+from threading import Event, Thread
+from typing import Callable
+
+# Maximum number of messages waiting to be sent, the oldest are dropped when full
+OUTBOX_SIZE = 16
+CONNECT_TIMEOUT = 2.0
+SEND_TIMEOUT = 2.0
+# Reconnection attempts for each message, doubling the delay between each attempt
+SEND_ATTEMPTS = 4
+INITIAL_BACKOFF = 0.25
+MAX_BACKOFF = 2.0
+
+class VoiceAttackClient:
+    """
+    Sends transcribed text to the WhisperAttack VoiceAttack plugin over a
+    single long-lived connection, so the connection handshake is not paid
+    for every command. Messages are newline delimited and are sent from a
+    background thread through a bounded outbox. When the connection is lost
+    it is re-established with an increasing delay between attempts.
+    """
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        on_sent: Callable[[str, float], None],
+        on_error: Callable[[str, Exception], None]
+    ):
+        self.host = host
+        self.port = port
+        self.on_sent = on_sent
+        self.on_error = on_error
+        self.outbox = queue.Queue(maxsize=OUTBOX_SIZE)
+        self.client_socket = None
+        self.stop_event = Event()
+        self.thread = Thread(daemon=True, target=self.run)
+
+    def start(self) -> None:
+        """
+        Start the background thread and connect to VoiceAttack ahead of the first message.
+        """
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Send any queued messages then stop the background thread and close the connection.
+        Messages that cannot be sent are not retried once stopping.
+        """
+        self.stop_event.set()
+        while True:
+            try:
+                self.outbox.put_nowait(None)
+                break
+            except queue.Full:
+                try:
+                    dropped = self.outbox.get_nowait()
+                    if dropped is not None:
+                        logging.warning("VoiceAttack outbox is full while stopping, dropped: %s", dropped[0])
+                except queue.Empty:
+                    pass
+        self.thread.join(timeout=SEND_ATTEMPTS * MAX_BACKOFF)
+        self.disconnect()
+
+    def send(self, text: str) -> None:
+        """
+        Queue the text to be sent to VoiceAttack.
+        """
+        message = (text, time.perf_counter())
+        while True:
+            try:
+                self.outbox.put_nowait(message)
+                return None
+            except queue.Full:
+                try:
+                    dropped = self.outbox.get_nowait()
+                    if dropped is not None:
+                        logging.warning("VoiceAttack outbox is full, dropped: %s", dropped[0])
+                except queue.Empty:
+                    pass
+
+    def run(self) -> None:
+        """
+        Send the queued messages until stopped.
+        """
+        try:
+            self.connect()
+        except OSError as e:
+            logging.warning("Unable to connect to VoiceAttack (%s:%s): %s", self.host, self.port, e)
+        while True:
+            message = self.outbox.get()
+            if message is None:
+                return None
+            self.deliver(*message)
+
+    def deliver(self, text: str, queued_at: float) -> None:
+        """
+        Send a message, reconnecting with backoff if the connection has been lost.
+        """
+        delay = INITIAL_BACKOFF
+        error = None
+        for _ in range(SEND_ATTEMPTS):
+            try:
+                if self.client_socket is None or self.is_connection_closed():
+                    self.disconnect()
+                    self.connect()
+                self.client_socket.sendall(f"{text}\n".encode('utf-8'))
+                self.on_sent(text, time.perf_counter() - queued_at)
+                return None
+            except OSError as e:
+                error = e
+                self.disconnect()
+                if self.stop_event.wait(delay):
+                    break
+                delay = min(delay * 2, MAX_BACKOFF)
+        self.on_error(text, error)
+        return None
+
+    def connect(self) -> None:
+        """
+        Open the connection to VoiceAttack.
+        """
+        client_socket = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client_socket.settimeout(SEND_TIMEOUT)
+        self.client_socket = client_socket
+        logging.info("Connected to VoiceAttack (%s:%s)", self.host, self.port)
+
+    def disconnect(self) -> None:
+        """
+        Close the connection to VoiceAttack.
+        """
+        if self.client_socket is not None:
+            try:
+                self.client_socket.close()
+            finally:
+                self.client_socket = None
+
+    def is_connection_closed(self) -> bool:
+        """
+        Returns whether VoiceAttack has closed the connection, e.g. because it was restarted.
+        The plugin never sends any data so a readable socket means it has been closed.
+        """
+        readable, _, _ = select.select([self.client_socket], [], [], 0)
+        if not readable:
+            return False
+        try:
+            return self.client_socket.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
@@ -1,22 +1,30 @@
 import os
 import sys
+from startup_profiler import StartupProfiler
+
+# When run with --profile-startup every import from here on is timed
+startup_profiler = StartupProfiler() if "--profile-startup" in sys.argv else None
+if startup_profiler is not None:
+    startup_profiler.install()
+
 import ctypes
 import logging
 import threading
 import traceback
 from tkinter import PhotoImage, font, LEFT, DISABLED, WORD, W, NSEW
-import darkdetect
 from pystray import Icon, Menu, MenuItem
-from ttkbootstrap import Window, Toplevel, Button, Label, Style
+from ttkbootstrap import Window, Toplevel, Button, Frame, Label, Style
 from ttkbootstrap.scrolled import ScrolledText
 from ttkbootstrap.constants import *
 from PIL import Image
 from pid import PidFile, PidFileError
 from configuration import WhisperAttackConfiguration, ConfigurationError
+from log_pipeline import WhisperAttackLogging
 from theme import THEME_DEFAULT, THEME_DARK, TAG_BLUE, TAG_GREY, TAG_RED
 from writer import WhisperAttackWriter
 from whisper_server import WhisperServer
 from word_mappings import WhisperAttackWordMappings
+from latency_panel import WhisperAttackLatencyStats
 
 # This event is used to stop the server socket and shutdown.
 exit_event = threading.Event()
@@ -37,31 +45,41 @@ WHISPER_APPDATA_DIR = os.path.join(LOCAL_APPDATA_DIR , "WhisperAttack")
 # Create the AppData directory for WhisterAttack if it does not already exist
 os.makedirs(WHISPER_APPDATA_DIR, exist_ok=True)
 
-def start_logging() -> None:
+# Records are queued from here on, and written once the configuration with the log settings is loaded
+logs = WhisperAttackLogging()
+
+def start_logging(config: WhisperAttackConfiguration | None) -> None:
     """
-    Start logging to the %LOCALAPPDATA%\WhisperAttack directory.
+    Start logging to the %LOCALAPPDATA%\WhisperAttack directory, with the
+    default log settings when the configuration could not be loaded.
     """
     log_file = os.path.join(WHISPER_APPDATA_DIR, "WhisperAttack.log")
-    logging.basicConfig(
-        filename=log_file,
-        filemode='w',
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
+    if config is None:
+        logs.start(log_file)
+        return None
+    logs.start(
+        log_file,
+        config.get_log_level(),
+        config.get_log_max_size() * 1024 * 1024,
+        config.get_log_backup_count(),
+        os.path.join(WHISPER_APPDATA_DIR, "WhisperAttack.events.jsonl") if config.get_event_log() else None
     )
-    logging.getLogger().setLevel(logging.INFO)
+    return None
 
 class WhisperAttack:
     """
     Class for the main WhisperAttack application.
     """
     def __init__(self, root: Window):
-        start_logging()
-
         logging.info("WhisperAttack version: %s", APPLICATION_VERSION)
         logging.info("WhisperAttack location: %s", APPLICATION_PATH)
 
         self.root = root
-        self.config = WhisperAttackConfiguration(APPLICATION_PATH, WHISPER_APPDATA_DIR)
+        self.config = None
+        try:
+            self.config = WhisperAttackConfiguration(APPLICATION_PATH, WHISPER_APPDATA_DIR)
+        finally:
+            start_logging(self.config)
 
         theme = self.get_theme()
         if theme == THEME_DARK:
@@ -84,16 +102,25 @@ class WhisperAttack:
         )
         text_area.grid(row=0, column=0, sticky=NSEW, padx=10, pady=10)
 
+        button_frame = Frame(self.root)
+        button_frame.grid(row=1, column=0, sticky=W, pady=10, padx=10)
         self.add_icon = PhotoImage(file="add_icon.png")
         add_word_mapping_button = Button(
-            self.root,
+            button_frame,
             text="Add word mapping",
             style="secondary.TButton",
             image=self.add_icon,
             compound=LEFT,
             command=self.add_word_mapping
         )
-        add_word_mapping_button.grid(row=1, column=0, sticky=W, pady=10, padx=10)
+        add_word_mapping_button.pack(side=LEFT)
+        latency_button = Button(
+            button_frame,
+            text="Latency",
+            style="secondary.TButton",
+            command=self.show_latency
+        )
+        latency_button.pack(side=LEFT, padx=10)
 
         root.grid_rowconfigure(0, weight=1)
         root.grid_columnconfigure(0, weight=1)
@@ -108,6 +135,8 @@ class WhisperAttack:
         self.writer.write(f"{self.config.get_fuzzy_words()}", TAG_GREY)
 
         self.whisper_server = WhisperServer(self.config, self.writer, self.shutdown, exit_event)
+        if startup_profiler is not None:
+            startup_profiler.mark("WhisperAttack initialised")
 
         threading.excepthook = self.handle_exception
         threading.Thread(daemon=True, target=lambda: icon.run(setup=self.startup)).start()
@@ -125,13 +154,19 @@ class WhisperAttack:
         """
         def update_word_mapping(aliases: str, replacement: str):
             try:
-                self.config.add_word_mapping(WHISPER_APPDATA_DIR, aliases, replacement)
+                self.whisper_server.add_word_mapping(aliases, replacement)
                 self.writer.write("Added new word mapping:", TAG_BLUE)
                 self.writer.write(f"{aliases}: {replacement}", TAG_GREY)
             except ConfigurationError as error:
                 self.writer.write(error, TAG_RED)
         WhisperAttackWordMappings(self.root, update_word_mapping)
 
+    def show_latency(self) -> None:
+        """
+        Open the dialog showing the latency of each stage of the transcription pipeline
+        """
+        WhisperAttackLatencyStats(self.root, self.whisper_server.stats.get_stats)
+
     def get_theme(self) -> str:
         """
         Returns the name of the theme to be used when displaying
@@ -140,6 +175,7 @@ class WhisperAttack:
         """
         theme = self.config.get_theme()
         if theme == THEME_DEFAULT:
+            import darkdetect
             return darkdetect.theme().lower()
         return theme
 
@@ -148,6 +184,9 @@ class WhisperAttack:
         Start the WhisperAttack server.
         """
         icon.visible = True
+        if startup_profiler is not None:
+            startup_profiler.mark("System tray icon visible")
+            self.writer.write(startup_profiler.report(), TAG_BLUE)
         self.whisper_server.run_server()
 
     def handle_exception(self, args) -> None:
@@ -160,6 +199,8 @@ class WhisperAttack:
         exit(icon)
 
 window = Window(title="WhisperAttack", iconphoto="whisper_attack_icon.png")
+if startup_profiler is not None:
+    startup_profiler.mark("Window created")
 
 def close(_icon) -> None:
     """
@@ -238,3 +279,6 @@ if __name__ == "__main__":
         logging.error("Server error: %s\n\n%s", e, TRACE)
         open_modal(f"Unexpected server error: {e}")
         close(icon)
+    finally:
+        # Write any records still queued before exiting
+        logs.stop()
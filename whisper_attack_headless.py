@@ -0,0 +1,100 @@
+"""
+Runs the WhisperAttack server without the UI, e.g. as a background service
+on a separate machine, in a container, or when benchmarking without a
+display. Nothing from the UI (Tk, the system tray icon or the PID file)
+is imported, the lines the server would write to the window are logged.
+
+Run from the WhisperAttack directory:
+
+    python whisper_attack_headless.py --app-data path/to/config --host 0.0.0.0 --log-file WhisperAttack.log
+"""
+import os
+import sys
+from startup_profiler import StartupProfiler
+
+# When run with --profile-startup every import from here on is timed
+startup_profiler = StartupProfiler() if "--profile-startup" in sys.argv else None
+if startup_profiler is not None:
+    startup_profiler.install()
+
+import signal
+import logging
+import argparse
+import threading
+from configuration import WhisperAttackConfiguration, ConfigurationError
+from log_pipeline import WhisperAttackLogging
+from log_writer import WhisperAttackLogWriter
+from whisper_server import HOST, PORT, WhisperServer
+
+APPLICATION_PATH = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+
+def get_default_app_data() -> str:
+    """
+    Returns the same custom configuration directory as the WhisperAttack
+    application on Windows, or a directory in the home directory elsewhere.
+    """
+    local_app_data = os.getenv('LOCALAPPDATA')
+    if local_app_data:
+        return os.path.join(local_app_data, "WhisperAttack")
+    return os.path.join(os.path.expanduser("~"), ".whisperattack")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the WhisperAttack server without the UI.")
+    parser.add_argument("--app-location", default=APPLICATION_PATH, help="directory with the default configuration, default is the WhisperAttack directory")
+    parser.add_argument("--app-data", default=get_default_app_data(), help="directory with the custom configuration and caches, default is the same directory as the WhisperAttack application")
+    parser.add_argument("--host", default=HOST, help=f"address to listen for commands on, default {HOST}")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port to listen for commands on, default {PORT}")
+    parser.add_argument("--log-file", help="file to write the log to, default is standard error")
+    parser.add_argument("--events-file", help="file to write the JSON-lines event stream to, default is WhisperAttack.events.jsonl in the custom configuration directory")
+    parser.add_argument("--verbose", action="store_true", help="also log the lines that the UI would show")
+    parser.add_argument("--profile-startup", action="store_true", help="log how long startup takes and the slowest imports")
+    args = parser.parse_args()
+
+    os.makedirs(args.app_data, exist_ok=True)
+    # Records are queued until the configuration with the log settings is loaded
+    logs = WhisperAttackLogging()
+    logging.info("WhisperAttack location: %s, custom configuration: %s", args.app_location, args.app_data)
+    try:
+        config = WhisperAttackConfiguration(args.app_location, args.app_data)
+    except ConfigurationError as error:
+        logs.start(args.log_file)
+        logging.error("Failed to load configuration: %s", error)
+        logs.stop()
+        sys.exit(1)
+    logs.start(
+        args.log_file,
+        "DEBUG" if args.verbose else config.get_log_level(),
+        config.get_log_max_size() * 1024 * 1024,
+        config.get_log_backup_count(),
+        (args.events_file or os.path.join(args.app_data, "WhisperAttack.events.jsonl")) if config.get_event_log() else None
+    )
+
+    exit_event = threading.Event()
+    failed = threading.Event()
+    def handle_exception(exception_args) -> None:
+        """
+        Stop the server when a background thread fails, e.g. when the model
+        cannot be loaded, as there is no window to show the error in.
+        """
+        logging.error(
+            "Server error: %s", exception_args.exc_value,
+            exc_info=(exception_args.exc_type, exception_args.exc_value, exception_args.exc_traceback)
+        )
+        failed.set()
+        exit_event.set()
+    threading.excepthook = handle_exception
+
+    server = WhisperServer(config, WhisperAttackLogWriter(), exit_event.set, exit_event, args.host, args.port)
+    # The server checks the exit event at least once a second
+    signal.signal(signal.SIGINT, lambda _signal, _frame: exit_event.set())
+    signal.signal(signal.SIGTERM, lambda _signal, _frame: exit_event.set())
+    if startup_profiler is not None:
+        startup_profiler.mark("Server created")
+        startup_profiler.report(target="server being created")
+    server.run_server()
+    logs.stop()
+    if failed.is_set():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,100 @@
 import os
+import sys
+import glob
+import queue
 import socket
-import time
+import selectors
 import logging
 import unicodedata
 import tempfile
 import re
-from datetime import datetime
-from threading import Event
-from typing import Callable
-import keyboard
-import sounddevice as sd
-import soundfile as sf
-import pyperclip
-from rapidfuzz import process
-from text2digits import text2digits
-from wcwidth import wcswidth
+import itertools
+import weakref
+from datetime import datetime, timedelta
+from functools import cache
+from threading import Event, Lock, Thread
+from typing import Callable, TYPE_CHECKING
+import numpy as np
+from audio_capture import AudioRecorder, SAMPLE_RATE
 from configuration import WhisperAttackConfiguration
-from writer import WhisperAttackWriter
+from config_watcher import ConfigurationWatcher
+from kneeboard import KneeboardDocument
+from protocol import (
+    AUDIO_FORMATS, FRAME_AUDIO, FRAME_REQUEST, FRAME_RESPONSE, MAX_PAYLOAD_SIZE,
+    FrameDecoder, ProtocolError, decode_audio, decode_message, encode_message, is_framed
+)
+from streaming import StreamingTranscriber
+from text_cache import TextPipelineCache
+from audio_cache import TranscriptionCache
+from calibration import ModelCalibration
+from latency_stats import PipelineStats
+from log_pipeline import log_event, set_log_level
+from text_matching import FuzzyWordMatcher, WordMappingMatcher, normalise_numbers
+from vad import detect_speech
+from voiceattack_client import VoiceAttackClient
 from theme import TAG_BLUE, TAG_GREEN, TAG_GREY, TAG_ORANGE, TAG_RED
 
+# The writer wraps a Tk widget, it is only imported for type checking so
+# that the server can run without the UI
+if TYPE_CHECKING:
+    from log_writer import WhisperAttackLogWriter
+    from writer import WhisperAttackWriter
+
 ###############################################################################
 # CONFIG
 ###############################################################################
 HOST = '127.0.0.1'
 PORT = 65432
 
-# Library to convert textual numbers to their numerical values
-t2d = text2digits.Text2Digits()
+# Transcriptions starting with "note" are sent to the DCS kneeboard
+NOTE_PATTERN = re.compile(r"note\b", re.IGNORECASE)
+
+# Changes to these settings load the models again
+MODEL_SETTINGS = {
+    "whisper_model", "whisper_device", "whisper_compute_type", "whisper_core_type", "cascade_model",
+    "auto_tune", "cpu_threads"
+}
+# Changes to these settings are only used once WhisperAttack is restarted
+RESTART_SETTINGS = {
+    "voiceattack_host", "voiceattack_port", "always_armed", "pre_roll", "save_recording",
+    "text_cache_size", "audio_cache_size", "theme", "config_reload_interval",
+    "log_max_size", "log_backup_count", "event_log"
+}
+
+# Whisper only uses the last 223 tokens of the prompt
+MAX_PROMPT_TOKENS = 223
+
+# Longest audio that a client can upload to be transcribed
+MAX_UPLOAD_SECONDS = 120
 
-# Use the system's temporary folder for the WAV file.
+# Session used by commands that do not name a session, e.g. from the VoiceAttack plugin
+DEFAULT_SESSION = "default"
+SESSION_ID_PATTERN = re.compile(r"[\w-]{1,32}")
+
+# Longest recording that is transcribed as part of a batch, the batched
+# pipeline decodes each recording as a single 30 second window
+MAX_BATCH_SECONDS = 30
+# How often to check whether a session that is stopping has queued its recording
+STOP_POLL_SECONDS = 0.01
+
+# Use the system's temporary folder for the optional debug WAV file.
 TEMP_DIR = tempfile.gettempdir()
 AUDIO_FILE = os.path.join(TEMP_DIR, "whisper_temp_recording.wav")
-SAMPLE_RATE = 16000
+
+@cache
+def add_cuda_library_directories():
+    """
+    Adds the bin directories of the nvidia-cublas-cu12 and nvidia-cudnn-cu12
+    packages to the DLL search path on Windows, so that CTranslate2 can load
+    the CUDA 12 libraries without the CUDA Toolkit being installed. These were
+    previously loaded into the process by torch.
+    """
+    if sys.platform != "win32":
+        return
+    for path in sys.path:
+        for directory in glob.glob(os.path.join(path, "nvidia", "*", "bin")):
+            os.add_dll_directory(directory)
+            logging.debug("Added CUDA library directory %s", directory)
 
 ###############################################################################
 # PHONETIC ALPHABET
@@ -42,337 +105,1054 @@ phonetic_alphabet = [
     "Oscar", "Papa", "Quebec", "Romeo", "Sierra", "Tango", "Uniform",
     "Victor", "Whiskey", "X-ray", "Yankee", "Zulu",
 ]
+phonetic_matcher = FuzzyWordMatcher(phonetic_alphabet, threshold=85)
+
+# Words shorter than this are not fuzzy matched
+MIN_FUZZY_LENGTH = 6
 
 ###############################################################################
 # FUZZY MATCH + CLEANUP
 ###############################################################################
 def correct_dcs_and_phonetics_separately(
     text: str,
-    dcs_list: list[str],
-    phonetic_list: list[str],
-    dcs_threshold=85,
-    phonetic_threshold=85
+    dcs_matcher: FuzzyWordMatcher,
+    phonetic_matcher: FuzzyWordMatcher,
+    match_scores: list[float] | None = None
 ) -> str:
     """
     Applies fuzzy matching for DCS callsigns and the phonetic alphabet.
+    Groups of words are matched against multi-word entries first, longest
+    group first, then the remaining words are matched individually.
+    The score of each match used is added to the match scores when given.
     """
     tokens = text.split()
+    lower_tokens = [token.lower() for token in tokens]
+    word_counts = sorted({
+        word_count
+        for matcher in (dcs_matcher, phonetic_matcher)
+        for word_count in matcher.get_word_counts()
+        if word_count <= len(tokens)
+    }, reverse=True)
+
+    # Score every group of words that is long enough, for each group size, in one batch per matcher
+    best_matches = {}
+    for word_count in word_counts:
+        positions = []
+        queries = []
+        for position in range(len(tokens) - word_count + 1):
+            query = " ".join(lower_tokens[position:position + word_count])
+            if len(query) >= MIN_FUZZY_LENGTH:
+                positions.append(position)
+                queries.append(query)
+        # DCS words are scored first so that they win when the scores are equal
+        for matcher in (dcs_matcher, phonetic_matcher):
+            for position, match in zip(positions, matcher.best_matches(queries, word_count)):
+                best = best_matches.get((position, word_count))
+                if match is not None and (best is None or match[1] > best[1]):
+                    best_matches[(position, word_count)] = match
+
     corrected_tokens = []
-    dcs_lower = [x.lower() for x in dcs_list]
-    phon_lower = [x.lower() for x in phonetic_list]
-
-    for token in tokens:
-        if len(token) < 6:
-            corrected_tokens.append(token)
-            continue
-
-        t_lower = token.lower()
-        dcs_match = process.extractOne(t_lower, dcs_lower, score_cutoff=dcs_threshold)
-        phon_match = process.extractOne(t_lower, phon_lower, score_cutoff=phonetic_threshold)
-        best_token = token
-        best_score = 0
-
-        if dcs_match is not None:
-            match_name_dcs, score_dcs, _ = dcs_match
-            if score_dcs > best_score:
-                best_score = score_dcs
-                for orig in dcs_list:
-                    if orig.lower() == match_name_dcs:
-                        best_token = orig
-                        break
-
-        if phon_match is not None:
-            match_name_phon, score_phon, _ = phon_match
-            if score_phon > best_score:
-                best_score = score_phon
-                for orig in phonetic_list:
-                    if orig.lower() == match_name_phon:
-                        best_token = orig
-                        break
-
-        corrected_tokens.append(best_token)
+    position = 0
+    while position < len(tokens):
+        for word_count in word_counts:
+            match = best_matches.get((position, word_count))
+            if match is not None:
+                corrected_tokens.append(match[0])
+                if match_scores is not None:
+                    match_scores.append(match[1])
+                position += word_count
+                break
+        else:
+            corrected_tokens.append(tokens[position])
+            position += 1
     return " ".join(corrected_tokens)
 
-def replace_word_mappings(word_mappings: dict[str, str], text: str) -> str:
+def replace_word_mappings(word_mappings: WordMappingMatcher, text: str) -> str:
     """
     Replace transcribed words with custom words from their mapped values.
     """
-    for word, replacement in word_mappings.items():
-        pattern = rf"\b{re.escape(word)}\b"
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-    return text
+    return word_mappings.replace(text)
 
-def custom_cleanup_text(text: str, word_mappings: dict[str, str]) -> str:
+def custom_cleanup_text(text: str, word_mappings: WordMappingMatcher) -> str:
     """
     Performs several cleanup steps on the transcribed text.
     """
     text = unicodedata.normalize('NFC', text.strip())
     text = replace_word_mappings(word_mappings, text)
-    text = t2d.convert(text)
-    text = re.sub(r"(?<=\d)-(?=\d)", " ", text)
-    text = re.sub(r'\b0\d+\b', lambda x: ' '.join(x.group()), text)
+    text = normalise_numbers(text)
     text = re.sub(r"([^\w\d\s])*(?![\w\-\w])(?![^-])?", " ", text)
     text = re.sub(r"\s+", " ", text).strip()
     return text
 
-def format_for_dcs_kneeboard(text: str, line_length: int) -> str:
+###############################################################################
+# WHISPER SERVER
+###############################################################################
+# Identifies each recording in the event stream
+utterance_ids = itertools.count(1)
+
+class TranscriptionJob:
     """
-    Formats text for word wrapping for use in the DCS kneeboard
-    This is based on the original code from BojotecX WhisperKneeboard
-    https://github.com/BojoteX/KneeboardWhisper
+    A recording waiting to be transcribed by the transcription worker.
+    Audio uploaded by a client has the connection to reply to with the
+    result, and is only sent on to VoiceAttack or the DCS kneeboard when
+    deliver is set.
     """
-    # Split the text into words and handle punctuation
-    words = re.findall(r'\S+|\n', text)
-
-    lines = []
-    current_words = []
-    current_len = 0
-
-    for word in words:
-        word_len = wcswidth(word)
-
-        # If adding the next word exceeds the line length
-        if current_len + word_len + (len(current_words)) > line_length:
-            line = justify_line(current_words, line_length)
-            lines.append(line)
-            current_words = [word]
-            current_len = word_len
-        else:
-            current_words.append(word)
-            current_len += word_len
+    def __init__(
+        self,
+        audio: np.ndarray,
+        streaming: StreamingTranscriber | None = None,
+        reply_to: "ClientConnection | None" = None,
+        deliver: bool = True,
+        received: datetime | None = None,
+        session: "CaptureSession | None" = None
+    ):
+        self.audio = audio
+        self.streaming = streaming
+        self.reply_to = reply_to
+        self.deliver = deliver
+        self.session = session
+        self.utterance_id = next(utterance_ids)
+        # The raw and cleaned up transcriptions, added to the event stream along with the final text
+        self.raw_text = None
+        self.cleaned_text = None
+        self.created = datetime.now()
+        # When the stop command, or the end of the uploaded audio, was received
+        self.received = received or self.created
+        self.timings = {}
 
-    # Justify the last line (left-justified)
-    if current_words:
-        last_line = ' '.join(current_words).ljust(line_length)
-        lines.append(last_line)
+class CaptureSession:
+    """
+    The capture state of one seat, e.g. the pilot or the WSO of a multi-crew
+    aircraft, identified by the session ID sent with its commands. Each
+    session records from its own input device while all of the sessions
+    share the Whisper model. The throughput and queueing delay of the
+    session's recordings are kept for the stats.
+    """
+    def __init__(self, session_id: str, recorder: AudioRecorder):
+        self.session_id = session_id
+        self.recorder = recorder
+        self.recording = False
+        # When the stop command was received, while the input stream is being stopped
+        self.stop_received = None
+        self.streaming = None
+        # Prefixed to the lines written to the UI so that sessions can be told apart
+        self.label = "" if session_id == DEFAULT_SESSION else f"[{session_id}] "
+        self.stats = PipelineStats()
+        self.utterances = 0
+        self.audio_seconds = 0.0
+        self.first_received = None
+        self.last_finished = None
+        self.lock = Lock()
 
-    # Ensure the last line is completely blank
-    lines.append(' ' * line_length)
+    def record_job(self, job: TranscriptionJob) -> None:
+        """
+        Record the queueing delay and total time of a transcribed recording.
+        """
+        with self.lock:
+            self.utterances += 1
+            self.audio_seconds += len(job.audio) / SAMPLE_RATE
+            if self.first_received is None:
+                self.first_received = job.received
+            self.last_finished = datetime.now()
+        self.stats.record("queue", job.timings["queue"])
+        self.stats.record("total", job.timings["total"])
 
-    return '\n'.join(lines)
+    def get_stats(self) -> dict:
+        """
+        Returns the number of recordings transcribed, how many were transcribed
+        per minute from the first one being received to the last one being
+        finished, and the percentiles of their queueing delay and total time
+        in milliseconds.
+        """
+        with self.lock:
+            utterances = self.utterances
+            audio_seconds = self.audio_seconds
+            elapsed = (self.last_finished - self.first_received).total_seconds() if utterances else 0
+        latency = self.stats.get_stats()
+        return {
+            "recording": self.recording,
+            "utterances": utterances,
+            "audio_seconds": round(audio_seconds, 3),
+            "utterances_per_minute": round(60 * utterances / elapsed, 2) if utterances > 1 and elapsed > 0 else None,
+            "queue": latency.get("queue"),
+            "total": latency.get("total")
+        }
 
-def justify_line(words: list[str], line_length: int):
+class ClientConnection:
     """
-    Justify the words from left to right
+    A client connected to the command port. Clients either send plain
+    text commands or use the framed protocol, which is detected from the
+    first bytes they send.
     """
-    if len(words) == 1:
-        # If there's only one word, left-justify it
-        return words[0].ljust(line_length)
-
-    # Calculate the total display width of words
-    total_words_length = sum(wcswidth(word) for word in words)
-    total_spaces = line_length - total_words_length
-    gaps = len(words) - 1
-    spaces_between_words = [total_spaces // gaps] * gaps
-
-    # Distribute the remaining spaces from left to right
-    for i in range(total_spaces % gaps):
-        spaces_between_words[i] += 1
-
-    # Build the justified line
-    line = ''
-    for i, word in enumerate(words[:-1]):
-        line += word + ' ' * spaces_between_words[i]
-    line += words[-1]  # Add the last word without extra spaces after it
-    return line
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.framed = None
+        self.text_buffer = bytearray()
+        self.decoder = FrameDecoder()
+        self.output = bytearray()
+        self.close_after_output = False
+        self.closed = False
+        self.upload = None
+        self.upload_chunks = []
+        self.upload_samples = 0
 
-###############################################################################
-# WHISPER SERVER
-###############################################################################
 class WhisperServer:
     """
     Class that runs a socket server to listen for incoming commands.
-    Commands will start or stop the recording of audio to a wav file.
+    Commands will start or stop the recording of audio into memory.
     Once recording has stopped the audio will be transcribed to text and
     sent to either VoiceAttack or the DCS kneeboard.
+    The writer is either the WhisperAttack window's writer, or a log writer
+    when running without the UI.
     """
-    def __init__(self, config: WhisperAttackConfiguration, writer: WhisperAttackWriter, shutdown: Callable, exit_event: Event):
+    def __init__(
+        self,
+        config: WhisperAttackConfiguration,
+        writer: "WhisperAttackWriter | WhisperAttackLogWriter",
+        shutdown: Callable,
+        exit_event: Event,
+        host: str = HOST,
+        port: int = PORT
+    ):
         self.config = config
+        self.host = host
+        self.port = port
         self.writer = writer
         self.exit_event = exit_event
         self.shutdown = shutdown
         self.model = None
-        self.recording = False
-        self.audio_file = AUDIO_FILE
-        self.wave_file = None
-        self.stream = None
+        self.cascade_model = None
+        # The model, device, compute type and CPU threads that the loaded models were loaded with
+        self.model_settings = {}
+        self.cascade_counts = {"accepted": 0, "escalated": 0}
+        self.model_lock = Lock()
+        # The initial prompt tokenized for each model, the models are weakly
+        # referenced so that a replaced model is freed
+        self.prompt_tokens = weakref.WeakKeyDictionary()
+        self.reload_lock = Lock()
+        self.model_swap_lock = Lock()
+        self.model_ready = Event()
+        self.calibrating = Event()
+        self.sessions = {DEFAULT_SESSION: CaptureSession(DEFAULT_SESSION, self.create_recorder(DEFAULT_SESSION))}
+        self.sessions_lock = Lock()
+        self.batch_counts = {"batches": 0, "utterances": 0}
+        self.jobs = queue.Queue()
+        self.replies = queue.SimpleQueue()
+        self.selector = None
+        self.wakeup_receive = None
+        self.wakeup_send = None
+        self.text_cache = TextPipelineCache(config.get_text_cache_size())
+        self.audio_cache = None
+        if config.get_audio_cache_size() > 0:
+            self.audio_cache = TranscriptionCache(
+                os.path.join(config.get_app_data_location(), "transcription_cache"),
+                config.get_audio_cache_size() * 1024 * 1024
+            )
+        self.stats = PipelineStats()
+        self.kneeboard = None
 
         self.voiceattack_host = self.config.get_voiceattack_host()
         self.voiceattack_port = self.config.get_voiceattack_port()
+        self.voiceattack = VoiceAttackClient(
+            self.voiceattack_host,
+            self.voiceattack_port,
+            self.voiceattack_sent,
+            self.voiceattack_error
+        )
+        self.config_watcher = ConfigurationWatcher(
+            lambda: self.config.get_watched_files(),
+            self.reload_configuration,
+            config.get_config_reload_interval() / 1000
+        )
 
-    def load_whisper_model(self, config: WhisperAttackConfiguration) -> None:
+    def load_whisper_model(self, config: WhisperAttackConfiguration) -> tuple:
         """
-        Loads the Whisper model.
+        Loads the Whisper model, and the cascade model when one is configured.
+        Returns the Whisper model, the cascade model or None, and the settings
+        the models were actually loaded with, which include the calibrated
+        compute type and CPU threads when auto_tune is enabled.
         """
         whisper_model = config.get_whisper_model()
         whisper_device = config.get_whisper_device()
         whisper_compute_type = config.get_whisper_compute_type()
         whisper_core_type = config.get_whisper_core_type()
         self.writer.write(f"Loading Whisper model ({whisper_model}), device={whisper_device} ...")
-        import torch
+        # CUDA is probed through CTranslate2, which faster-whisper already depends on,
+        # so that torch does not need to be imported
+        add_cuda_library_directories()
+        import ctranslate2
         from faster_whisper import WhisperModel
 
+        device = "cpu"
+        compute_type = "int8"
         if whisper_device.upper() == "GPU":
-            if torch.cuda.is_available():
+            if ctranslate2.get_cuda_device_count() > 0:
+                device = "cuda"
                 compute_type = whisper_compute_type
                 if whisper_core_type.lower() == "standard":
                     compute_type = "int8"
                     logging.info("whisper_core_type is 'standard' so using compute_type '%s'", compute_type)
-                device = torch.device("cuda")
-                capability = torch.cuda.get_device_capability(device)
-                major, minor = capability
-                logging.info("GPU has cuda capability major=%s minor=%s", major, minor)
-                # Tensor Cores are available on devices with compute capability 7.0 or higher
-                if whisper_core_type.lower() == "tensor" and major < 7:
+                supported_compute_types = ctranslate2.get_supported_compute_types("cuda")
+                logging.info("GPU supports compute types: %s", supported_compute_types)
+                # Tensor Cores are required for float16, these are available on
+                # devices with compute capability 7.0 or higher
+                if whisper_core_type.lower() == "tensor" and "float16" not in supported_compute_types:
                     compute_type = "int8"
-                    logging.warning("GPU does not have tensor cores, major=%s, minor=%s so using compute_type '%s'", major, minor, compute_type)
+                    logging.warning("GPU does not have tensor cores so using compute_type '%s'", compute_type)
                 logging.info("Loading Whisper model (%s), device=%s, core_type=%s, compute_type=%s ...", whisper_model, whisper_device, whisper_core_type, compute_type)
-                self.model = WhisperModel(whisper_model, device="cuda", compute_type=compute_type)
-                logging.info('Successfully loaded Whisper model')
-                self.writer.write('Successfully loaded Whisper model', TAG_GREEN)
-                return None
+            else:
+                logging.error("cuda not available so using CPU")
+                self.writer.write("cuda not available so using CPU", TAG_RED)
 
-            logging.error("cuda not available so using CPU")
-            self.writer.write("cuda not available so using CPU", TAG_RED)
+        cpu_threads = config.get_cpu_threads()
+        if config.get_auto_tune():
+            compute_type, cpu_threads = self.get_tuned_model_settings(config, whisper_model, device, compute_type, cpu_threads)
+        if device == "cpu":
+            logging.info("Loading Whisper model (%s), device=%s, compute_type=%s, cpu_threads=%s ...", whisper_model, device, compute_type, cpu_threads)
+        model = WhisperModel(whisper_model, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+        logging.info('Successfully loaded Whisper model')
+        self.writer.write('Successfully loaded Whisper model', TAG_GREEN)
 
-        compute_type = "int8"
-        logging.info("Loading Whisper model (%s), device=%s, compute_type=%s ...", whisper_model, "cpu", compute_type)
-        self.model = WhisperModel(whisper_model, device="cpu", compute_type=compute_type)
-        return None
+        cascade_model_name = config.get_cascade_model()
+        cascade_model = None
+        if cascade_model_name:
+            logging.info("Loading cascade model (%s), device=%s, compute_type=%s ...", cascade_model_name, device, compute_type)
+            self.writer.write(f"Loading cascade model ({cascade_model_name}) ...")
+            cascade_model = WhisperModel(cascade_model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+            logging.info('Successfully loaded cascade model')
+            self.writer.write('Successfully loaded cascade model', TAG_GREEN)
+        model_settings = {
+            "whisper_model": whisper_model,
+            "cascade_model": cascade_model_name or None,
+            "device": device,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads
+        }
+        return model, cascade_model, model_settings
 
-    def start_recording(self) -> None:
+    def get_tuned_model_settings(
+        self,
+        config: WhisperAttackConfiguration,
+        whisper_model: str,
+        device: str,
+        compute_type: str,
+        cpu_threads: int
+    ) -> tuple[str, int]:
         """
-        Begin recording to a wav file.
+        Returns the fastest compute type and number of CPU threads for the model
+        on this machine. The model is calibrated the first time it is loaded on
+        this machine, after that the kept calibration is used. A compute type
+        or number of threads set in the settings is used instead of being
+        calibrated. A whisper_core_type of standard on the GPU fixes the
+        compute type to int8, as when auto_tune is disabled. The given compute
+        type and threads are returned when the calibration fails.
         """
-        if self.recording:
-            logging.info("Already recording—ignoring start command.")
-            self.writer.write("Already recording—ignoring start command", TAG_ORANGE)
-            return None
-        logging.info("Starting recording...")
-        self.writer.write("Starting recording...", TAG_GREY)
-        self.wave_file = sf.SoundFile(
-            self.audio_file,
-            mode='w',
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            subtype='FLOAT'
+        import ctranslate2
+        whisper_compute_type = config.get_whisper_compute_type()
+        fixed_compute_type = None
+        if whisper_compute_type in ctranslate2.get_supported_compute_types(device):
+            fixed_compute_type = whisper_compute_type
+        elif device == "cuda" and config.get_whisper_core_type().lower() == "standard":
+            fixed_compute_type = compute_type
+        calibration = ModelCalibration(config.get_app_data_location())
+        fingerprint = calibration.get_fingerprint(whisper_model, device, fixed_compute_type, cpu_threads)
+        result = calibration.get(fingerprint)
+        if result is None:
+            message = (
+                f"Calibrating Whisper model ({whisper_model}) because auto_tune is enabled, this is only done once "
+                "but can take several minutes and recordings cannot be started until it has finished. "
+                "The fastest compute type is used instead of the one chosen from whisper_core_type, "
+                "set auto_tune=false to use the configured settings"
+            )
+            logging.warning("%s (%s)", message, fingerprint)
+            self.writer.write(message, TAG_ORANGE)
+            self.calibrating.set()
+            try:
+                result = calibration.calibrate(
+                    whisper_model,
+                    device,
+                    fixed_compute_type,
+                    cpu_threads,
+                    config.get_beam_size(),
+                    lambda message: self.writer.write(message, TAG_GREY)
+                )
+            except Exception as e:
+                logging.error("Failed to calibrate Whisper model, using compute_type '%s': %s", compute_type, e)
+                self.writer.write(f"Failed to calibrate Whisper model: {e}", TAG_RED)
+                return compute_type, cpu_threads
+            finally:
+                self.calibrating.clear()
+            calibration.put(fingerprint, result)
+            logging.info("Calibration timings: %s", result["timings"])
+        logging.info(
+            "Using calibrated compute_type '%s' and cpu_threads %s instead of compute_type '%s', set auto_tune=false to use it",
+            result["compute_type"], result["cpu_threads"], compute_type
         )
-        def audio_callback(indata, _frames, _time_info, status):
-            if status:
-                logging.info("Audio Status: %s", status)
-            self.wave_file.write(indata)
-        self.stream = sd.InputStream(
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            dtype='float32',
-            callback=audio_callback
+        self.writer.write(
+            f"Using compute_type={result['compute_type']}, cpu_threads={result['cpu_threads'] or 'default'} "
+            f"({result['seconds']:.3f} seconds to transcribe {result['clip_seconds']} seconds of audio)",
+            TAG_GREY
         )
-        self.stream.start()
-        self.recording = True
+        return result["compute_type"], result["cpu_threads"]
+
+    def create_recorder(self, session_id: str, device: int | str | None = None) -> AudioRecorder:
+        """
+        Creates the audio recorder for a session, recording from the default
+        input device unless another device is given.
+        """
+        debug_file = AUDIO_FILE if session_id == DEFAULT_SESSION else os.path.join(TEMP_DIR, f"whisper_temp_recording_{session_id}.wav")
+        return AudioRecorder(
+            debug_file if self.config.get_save_recording() else None,
+            self.config.get_pre_roll() / 1000 if self.config.get_always_armed() else None,
+            device
+        )
+
+    def get_session(self, session_id: str | None = None, device: int | str | None = None) -> CaptureSession | None:
+        """
+        Returns the session with the ID, or the default session when no ID is given.
+        A new session is created, recording from the given input device, the
+        first time an ID is used. Returns None when the ID is not valid or
+        there are already as many sessions as allowed.
+        """
+        session_id = str(session_id or DEFAULT_SESSION).strip().lower()
+        with self.sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                return session
+            if not SESSION_ID_PATTERN.fullmatch(session_id):
+                logging.warning("Invalid session ID: %s", session_id)
+                self.writer.write(f"Invalid session ID: {session_id}", TAG_ORANGE)
+                return None
+            if len(self.sessions) >= self.config.get_max_sessions():
+                logging.warning("Already %s sessions—ignoring session %s.", len(self.sessions), session_id)
+                self.writer.write(f"Already {len(self.sessions)} sessions—ignoring session {session_id}", TAG_ORANGE)
+                return None
+            session = CaptureSession(session_id, self.create_recorder(session_id, device))
+            self.sessions[session_id] = session
+        logging.info("Created session %s, input device=%s", session_id, device if device is not None else "default")
+        self.writer.write(f"Created session {session_id}", TAG_GREY)
+        return session
+
+    def get_sessions(self) -> list[CaptureSession]:
+        """
+        Returns all of the sessions.
+        """
+        with self.sessions_lock:
+            return list(self.sessions.values())
+
+    def start_recording(self, session: CaptureSession | None = None) -> bool:
+        """
+        Begin recording audio into memory for the session, or the default
+        session, returns whether recording was started.
+        When streaming transcription is enabled the recording is also
+        decoded in the background while it is in progress.
+        """
+        session = session or self.sessions[DEFAULT_SESSION]
+        if session.recording:
+            logging.info("Session %s already recording—ignoring start command.", session.session_id)
+            self.writer.write(f"{session.label}Already recording—ignoring start command", TAG_ORANGE)
+            return False
+        logging.info("Starting recording for session %s...", session.session_id)
+        self.writer.write(f"{session.label}Starting recording...", TAG_GREY)
+        session.recorder.start()
+        session.recording = True
+        config = self.config
+        if config.get_streaming_transcription():
+            session.streaming = StreamingTranscriber(
+                session.recorder.buffer,
+                lambda audio, prompt, word_timestamps: self.decode_audio(audio, config, prompt, word_timestamps),
+                config.get_streaming_interval() / 1000
+            )
+            session.streaming.start()
+        return True
+
+    def stop_and_transcribe(self, session: CaptureSession | None = None) -> bool:
+        """
+        Stops the session's recording, or the default session's recording,
+        and queues it to be transcribed by the transcription worker, so that
+        a new recording can be started while the previous one is still being
+        transcribed.
+        Returns whether a recording was stopped.
+        """
+        session = session or self.sessions[DEFAULT_SESSION]
+        if not session.recording:
+            logging.warning("Session %s not currently recording—ignoring stop command.", session.session_id)
+            self.writer.write(f"{session.label}Not currently recording—ignoring stop command", TAG_ORANGE)
+            return False
+        received = datetime.now()
+        logging.info("Stopping recording for session %s...", session.session_id)
+        self.writer.write(f"{session.label}Stopped recording", TAG_GREY)
+        session.stop_received = received
+        try:
+            # No more audio is recorded so further streaming passes would only delay the transcription
+            if session.streaming is not None:
+                session.streaming.stop()
+            audio = session.recorder.stop()
+            session.recording = False
+            logging.info("Recorded %.3f seconds of audio", len(audio) / SAMPLE_RATE)
+            job = TranscriptionJob(audio, session.streaming, received=received, session=session)
+            job.timings["stop"] = (job.created - received).total_seconds()
+            self.jobs.put(job)
+            session.streaming = None
+        finally:
+            session.stop_received = None
+        return True
+
+    def transcription_worker(self) -> None:
+        """
+        Transcribes the queued recordings, in the order they were recorded,
+        until a None job is received. Recordings that finish close together,
+        from different sessions, are transcribed together in one batch.
+        """
+        running = True
+        while running:
+            job = self.jobs.get()
+            if job is None:
+                return None
+            jobs, running = self.collect_batch(job)
+            try:
+                self.process_jobs(jobs)
+            except Exception as e:
+                logging.error("Failed to process recording: %s", e)
+                self.writer.write(f"Failed to process recording: {e}", TAG_RED)
         return None
 
-    def stop_and_transcribe(self) -> None:
+    def collect_batch(self, job: TranscriptionJob) -> tuple[list[TranscriptionJob], bool]:
         """
-        Stops the currently running recording to then have this transcribed.
+        Returns the job along with any other queued jobs, up to the batch size.
+        The recordings of other sessions whose stop command is received within
+        the batch window of this recording being queued join the batch, so a
+        single pilot is never delayed. The window ends when the other stop
+        command arrives rather than when its recording is queued, so the time
+        taken to stop the other session's input stream is not counted against it.
+        Also returns False when the None job was received.
         """
-        if not self.recording:
-            logging.warning("Not currently recording—ignoring stop command.")
-            self.writer.write("Not currently recording—ignoring stop command", TAG_ORANGE)
-            return None
-        logging.info("Stopping recording...")
-        self.writer.write("Stopped recording", TAG_GREY)
-        self.stream.stop()
-        self.stream.close()
-        self.stream = None
-        self.wave_file.close()
-        self.wave_file = None
-        self.recording = False
-        time.sleep(0.01)
-        logging.debug("Checking if file exists: %s", self.audio_file)
-        if os.path.exists(self.audio_file):
-            size = os.path.getsize(self.audio_file)
-            logging.info("Audio file size = %s bytes", size)
-        else:
-            logging.error(("Audio file '%s' not found", self.audio_file))
-            self.writer.write("Audio file not found!", TAG_RED)
-            return None
-        recognized_text = self.transcribe_audio(self.audio_file)
-        if recognized_text:
+        config = self.config
+        jobs = [job]
+        deadline = job.created + timedelta(milliseconds=config.get_batch_window())
+        while len(jobs) < config.get_batch_size():
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                wait = self.get_batch_wait(deadline)
+                if wait is None:
+                    break
+                try:
+                    job = self.jobs.get(timeout=wait)
+                except queue.Empty:
+                    continue
+            if job is None:
+                return jobs, False
+            jobs.append(job)
+        return jobs, True
+
+    def get_batch_wait(self, deadline: datetime) -> float | None:
+        """
+        Returns how long in seconds to wait for the recordings of other sessions
+        to join the batch, or None when there are none to wait for. A session
+        whose stop command was received by the deadline is waited for until
+        its recording is queued, and a session still recording is waited for
+        until the deadline.
+        """
+        now = datetime.now()
+        waits = []
+        for session in self.get_sessions():
+            stop_received = session.stop_received
+            if stop_received is not None and stop_received <= deadline:
+                waits.append(STOP_POLL_SECONDS)
+            elif stop_received is None and session.recording and now < deadline:
+                waits.append((deadline - now).total_seconds())
+        return min(waits, default=None)
+
+    def process_jobs(self, jobs: list[TranscriptionJob]) -> None:
+        """
+        Transcribes a batch of recordings and sends each result to VoiceAttack or the DCS kneeboard,
+        or back to the client that uploaded the audio.
+        Every stage reads the configuration captured here, so a reload part way
+        through never mixes two configurations for the same recordings.
+        """
+        start_time = datetime.now()
+        config = self.config
+        prepared = []
+        for job in jobs:
+            job.timings["queue"] = (start_time - job.created).total_seconds()
+            prepared.append(self.prepare_audio(job, config))
+        recognized_texts = [None] * len(jobs)
+        texts = []
+        indexes = [index for index, (audio, committed_text) in enumerate(prepared) if len(audio) > 0 or committed_text]
+        if indexes:
+            results = self.transcribe_batch(
+                [prepared[index][0] for index in indexes],
+                config,
+                [prepared[index][1] for index in indexes],
+                [jobs[index].timings for index in indexes],
+                texts
+            )
+            for index, recognized_text in zip(indexes, results):
+                recognized_texts[index] = recognized_text
+            for index, (raw_text, cleaned_text) in zip(indexes, texts):
+                jobs[index].raw_text = raw_text
+                jobs[index].cleaned_text = cleaned_text
+        for job, recognized_text in zip(jobs, recognized_texts):
+            self.process_job(job, recognized_text)
+        return None
+
+    def prepare_audio(self, job: TranscriptionJob, config: WhisperAttackConfiguration) -> tuple[np.ndarray, str]:
+        """
+        Finishes any streaming transcription of the recording and trims its silence.
+        Returns the audio left to transcribe and the text already committed by streaming.
+        """
+        start_time = datetime.now()
+        audio = job.audio
+        committed_text = ""
+        if len(audio) == 0:
+            logging.error("No audio was recorded")
+            self.writer.write("No audio was recorded!", TAG_RED)
+            if job.streaming is not None:
+                job.streaming.finish(audio)
+            return audio, committed_text
+        if job.streaming is not None:
+            committed_text, audio = job.streaming.finish(audio)
+            job.timings["streaming"] = (datetime.now() - start_time).total_seconds()
+            logging.info("Streaming committed '%s', %.3f seconds left to transcribe", committed_text, len(audio) / SAMPLE_RATE)
+        if config.get_vad_enabled():
+            vad_start_time = datetime.now()
+            audio = self.trim_silence(audio, config)
+            job.timings["vad"] = (datetime.now() - vad_start_time).total_seconds()
+        return audio, committed_text
+
+    def process_job(self, job: TranscriptionJob, recognized_text: str | None) -> None:
+        """
+        Sends the transcription of a recording to VoiceAttack or the DCS kneeboard,
+        or back to the client that uploaded the audio.
+        """
+        destination = None
+        final_text = None
+        if recognized_text and job.deliver:
+            delivery_start_time = datetime.now()
             trigger_phrase = "note "
             if recognized_text.lower().startswith(trigger_phrase):
+                destination = "kneeboard"
+                final_text = recognized_text[5:].strip()
                 self.send_to_dcs_kneeboard(recognized_text)
             else:
+                destination = "voiceattack"
+                final_text = recognized_text
                 self.send_to_voiceattack(recognized_text)
-        else:
+            job.timings["delivery"] = (datetime.now() - delivery_start_time).total_seconds()
+        elif not recognized_text:
             logging.info("No transcription result.")
             self.writer.write("No transcription result", TAG_GREY)
+        job.timings["total"] = (datetime.now() - job.received).total_seconds()
+        self.stats.record_spans(job.timings)
+        if job.session is not None:
+            job.session.record_job(job)
+        logging.info("Pipeline timings: %s", {stage: f"{seconds * 1000:.1f}ms" for stage, seconds in job.timings.items()})
+        if job.reply_to is not None:
+            destination = destination or "client"
+            final_text = final_text or recognized_text
+        log_event({
+            "utterance": job.utterance_id,
+            "session": job.session.session_id if job.session is not None else None,
+            "received": job.received.isoformat(timespec='milliseconds'),
+            "audio_seconds": round(len(job.audio) / SAMPLE_RATE, 3),
+            "timings_ms": {stage: round(seconds * 1000, 3) for stage, seconds in job.timings.items()},
+            "raw_text": job.raw_text,
+            "cleaned_text": job.cleaned_text,
+            "final_text": final_text,
+            "destination": destination
+        })
+        if job.reply_to is not None:
+            self.send_reply(job.reply_to, {"ok": True, "verb": "transcribe", "text": recognized_text or "", "timings": job.timings})
         return None
 
-    def transcribe_audio(self, audio_path: str) -> str | None:
+    def trim_silence(self, audio: np.ndarray, config: WhisperAttackConfiguration) -> np.ndarray:
+        """
+        Trims the silence from the start and end of the audio so that
+        Whisper does not have to encode it. Returns an empty array when
+        no speech is detected.
+        """
+        original_duration = len(audio) / SAMPLE_RATE
+        speech = detect_speech(audio, config.get_vad_threshold())
+        if speech is None:
+            logging.info("No speech detected in %.3f seconds of audio", original_duration)
+            self.writer.write("No speech detected", TAG_GREY)
+            return audio[:0]
+        start, end = speech
+        audio = audio[start:end]
+        logging.info("Trimmed silence from audio, original=%.3f seconds, trimmed=%.3f seconds", original_duration, len(audio) / SAMPLE_RATE)
+        return audio
+
+    def get_prompt_tokens(self, model, config: WhisperAttackConfiguration) -> list[int]:
+        """
+        Returns the initial prompt tokenized for the model. The prompt is only
+        tokenized the first time, when the model is warmed up, and again when
+        the initial prompt, or the fuzzy words it includes, are changed,
+        instead of on every transcription.
+        """
+        initial_prompt = config.get_initial_prompt().strip()
+        tokenized = self.prompt_tokens.get(model)
+        if tokenized is not None and tokenized[0] == initial_prompt:
+            return tokenized[1]
+        prompt_tokens = model.hf_tokenizer.encode(f" {initial_prompt}", add_special_tokens=False).ids if initial_prompt else []
+        # Whisper only uses the end of the prompt when it is too long
+        if len(prompt_tokens) > MAX_PROMPT_TOKENS:
+            logging.warning("Initial prompt is %s tokens long, only the last %s tokens are used", len(prompt_tokens), MAX_PROMPT_TOKENS)
+        else:
+            logging.info("Initial prompt is %s tokens long", len(prompt_tokens))
+        self.prompt_tokens[model] = (initial_prompt, prompt_tokens)
+        return prompt_tokens
+
+    def decode_audio(
+        self,
+        audio: np.ndarray | str,
+        config: WhisperAttackConfiguration,
+        prompt: str = "",
+        word_timestamps: bool = False,
+        model=None
+    ) -> list:
+        """
+        Runs the Whisper model, or the given model, over the audio and returns the decoded segments.
+        The prompt is appended to the initial prompt to give the model the
+        context of any text that has already been transcribed.
+        """
+        with self.model_lock:
+            model = model or self.model
+            prompt_tokens = self.get_prompt_tokens(model, config)
+            if prompt:
+                prompt_tokens = prompt_tokens + model.hf_tokenizer.encode(prompt, add_special_tokens=False).ids
+            segments, _ = model.transcribe(
+                audio,
+                language='en',
+                beam_size=config.get_beam_size(),
+                temperature=config.get_temperature(),
+                suppress_tokens=config.get_suppress_tokens(),
+                without_timestamps=config.get_without_timestamps() and not word_timestamps,
+                condition_on_previous_text=config.get_condition_on_previous_text(),
+                initial_prompt=prompt_tokens or None,
+                word_timestamps=word_timestamps
+            )
+            return list(segments)
+
+    def transcribe_audio(self, audio: np.ndarray | str, committed_text: str = "", timings: dict[str, float] | None = None) -> str | None:
         """
         Transcribes the recorded audio to text and then returns the final result
         after running it through functions to cleanup the raw text.
+        The audio is either the recorded float32 samples or a path to an audio file.
+        Any text already committed by streaming transcription is prefixed to
+        the transcription of the remaining audio.
+        The time taken by each stage is added to the timings when given.
+        """
+        return self.transcribe_batch([audio], self.config, [committed_text], [timings])[0]
+
+    def transcribe_batch(
+        self,
+        audios: list[np.ndarray | str],
+        config: WhisperAttackConfiguration,
+        committed_texts: list[str],
+        timings: list[dict[str, float] | None],
+        texts_out: list[tuple[str, str | None]] | None = None
+    ) -> list[str | None]:
+        """
+        Transcribes each recording in the same way as transcribe_audio and
+        returns their final results. When there are several recordings that
+        only need the initial prompt they are decoded together in one batch,
+        otherwise each recording is decoded in turn. Every stage uses the given configuration.
+        The raw transcription of each recording, and the text cleaned up before
+        fuzzy matching or None when there was none, are added to texts_out when given.
         """
         try:
-            logging.info("Transcribing audio...")
+            logging.info("Transcribing audio..." if len(audios) == 1 else f"Transcribing {len(audios)} recordings...")
             start_time = datetime.now()
-            segments, _ = self.model.transcribe(
-                audio_path,
-                language='en',
-                beam_size=5,
-                suppress_tokens=[0,11,13,30,986],
-                initial_prompt=(
-                    "This is aviation-related speech for DCS Digital Combat Simulator, "
-                    "Expect references to airports in Caucasus Georgia and Russia. Expect callsigns like Enfield, Springfield, Uzi, Colt, Dodge, "
-                    "Ford, Chevy, Pontiac, Army Air, Apache, Crow, Sioux, Gatling, Gunslinger, "
-                    "Hammerhead, Bootleg, Palehorse, Carnivor, Saber, Hawg, Boar, Pig, Tusk, Viper, "
-                    "Venom, Lobo, Cowboy, Python, Rattler, Panther, Wolf, Weasel, Wild, Ninja, Jedi, "
-                    "Hornet, Squid, Ragin, Roman, Sting, Jury, Joker, Ram, Hawk, Devil, Check, Snake, "
-                    "Dude, Thud, Gunny, Trek, Sniper, Sled, Best, Jazz, Rage, Tahoe, Bone, Dark, Vader, "
-                    "Buff, Dump, Kenworth, Heavy, Trash, Cargo, Ascot, Overlord, Magic, Wizard, Focus, "
-                    "Darkstar, Texaco, Arco, Shell, Axeman, Darknight, Warrior, Pointer, Eyeball, "
-                    "Moonbeam, Whiplash, Finger, Pinpoint, Ferret, Shaba, Playboy, Hammer, Jaguar, "
-                    "Deathstar, Anvil, Firefly, Mantis, Badger. Also expect usage of the phonetic "
-                    "alphabet Alpha, Bravo, Charlie, X-ray."
-                )
-            )
+            raw_texts = list(committed_texts)
+            cache_keys = [None] * len(audios)
+            model_settings = self.model_settings
+            pending = []
+            for index, (audio, committed_text) in enumerate(zip(audios, committed_texts)):
+                if len(audio) == 0:
+                    continue
+                # Without the settings of the loaded models the key cannot tell the models apart
+                if self.audio_cache is not None and model_settings and isinstance(audio, np.ndarray):
+                    cache_keys[index] = self.audio_cache.get_key(audio, self.get_decode_parameters(committed_text, config, model_settings))
+                    cached_text = self.audio_cache.get(cache_keys[index])
+                    if cached_text is not None:
+                        raw_texts[index] = cached_text
+                        cache_keys[index] = None
+                        logging.info("Transcription of identical audio found in the cache, cache %s", self.audio_cache.get_stats())
+                        continue
+                pending.append(index)
 
-            raw_text = ""
-            for segment in segments:
-                raw_text += f"{segment.text}"
+            # The time each recording took to decode, a batch's time is shared between its recordings
+            decode_seconds = [0.0] * len(audios)
+            batched = [index for index in pending if self.can_batch(audios[index], config, committed_texts[index])]
+            if len(batched) > 1:
+                try:
+                    batch_start_time = datetime.now()
+                    for index, raw_text in zip(batched, self.decode_batch([audios[index] for index in batched], config)):
+                        raw_texts[index] = raw_text
+                    batch_duration = (datetime.now() - batch_start_time).total_seconds()
+                    for index in batched:
+                        decode_seconds[index] = batch_duration / len(batched)
+                    pending = [index for index in pending if index not in batched]
+                except Exception as e:
+                    logging.warning("Failed to transcribe the recordings as a batch, transcribing them in turn: %s", e)
+            for index in pending:
+                decode_start_time = datetime.now()
+                if self.cascade_model is not None:
+                    raw_texts[index] = self.decode_with_cascade(audios[index], config, committed_texts[index])
+                else:
+                    for segment in self.decode_audio(audios[index], config, committed_texts[index]):
+                        raw_texts[index] += f"{segment.text}"
+                decode_seconds[index] = (datetime.now() - decode_start_time).total_seconds()
+            # Text decoded by models swapped in since the keys were made is not cached under those keys
+            for cache_key, raw_text in zip(cache_keys, raw_texts):
+                if cache_key is not None and self.model_settings is model_settings:
+                    self.audio_cache.put(cache_key, raw_text)
 
             end_time = datetime.now()
             duration = end_time - start_time
             logging.info(f"Transcribing took {duration.total_seconds():.3f} seconds.")
-            logging.info("Raw transcription result: '%s'", raw_text)
-            self.writer.write(f"Raw transcribed text: '{raw_text}'", TAG_BLUE)
-            # Ignore blank audio as nothing has been recorded
-            if raw_text.strip() == "[BLANK_AUDIO]" or raw_text.strip() == "":
-                return None
-            cleaned_text = custom_cleanup_text(raw_text, self.config.get_word_mappings())
-            fuzzy_corrected_text = correct_dcs_and_phonetics_separately(
-                cleaned_text,
-                self.config.get_fuzzy_words(),
-                phonetic_alphabet,
-                dcs_threshold=85,
-                phonetic_threshold=85
-            )
-            logging.info("Cleaned transcription: %s", cleaned_text)
-            logging.info("Fuzzy-corrected transcription: %s", fuzzy_corrected_text)
-            return fuzzy_corrected_text
+            results = []
+            cleaned_texts = []
+            for raw_text, recording_timings, recording_decode_seconds in zip(raw_texts, timings, decode_seconds):
+                logging.info("Raw transcription result: '%s'", raw_text)
+                self.writer.write(f"Raw transcribed text: '{raw_text}'", TAG_BLUE)
+                if recording_timings is not None:
+                    recording_timings["decode"] = recording_decode_seconds
+                # Ignore blank audio as nothing has been recorded
+                if raw_text.strip() == "[BLANK_AUDIO]" or raw_text.strip() == "":
+                    results.append(None)
+                    cleaned_texts.append(None)
+                    continue
+                final_text, _, cleaned_text = self.cleanup_transcription(raw_text, config, recording_timings)
+                results.append(final_text)
+                cleaned_texts.append(cleaned_text)
+            if texts_out is not None:
+                texts_out.extend(zip((raw_text.strip() for raw_text in raw_texts), cleaned_texts))
+            return results
         except Exception as e:
             logging.error("Failed to transcribe audio: %s", e)
             self.writer.write(f"Failed to transcribe audio: {e}", TAG_RED)
-            return None
+            return [None] * len(audios)
+
+    def can_batch(self, audio: np.ndarray | str, config: WhisperAttackConfiguration, committed_text: str) -> bool:
+        """
+        Returns whether the recording can be decoded as part of a batch. The
+        batch shares the initial prompt, so text committed by streaming rules
+        a recording out, and the cascade model decides per recording whether
+        it is decoded again by the Whisper model.
+        """
+        return (
+            config.get_batch_size() > 1
+            and self.cascade_model is None
+            and isinstance(audio, np.ndarray)
+            and not committed_text
+            and len(audio) <= MAX_BATCH_SECONDS * SAMPLE_RATE
+        )
+
+    def decode_batch(self, audios: list[np.ndarray], config: WhisperAttackConfiguration) -> list[str]:
+        """
+        Decodes several recordings together with faster-whisper's batched
+        inference pipeline and returns the raw text of each. The recordings
+        are placed one after another, each starting on a whole second, and
+        given to the pipeline as separate clips so that the model encodes and
+        decodes all of them in one pass.
+        """
+        from faster_whisper import BatchedInferencePipeline
+        offsets = []
+        length = 0
+        for audio in audios:
+            offsets.append(length)
+            length += -(-len(audio) // SAMPLE_RATE) * SAMPLE_RATE
+        combined = np.zeros(length, dtype=np.float32)
+        clips = []
+        for offset, audio in zip(offsets, audios):
+            combined[offset:offset + len(audio)] = audio
+            clips.append({"start": offset / SAMPLE_RATE, "end": (offset + len(audio)) / SAMPLE_RATE})
+        with self.model_lock:
+            model = self.model
+            initial_prompt = config.get_initial_prompt().strip()
+            segments, _ = BatchedInferencePipeline(model).transcribe(
+                combined,
+                language='en',
+                beam_size=config.get_beam_size(),
+                temperature=config.get_temperature(),
+                suppress_tokens=config.get_suppress_tokens(),
+                without_timestamps=config.get_without_timestamps(),
+                initial_prompt=f" {initial_prompt}" if initial_prompt else None,
+                clip_timestamps=clips,
+                batch_size=len(audios)
+            )
+            segments = list(segments)
+        # Each segment's seek is the start of the clip it was decoded from, in frames
+        texts = {offset // SAMPLE_RATE: "" for offset in offsets}
+        for segment in segments:
+            texts[round(segment.seek / model.frames_per_second)] += segment.text
+        counts = self.batch_counts
+        counts["batches"] += 1
+        counts["utterances"] += len(audios)
+        logging.info("Transcribed %s recordings in one batch, %.2f recordings per batch on average", len(audios), counts["utterances"] / counts["batches"])
+        return [texts[offset // SAMPLE_RATE] for offset in offsets]
+
+    def get_decode_parameters(self, committed_text: str, config: WhisperAttackConfiguration, model_settings: dict) -> dict:
+        """
+        Returns everything that affects the raw text decoded from audio, used
+        with the audio to find identical transcriptions in the audio cache.
+        The model settings are those the loaded models were loaded with,
+        including the calibrated compute type and CPU threads.
+        """
+        parameters = model_settings | {
+            "initial_prompt": config.get_initial_prompt(),
+            "beam_size": config.get_beam_size(),
+            "temperature": config.get_temperature(),
+            "suppress_tokens": config.get_suppress_tokens(),
+            "without_timestamps": config.get_without_timestamps(),
+            "condition_on_previous_text": config.get_condition_on_previous_text(),
+            "committed_text": committed_text
+        }
+        if self.cascade_model is not None:
+            # The cleaned up text decides whether the cascade model's text is used
+            parameters |= {
+                "cascade_min_logprob": config.get_cascade_min_logprob(),
+                "cascade_max_no_speech_prob": config.get_cascade_max_no_speech_prob(),
+                "cascade_min_fuzzy_score": config.get_cascade_min_fuzzy_score(),
+                "word_mappings": config.get_word_mappings(),
+                "fuzzy_words": config.get_fuzzy_words()
+            }
+        return parameters
+
+    def decode_with_cascade(self, audio: np.ndarray, config: WhisperAttackConfiguration, committed_text: str = "") -> str:
+        """
+        Decodes the audio with the cascade model and returns its raw text when
+        it is confident of the transcription, otherwise the audio is decoded
+        again with the Whisper model.
+        Confidence comes from the average log probability and no speech
+        probability of the decoded segments, and how closely any words
+        corrected by fuzzy matching matched the fuzzy words.
+        """
+        segments = self.decode_audio(audio, config, committed_text, model=self.cascade_model)
+        raw_text = committed_text + "".join(segment.text for segment in segments)
+        avg_logprob = min((segment.avg_logprob for segment in segments), default=None)
+        no_speech_prob = max((segment.no_speech_prob for segment in segments), default=None)
+        reason = None
+        if not segments or raw_text.strip() == "":
+            reason = "no text was decoded"
+        elif avg_logprob < config.get_cascade_min_logprob():
+            reason = f"average log probability {avg_logprob:.3f}"
+        elif no_speech_prob > config.get_cascade_max_no_speech_prob():
+            reason = f"no speech probability {no_speech_prob:.3f}"
+        else:
+            # Scored without the text cache, so that a rejected transcription
+            # is never cached and does not count towards the cache's hit rate
+            _, fuzzy_score, _ = self.run_cleanup(raw_text.strip(), config)
+            if fuzzy_score is not None and fuzzy_score < config.get_cascade_min_fuzzy_score():
+                reason = f"fuzzy match score {fuzzy_score:.1f}"
+
+        counts = self.cascade_counts
+        if reason is None:
+            counts["accepted"] += 1
+        else:
+            counts["escalated"] += 1
+        decoded = counts["accepted"] + counts["escalated"]
+        hit_rate = f"cascade hit rate {100 * counts['accepted'] / decoded:.1f}% ({counts['accepted']} of {decoded})"
+        if reason is None:
+            logging.info("Cascade model transcription accepted, %s", hit_rate)
+            return raw_text
+        logging.info("Cascade model transcription '%s' rejected, %s, %s", raw_text, reason, hit_rate)
+        self.writer.write(f"Cascade model not confident ({reason}), transcribing with the Whisper model", TAG_GREY)
+        return committed_text + "".join(segment.text for segment in self.decode_audio(audio, config, committed_text))
+
+    def cleanup_transcription(
+        self,
+        raw_text: str,
+        config: WhisperAttackConfiguration,
+        timings: dict[str, float] | None = None
+    ) -> tuple[str, float | None, str | None]:
+        """
+        Runs the raw transcription through the cleanup and fuzzy matching.
+        Returns the final text, the lowest score of the words corrected by
+        fuzzy matching, or None when no words were corrected, and the cleaned
+        up text before fuzzy matching.
+        When a command grammar is loaded and the transcription matches one of
+        its phrases, the phrase and its score are returned without any
+        cleanup, and the cleaned up text is None.
+        The same phrases are spoken repeatedly so the result is cached
+        for each raw transcription until the configuration changes.
+        The time taken by the cleanup and the fuzzy matching is added to the timings when given.
+        """
+        start_time = datetime.now()
+        raw_text = raw_text.strip()
+        version = config.get_version()
+        cached_result = self.text_cache.get(raw_text, version)
+        if cached_result is not None:
+            logging.info("Fuzzy-corrected transcription (cached): %s, cache %s", cached_result[0], self.text_cache.get_stats())
+            if timings is not None:
+                timings["cleanup"] = (datetime.now() - start_time).total_seconds()
+            return cached_result
+        result = self.run_cleanup(raw_text, config, timings)
+        self.text_cache.put(raw_text, version, result)
+        logging.info("Fuzzy-corrected transcription: %s, cache %s", result[0], self.text_cache.get_stats())
+        return result
+
+    def run_cleanup(
+        self,
+        raw_text: str,
+        config: WhisperAttackConfiguration,
+        timings: dict[str, float] | None = None
+    ) -> tuple[str, float | None, str | None]:
+        """
+        Runs the raw transcription through the command grammar, the cleanup and
+        the fuzzy matching without the text cache. Returns the same final text,
+        score and cleaned up text as cleanup_transcription.
+        """
+        start_time = datetime.now()
+        command_grammar = config.get_command_grammar()
+        # Notes for the DCS kneeboard are free-form text and never a command
+        if command_grammar is not None and not NOTE_PATTERN.match(raw_text):
+            command = command_grammar.match(raw_text, config.get_command_grammar_threshold())
+            if command is not None:
+                logging.info("Matched command phrase: %s, score %.1f", *command)
+                if timings is not None:
+                    timings["cleanup"] = (datetime.now() - start_time).total_seconds()
+                return command[0], command[1], None
+        cleaned_text = custom_cleanup_text(raw_text, config.get_word_mapping_matcher())
+        fuzzy_start_time = datetime.now()
+        match_scores = []
+        fuzzy_corrected_text = correct_dcs_and_phonetics_separately(
+            cleaned_text,
+            config.get_fuzzy_matcher(),
+            phonetic_matcher,
+            match_scores
+        )
+        if timings is not None:
+            timings["cleanup"] = (fuzzy_start_time - start_time).total_seconds()
+            timings["fuzzy"] = (datetime.now() - fuzzy_start_time).total_seconds()
+        logging.info("Cleaned transcription: %s", cleaned_text)
+        return fuzzy_corrected_text, min(match_scores, default=None), cleaned_text
+
+    def get_kneeboard(self) -> KneeboardDocument:
+        """
+        Returns the document that notes are added to, a new document is
+        started when the line or page length has been changed.
+        """
+        config = self.config
+        line_length = config.get_text_line_length()
+        page_lines = config.get_kneeboard_page_lines()
+        kneeboard = self.kneeboard
+        if kneeboard is None or kneeboard.line_length != line_length or kneeboard.page_lines != page_lines:
+            kneeboard = self.kneeboard = KneeboardDocument(line_length, page_lines)
+        return kneeboard
 
     def send_to_dcs_kneeboard(self, text: str) -> None:
         """
         Copy the text to the clipboard and then send to
         the DCS kneeboard.
         """
+        import keyboard
+        import pyperclip
         # Strip the "note" trigger phrase and then format into multiple
-        # lines to fit the kneeboard page
-        text_for_kneeboard = format_for_dcs_kneeboard(text[5:].strip(), self.config.get_text_line_length())
+        # lines to fit the kneeboard page, only the new lines are sent
+        text_for_kneeboard = self.get_kneeboard().append_note(text[5:].strip())
         pyperclip.copy(text_for_kneeboard)
         logging.info("Text copied to clipboard for DCS kneeboard.")
         try:
@@ -387,66 +1167,495 @@ class WhisperServer:
         """
         Sends the transcribed text to VoiceAttack.
         """
-        try:
-            logging.info("Sending recognized text to VoiceAttack: %s", text)
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
-                client_socket.connect((self.voiceattack_host, self.voiceattack_port))
-                client_socket.sendall(text.encode())
+        logging.info("Sending recognized text to VoiceAttack: %s", text)
+        self.voiceattack.send(text)
 
-            logging.info("Sent text to VoiceAttack: %s", text)
-            self.writer.write(f"Sent text to VoiceAttack: {text}", TAG_GREEN)
-        except Exception as e:
-            logging.error("Error calling VoiceAttack (%s:%s): %s", self.voiceattack_host, self.voiceattack_port, e)
-            self.writer.write(f"Error calling VoiceAttack: {e}", TAG_RED)
-        finally:
-            client_socket.close()
+    def voiceattack_sent(self, text: str, duration: float) -> None:
+        """
+        Callback handler once text has been sent to VoiceAttack,
+        with the time since the text was queued to be sent.
+        """
+        self.stats.record("voiceattack", duration)
+        logging.info("Sent text to VoiceAttack: %s", text)
+        self.writer.write(f"Sent text to VoiceAttack: {text}", TAG_GREEN)
 
-    def handle_command(self, cmd: str) -> None:
+    def voiceattack_error(self, text: str, error: Exception) -> None:
+        """
+        Callback handler when text could not be sent to VoiceAttack.
+        """
+        logging.error("Error calling VoiceAttack (%s:%s) with '%s': %s", self.voiceattack_host, self.voiceattack_port, text, error)
+        self.writer.write(f"Error calling VoiceAttack: {error}", TAG_RED)
+
+    def handle_command(self, cmd: str, session_id: str | None = None, device: int | str | None = None) -> bool:
         """
         Triggers the operation for the associated command that was received.
+        The start and stop commands apply to the session with the ID, which
+        plain text clients give after the command, e.g. "start copilot", or
+        the default session when no ID is given. A new session records from
+        the given input device.
+        Returns whether the command was carried out.
         """
         cmd = cmd.strip().lower()
         logging.info("Received command: %s", cmd)
-        if cmd == "start":
-            self.start_recording()
-        elif cmd == "stop":
-            self.stop_and_transcribe()
-        elif cmd == "shutdown":
+        words = cmd.split()
+        if len(words) == 2 and session_id is None:
+            cmd, session_id = words
+        if cmd in ("start", "stop") and not self.model_ready.is_set():
+            loading = "being calibrated, which can take several minutes" if self.calibrating.is_set() else "still loading"
+            logging.warning("Whisper model is %s—ignoring %s command.", loading, cmd)
+            self.writer.write(f"Whisper model is {loading}—ignoring {cmd} command", TAG_ORANGE)
+            return False
+        if cmd in ("start", "stop"):
+            session = self.get_session(session_id, device)
+            if session is None:
+                return False
+            if cmd == "start":
+                return self.start_recording(session)
+            return self.stop_and_transcribe(session)
+        if cmd == "stats":
+            self.write_stats()
+            return True
+        if cmd == "recalibrate":
+            return self.recalibrate_model()
+        if cmd == "shutdown":
             logging.info("Received shutdown command. Stopping server...")
             self.writer.write("Received shutdown command. Stopping server...")
             self.shutdown()
+            return True
+        logging.warning("Unknown command: %s", cmd)
+        self.writer.write(f"Unknown command: {cmd}", TAG_ORANGE)
+        return False
+
+    def handle_frame(self, connection: ClientConnection, frame_type: int, payload: bytes) -> None:
+        """
+        Handles a frame received from a client using the framed protocol.
+        """
+        if frame_type == FRAME_AUDIO:
+            self.receive_audio(connection, payload)
+            return None
+        if frame_type != FRAME_REQUEST:
+            raise ProtocolError(f"Unexpected frame type {frame_type}")
+        if connection.upload is not None:
+            raise ProtocolError("Request received before the audio upload was completed")
+        message = decode_message(payload)
+        verb = str(message.get("verb", "")).strip().lower()
+        if verb == "transcribe":
+            audio_format = message.get("format", "f32le")
+            if audio_format not in AUDIO_FORMATS:
+                raise ProtocolError(f"Unsupported audio format '{audio_format}'")
+            if message.get("sample_rate", SAMPLE_RATE) != SAMPLE_RATE:
+                raise ProtocolError(f"Audio must be sampled at {SAMPLE_RATE}Hz")
+            session = self.get_session(message.get("session"))
+            if not self.model_ready.is_set():
+                self.queue_output(connection, encode_message(FRAME_RESPONSE, {"ok": False, "verb": verb, "error": "Whisper model is still loading"}))
+                connection.upload = {}
+            elif session is None:
+                self.queue_output(connection, encode_message(FRAME_RESPONSE, {"ok": False, "verb": verb, "error": "Invalid session or too many sessions"}))
+                connection.upload = {}
+            else:
+                connection.upload = message | {"session": session}
+            connection.upload_chunks = []
+            connection.upload_samples = 0
+            return None
+        if verb == "stats":
+            self.queue_output(connection, encode_message(FRAME_RESPONSE, {"ok": True, "verb": verb, "stats": self.get_stats()}))
+            return None
+        session_id = message.get("session")
+        accepted = self.handle_command(verb, session_id, message.get("device"))
+        response = {"ok": accepted, "verb": verb}
+        if session_id is not None:
+            response["session"] = session_id
+        self.queue_output(connection, encode_message(FRAME_RESPONSE, response))
+        return None
+
+    def receive_audio(self, connection: ClientConnection, payload: bytes) -> None:
+        """
+        Adds uploaded audio to the client's transcribe request, queueing
+        the request to be transcribed once the empty audio frame that
+        ends the upload is received.
+        """
+        if connection.upload is None:
+            raise ProtocolError("Audio received without a transcribe request")
+        if payload:
+            # Audio uploaded while the model was loading has already been rejected
+            if connection.upload:
+                samples = decode_audio(payload, connection.upload.get("format", "f32le"))
+                connection.upload_samples += len(samples)
+                if connection.upload_samples > MAX_UPLOAD_SECONDS * SAMPLE_RATE:
+                    raise ProtocolError(f"Audio uploads are limited to {MAX_UPLOAD_SECONDS} seconds")
+                connection.upload_chunks.append(samples)
+            return None
+        upload = connection.upload
+        audio = np.concatenate(connection.upload_chunks) if connection.upload_chunks else np.zeros(0, dtype=np.float32)
+        connection.upload = None
+        connection.upload_chunks = []
+        if upload:
+            logging.info("Received %.3f seconds of audio to transcribe", len(audio) / SAMPLE_RATE)
+            self.jobs.put(TranscriptionJob(audio, reply_to=connection, deliver=bool(upload.get("deliver", False)), session=upload["session"]))
+        return None
+
+    def get_stats(self) -> dict:
+        """
+        Returns the latency percentiles of each pipeline stage along with
+        the cache, cascade and batch counters, and the throughput and
+        queueing delay of each session.
+        """
+        return {
+            "latency": self.stats.get_stats(),
+            "text_cache": self.text_cache.get_stats(),
+            "audio_cache": self.audio_cache.get_stats() if self.audio_cache is not None else None,
+            "cascade": dict(self.cascade_counts),
+            "batches": dict(self.batch_counts),
+            "sessions": {session.session_id: session.get_stats() for session in self.get_sessions()}
+        }
+
+    def write_stats(self) -> None:
+        """
+        Writes the latency percentiles of each pipeline stage, and the
+        throughput and queueing delay of each session, to the log and the UI.
+        """
+        lines = self.stats.format_stats()
+        if not lines:
+            lines = ["No transcriptions yet"]
+        logging.info("Pipeline latency:")
+        self.writer.write("Pipeline latency:", TAG_BLUE)
+        for line in lines:
+            logging.info("  %s", line)
+            self.writer.write(line, TAG_GREY)
+        logging.info("Text cache: %s", self.text_cache.get_stats())
+        self.writer.write(f"Text cache: {self.text_cache.get_stats()}", TAG_GREY)
+        if self.audio_cache is not None:
+            logging.info("Audio cache: %s", self.audio_cache.get_stats())
+            self.writer.write(f"Audio cache: {self.audio_cache.get_stats()}", TAG_GREY)
+        for session in self.get_sessions():
+            stats = session.get_stats()
+            if not stats["utterances"]:
+                continue
+            line = (
+                f"Session {session.session_id}: {stats['utterances']} recordings, "
+                f"{stats['utterances_per_minute'] or 0:.1f} per minute, "
+                f"queue p50={stats['queue']['p50']:.1f}ms p95={stats['queue']['p95']:.1f}ms"
+            )
+            logging.info(line)
+            self.writer.write(line, TAG_GREY)
+
+    def warm_up_model(self, config: WhisperAttackConfiguration, models: list | None = None) -> None:
+        """
+        Transcribes a short synthetic tone so that the first real transcription
+        does not pay the cost of the model's first inference allocations.
+        The loaded models are warmed up unless other models are given.
+        """
+        timeline = np.arange(SAMPLE_RATE, dtype=np.float32) / SAMPLE_RATE
+        tone = (0.1 * np.sin(2 * np.pi * 440 * timeline)).astype(np.float32)
+        for model in models or [self.model, self.cascade_model]:
+            if model is not None:
+                self.decode_audio(tone, config, model=model)
+        # Run the cleanup once so that its libraries are loaded before the first transcription
+        correct_dcs_and_phonetics_separately(
+            custom_cleanup_text("one two", config.get_word_mapping_matcher()), config.get_fuzzy_matcher(), phonetic_matcher
+        )
+
+    def load_model_in_background(self) -> None:
+        """
+        Loads and warms up the Whisper model, marking the model as ready
+        once it can be used for transcription.
+        """
+        start_time = datetime.now()
+        config = self.config
+        self.set_models(*self.load_whisper_model(config))
+        load_duration = (datetime.now() - start_time).total_seconds()
+        start_time = datetime.now()
+        self.warm_up_model(config)
+        warm_up_duration = (datetime.now() - start_time).total_seconds()
+        self.model_ready.set()
+        logging.info("Whisper model loaded in %.3f seconds, warm-up took %.3f seconds", load_duration, warm_up_duration)
+        self.writer.write(f"Whisper model ready, loaded in {load_duration:.3f} seconds, warm-up took {warm_up_duration:.3f} seconds", TAG_GREEN)
+
+    def reload_configuration(self) -> None:
+        """
+        Loads the configuration files again after they have been changed and
+        swaps in the new configuration. Each configuration is a complete
+        snapshot so a transcription in progress never sees a partly updated
+        configuration. The models are swapped in the background when any of
+        the model settings changed, the current models are used until the
+        new models are ready.
+        """
+        # Reloads from the watcher and from adding a word mapping are made one at a time
+        with self.reload_lock:
+            previous_config = self.config
+            config = previous_config.reload()
+            self.config = config
+        previous_settings = previous_config.get_configuration()
+        settings = config.get_configuration()
+        changed = {key for key in previous_settings.keys() | settings.keys() if previous_settings.get(key) != settings.get(key)}
+        logging.info("Reloaded configuration, changed settings: %s", sorted(changed))
+        if "log_level" in changed:
+            set_log_level(config.get_log_level())
+        self.writer.write("Reloaded configuration:", TAG_BLUE)
+        self.writer.write_dict({key: settings.get(key, "(default)") for key in sorted(changed)}, TAG_GREY)
+
+        restart_settings = sorted(changed & RESTART_SETTINGS)
+        if restart_settings:
+            logging.warning("Restart WhisperAttack for changes to %s to take effect", restart_settings)
+            self.writer.write(f"Restart WhisperAttack for changes to {', '.join(restart_settings)} to take effect", TAG_ORANGE)
+        if changed & MODEL_SETTINGS:
+            if self.model_ready.is_set():
+                Thread(daemon=True, target=self.swap_model, args=(config,)).start()
+            else:
+                logging.warning("Whisper model is still loading, restart WhisperAttack to use the changed model settings")
+                self.writer.write("Whisper model is still loading, restart WhisperAttack to use the changed model settings", TAG_ORANGE)
+
+    def add_word_mapping(self, aliases: str, replacement: str) -> None:
+        """
+        Adds a word mapping to the custom word mappings file and swaps in a
+        copy of the configuration with the mapping added to its matcher, so
+        that it is used from the next transcription without loading all the
+        configuration files again. The configuration in use is left unchanged
+        as a transcription in progress may be reading it.
+        Raises ConfigurationError when the mapping could not be written.
+        """
+        if aliases.strip() == "":
+            return None
+        location = self.config.get_app_data_location()
+        self.config.add_word_mapping(location, aliases, replacement)
+        try:
+            with self.reload_lock:
+                self.config = self.config.with_word_mapping(aliases, replacement)
+            # The mapping is already in use so the change to the file does not need to be reloaded
+            self.config_watcher.mark_seen(os.path.join(location, "word_mappings.txt"))
+        except Exception as e:
+            logging.error("Added the word mapping to word_mappings.txt but failed to use it: %s", e)
+            self.writer.write(f"Added the word mapping to word_mappings.txt but failed to use it, it is used once the configuration is reloaded: {e}", TAG_ORANGE)
+        return None
+
+    def set_models(self, model, cascade_model, model_settings: dict) -> None:
+        """
+        Replaces the loaded models, along with the settings they were loaded
+        with, in one step so that a transcription never sees the models of
+        one load with the settings of another. Only the prompts tokenized
+        for the new models are kept.
+        """
+        with self.model_lock:
+            self.model = model
+            self.cascade_model = cascade_model
+            self.model_settings = model_settings
+            for tokenized_model in list(self.prompt_tokens.keys()):
+                if tokenized_model is not model and tokenized_model is not cascade_model:
+                    del self.prompt_tokens[tokenized_model]
+
+    def swap_model(self, config: WhisperAttackConfiguration) -> None:
+        """
+        Loads and warms up the models for the configuration, replacing the
+        current models once they are ready.
+        """
+        with self.model_swap_lock:
+            start_time = datetime.now()
+            try:
+                model, cascade_model, model_settings = self.load_whisper_model(config)
+                self.warm_up_model(config, [model, cascade_model])
+            except Exception as e:
+                logging.error("Failed to load the Whisper model, still using the previous model: %s", e)
+                self.writer.write(f"Failed to load the Whisper model, still using the previous model: {e}", TAG_RED)
+                return None
+            self.set_models(model, cascade_model, model_settings)
+            duration = (datetime.now() - start_time).total_seconds()
+            logging.info("Swapped Whisper model in %.3f seconds", duration)
+            self.writer.write(f"Whisper model swapped, loaded in {duration:.3f} seconds", TAG_GREEN)
+        return None
+
+    def recalibrate_model(self) -> bool:
+        """
+        Discards the kept calibrations and loads the model again in the
+        background, which calibrates it again, e.g. after a driver update or
+        when other applications now compete for the CPU. The current model is
+        used until the new model is ready.
+        Returns whether the recalibration was started.
+        """
+        if not self.config.get_auto_tune():
+            logging.warning("auto_tune is disabled—ignoring recalibrate command.")
+            self.writer.write("auto_tune is disabled—ignoring recalibrate command", TAG_ORANGE)
+            return False
+        if not self.model_ready.is_set():
+            logging.warning("Whisper model is still loading—ignoring recalibrate command.")
+            self.writer.write("Whisper model is still loading—ignoring recalibrate command", TAG_ORANGE)
+            return False
+        ModelCalibration(self.config.get_app_data_location()).clear()
+        logging.info("Recalibrating Whisper model...")
+        self.writer.write("Recalibrating Whisper model ...")
+        Thread(daemon=True, target=self.swap_model, args=(self.config,)).start()
+        return True
+
+    def send_reply(self, connection: ClientConnection, message: dict) -> None:
+        """
+        Sends a response to a client from the transcription worker. The response
+        is handed to the server thread, which owns the client connections.
+        """
+        self.replies.put((connection, encode_message(FRAME_RESPONSE, message)))
+        if self.wakeup_send is not None:
+            self.wakeup_send.send(b"\0")
+
+    def queue_output(self, connection: ClientConnection, data: bytes) -> None:
+        """
+        Queues data to be written to a client once its connection is writable.
+        """
+        if connection.closed:
+            return None
+        connection.output += data
+        self.selector.modify(connection.conn, selectors.EVENT_READ | selectors.EVENT_WRITE, data=connection)
+        return None
+
+    def flush_replies(self) -> None:
+        """
+        Queues the responses from the transcription worker to be written to their clients.
+        """
+        self.wakeup_receive.recv(1024)
+        while not self.replies.empty():
+            connection, data = self.replies.get()
+            self.queue_output(connection, data)
+
+    def accept_connection(self, server_socket: socket.socket) -> None:
+        """
+        Accepts a new client connection and registers it to have its commands read.
+        """
+        conn, _ = server_socket.accept()
+        conn.setblocking(False)
+        self.selector.register(conn, selectors.EVENT_READ, data=ClientConnection(conn))
+
+    def close_connection(self, connection: ClientConnection) -> None:
+        """
+        Stops reading from a client connection and closes it.
+        """
+        connection.closed = True
+        try:
+            self.selector.unregister(connection.conn)
+        except (KeyError, ValueError):
+            pass
+        connection.conn.close()
+
+    def read_connection(self, connection: ClientConnection) -> None:
+        """
+        Reads from a client connection. Plain text clients have each newline
+        terminated command handled, or a single command without a newline
+        handled when they close the connection. A plain text client that
+        sends more than a frame's maximum payload without a newline is
+        disconnected. Framed protocol clients have each complete frame handled.
+        """
+        data = connection.conn.recv(65536)
+        if connection.framed is None and data:
+            connection.framed = is_framed(data)
+        if connection.framed:
+            if not data:
+                self.close_connection(connection)
+                return None
+            try:
+                for frame_type, payload in connection.decoder.feed(data):
+                    self.handle_frame(connection, frame_type, payload)
+            except ProtocolError as error:
+                logging.warning("Protocol error: %s", error)
+                self.queue_output(connection, encode_message(FRAME_RESPONSE, {"ok": False, "error": str(error)}))
+                connection.close_after_output = True
+                self.selector.modify(connection.conn, selectors.EVENT_WRITE, data=connection)
+            return None
+        if data:
+            connection.text_buffer += data
+            *commands, remainder = connection.text_buffer.split(b"\n")
+            connection.text_buffer[:] = remainder
+        else:
+            commands = [bytes(connection.text_buffer)]
+            self.close_connection(connection)
+        for command in commands:
+            if command.strip():
+                self.handle_command(command.decode('utf-8'))
+        if not connection.closed and len(connection.text_buffer) > MAX_PAYLOAD_SIZE:
+            logging.warning("Command of more than %s bytes without a newline, closing the connection", MAX_PAYLOAD_SIZE)
+            self.close_connection(connection)
+        return None
+
+    def write_connection(self, connection: ClientConnection) -> None:
+        """
+        Writes queued output to a client connection.
+        """
+        sent = connection.conn.send(connection.output)
+        del connection.output[:sent]
+        if connection.output:
+            return None
+        if connection.close_after_output:
+            self.close_connection(connection)
         else:
-            logging.warning("Unknown command: %s", cmd)
-            self.writer.write(f"Unknown command: {cmd}", TAG_ORANGE)
+            self.selector.modify(connection.conn, selectors.EVENT_READ, data=connection)
+        return None
 
     def run_server(self) -> None:
         """
         Starts a socket server and listens for incoming commands.
+        The Whisper model is loaded in the background so that connections
+        are accepted straight away, start and stop commands are rejected
+        until the model is ready.
+        Commands are handled as soon as they are received, recordings are
+        transcribed by a separate worker so that a new recording can be
+        started while the previous one is still being transcribed.
         """
-        self.load_whisper_model(self.config)
-
-        logging.info("Server started and listening on %s:%s", HOST, PORT)
-        self.writer.write(f"Server started and listening on {HOST}:{PORT}", TAG_GREEN)
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((HOST, PORT))
+        worker = Thread(daemon=True, target=self.transcription_worker)
+        worker.start()
+        self.wakeup_receive, self.wakeup_send = socket.socketpair()
+        with selectors.DefaultSelector() as self.selector, socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind((self.host, self.port))
             s.listen()
-            s.settimeout(1.0)
+            s.setblocking(False)
+            self.selector.register(s, selectors.EVENT_READ)
+            self.selector.register(self.wakeup_receive, selectors.EVENT_READ)
+            logging.info("Server started and listening on %s:%s", self.host, self.port)
+            self.writer.write(f"Server started and listening on {self.host}:{self.port}", TAG_GREEN)
+
+            Thread(daemon=True, target=self.load_model_in_background).start()
+            self.voiceattack.start()
+            try:
+                self.sessions[DEFAULT_SESSION].recorder.arm()
+            except Exception as e:
+                # The stream is opened again when the first recording starts, as when not armed
+                logging.error("Failed to arm audio capture, the input device will be opened when recording starts: %s", e)
+                self.writer.write(f"Failed to arm audio capture, the input device will be opened when recording starts: {e}", TAG_ORANGE)
+            if self.config_watcher.interval > 0:
+                self.config_watcher.start()
 
             while not self.exit_event.is_set():
-                try:
-                    conn, _ = s.accept()
-                    with conn:
-                        data = conn.recv(1024).decode('utf-8')
-                        if data:
-                            self.handle_command(data)
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    logging.error("Socket error: %s", e)
-                    self.writer.write(f"Socket error: {e}", TAG_RED)
-                    continue
-        if self.recording:
-            self.stop_and_transcribe()
+                for key, events in self.selector.select(timeout=1.0):
+                    try:
+                        if key.fileobj is s:
+                            self.accept_connection(s)
+                        elif key.fileobj is self.wakeup_receive:
+                            self.flush_replies()
+                        else:
+                            if events & selectors.EVENT_READ and not key.data.close_after_output:
+                                self.read_connection(key.data)
+                            if events & selectors.EVENT_WRITE and not key.data.closed:
+                                self.write_connection(key.data)
+                    except Exception as e:
+                        logging.error("Socket error: %s", e)
+                        self.writer.write(f"Socket error: {e}", TAG_RED)
+                        if isinstance(key.data, ClientConnection):
+                            self.close_connection(key.data)
+            for key in list(self.selector.get_map().values()):
+                if isinstance(key.data, ClientConnection):
+                    # Let the client know that the shutdown command was received
+                    if key.data.output:
+                        try:
+                            key.data.conn.send(key.data.output)
+                        except OSError:
+                            pass
+                    key.data.conn.close()
+        for session in self.get_sessions():
+            if session.recording:
+                self.stop_and_transcribe(session)
+        # Finish transcribing any queued recordings before shutting down
+        self.jobs.put(None)
+        worker.join()
+        self.wakeup_send.close()
+        self.wakeup_receive.close()
+        self.config_watcher.stop()
+        self.voiceattack.stop()
+        for session in self.get_sessions():
+            session.recorder.close_stream()
 
         logging.info("Server has shut down cleanly.")
         self.writer.write("Server has shut down cleanly.")
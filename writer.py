@@ -1,13 +1,24 @@
+import queue
 from tkinter import NORMAL, DISABLED, END
 from ttkbootstrap.scrolled import ScrolledText
 from theme import TAG_BLACK, TAG_BLUE, TAG_GREEN, TAG_GREY, TAG_ORANGE, TAG_RED, theme_config
 
+# How often the queued lines are written to the text area
+DRAIN_INTERVAL_MS = 50
+# Lines kept in the text area, the oldest are removed so that memory does not grow
+MAX_LINES = 5000
+
 class WhisperAttackWriter:
     """
     A class used to write to the text area within the WhisperAttack window.
+    Lines can be written from any thread, they are queued and written to
+    the text area in batches on the Tk thread so that the server thread
+    never waits for the UI to update.
     """
-    def __init__(self, theme: str, text_area: ScrolledText):
+    def __init__(self, theme: str, text_area: ScrolledText, max_lines: int = MAX_LINES):
         self.text_area = text_area
+        self.max_lines = max_lines
+        self.pending = queue.SimpleQueue()
         style = theme_config[theme]
         self.text_area.tag_configure(TAG_BLACK, foreground=style[TAG_BLACK])
         self.text_area.tag_configure(TAG_BLUE, foreground=style[TAG_BLUE])
@@ -15,21 +26,47 @@ class WhisperAttackWriter:
         self.text_area.tag_configure(TAG_GREY, foreground=style[TAG_GREY])
         self.text_area.tag_configure(TAG_ORANGE, foreground=style[TAG_ORANGE])
         self.text_area.tag_configure(TAG_RED, foreground=style[TAG_RED])
+        self.text_area.after(DRAIN_INTERVAL_MS, self.drain)
 
     def write(self, text: str, tag = TAG_BLACK) -> None:
         """
-        Write a line to the text area.
-        This sets the state to NORMAL so that it is writable then
-        sets to DISABLED afterwards so that the text area is readonly
+        Queue a line to be written to the text area.
         """
-        self.text_area.text.configure(state=NORMAL)
-        self.text_area.insert(END, text + "\n", tag)
-        self.text_area.see(END)
-        self.text_area.text.configure(state=DISABLED)
+        self.pending.put((f"{text}\n", tag))
 
     def write_dict(self, dictionary: dict[str, str], tag = TAG_BLACK) -> None:
         """
         Write the dictionary as a formatted set of keys and values.
+        The lines are queued together so they are written in one batch.
+        """
+        if dictionary:
+            self.pending.put(("".join(f"{key}: {value}\n" for key, value in dictionary.items()), tag))
+
+    def drain(self) -> None:
+        """
+        Write the queued lines to the text area, runs on the Tk thread.
+        Consecutive lines with the same tag are inserted together.
+        This sets the state to NORMAL so that it is writable then
+        sets to DISABLED afterwards so that the text area is readonly
         """
-        for key, value in dictionary.items():
-            self.write(f"{key}: {value}", tag)
\ No newline at end of file
+        batch = []
+        while True:
+            try:
+                text, tag = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if batch and batch[-1][1] == tag:
+                batch[-1][0].append(text)
+            else:
+                batch.append(([text], tag))
+        if batch:
+            self.text_area.text.configure(state=NORMAL)
+            for lines, tag in batch:
+                self.text_area.insert(END, "".join(lines), tag)
+            # The text always ends with a newline so the last line is empty
+            line_count = int(self.text_area.text.index("end-1c").split(".")[0]) - 1
+            if line_count > self.max_lines:
+                self.text_area.text.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+            self.text_area.see(END)
+            self.text_area.text.configure(state=DISABLED)
+        self.text_area.after(DRAIN_INTERVAL_MS, self.drain)